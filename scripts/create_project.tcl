@@ -33,6 +33,7 @@ add_files -fileset sources_1 ../rtl/my_pkg.vhd
 ## Add simulation files here
 add_files -fileset sim_1 ../tb/pwm_enjoyer_axi_tb.sv
 add_files -fileset sim_1 ../tb/pwm_enjoyer_tb.vhd
+add_files -fileset sim_1 ../tb/pwm_enjoyer_autotest_tb.vhd
 add_files -fileset sim_1 ../tb/control_unit_tb.vhd
 add_files -fileset sim_1 ../tb/config_error_tb.vhd
 add_files -fileset sim_1 ../tb/pwm_top_autotest_tb.vhd
@@ -0,0 +1,124 @@
+import io
+import re
+
+import numpy as np
+
+
+# Conversión en bloque de matrices de enteros (fila x columna) al texto de los ficheros del autotest.
+#   Los dígitos de cada columna se obtienen con desplazamientos y máscaras sobre toda la matriz y se
+#   copian a un buffer de bytes con los separadores y los saltos de línea ya colocados, sin format()
+#   por dato. Es el mismo texto que " ".join(f"{format(v, formato):<ancho_min}" ...).rstrip() por fila.
+#   Hay ruta rápida para formatos binario, octal o hexadecimal de ancho fijo ("032b", "08x"...) y para
+#   decimal sin formato (None, como str) si las columnas quedan alineadas: con cualquier otro formato,
+#   o si algún dato no cabe en el ancho, se usa format() fila a fila.
+
+DESCONOCIDO = -1        # Valor habitual de dato desconocido, escrito como "XX..." (wavedrom_to_txt)
+FILAS_BLOQUE = 1 << 16  # Filas por bloque en escribir_filas
+
+BITS_DIGITO = {"b": 1, "o": 3, "x": 4, "X": 4}
+CARACTERES = {"b": np.frombuffer(b"01", dtype=np.uint8),
+              "o": np.frombuffer(b"01234567", dtype=np.uint8),
+              "x": np.frombuffer(b"0123456789abcdef", dtype=np.uint8),
+              "X": np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)}
+
+
+def ancho_formato(formato):
+    """(dígitos, tipo) de un formato "0<ancho><b|o|x|X>", o None si no tiene ruta rápida."""
+
+    coincidencia = re.fullmatch(r"0(\d+)([boxX])", formato or "")
+    if not coincidencia:
+        return None
+    return int(coincidencia.group(1)), coincidencia.group(2)
+
+
+def _texto_format(matriz, formato, ancho_min, desconocido):
+    """Ruta lenta: format() dato a dato (formato None -> str)."""
+
+    def campo(valor):
+        if (desconocido is not None) and (valor == desconocido):
+            return "X"*len(format(0, formato or ""))
+        return format(valor, formato) if formato else str(valor)
+
+    lineas = (" ".join(f"{campo(valor):<{ancho_min}}" for valor in fila).rstrip() + "\n" for fila in matriz.tolist())
+    return "".join(lineas).encode("ascii")
+
+
+def _digitos_decimales(matriz, n_digitos, ancho, potencias):
+    """Caracteres (fila x columna x ancho) de cada dato en decimal alineado a la izquierda, con espacios detrás."""
+
+    exponentes = n_digitos[:, :, None] - 1 - np.arange(ancho)
+    digitos = (matriz[:, :, None] // potencias[np.maximum(exponentes, 0)]) % 10
+    return np.where(exponentes >= 0, ord("0") + digitos, ord(" ")).astype(np.uint8)
+
+
+def _texto_decimal(matriz, ancho_min):
+    """Decimal (str) alineado a la izquierda. Solo en bloque si cada columna salvo la última cabe en ancho_min."""
+
+    filas, n_col = matriz.shape
+    if (ancho_min == 0) or np.any(matriz < 0) or np.any(matriz >= 10**18):
+        return _texto_format(matriz, None, ancho_min, None)
+    potencias = 10**np.arange(19, dtype=np.int64)
+    n_digitos = np.searchsorted(potencias, matriz, side="right").clip(min=1)    # Dígitos de cada dato
+    if np.any(n_digitos[:, :-1] > ancho_min):
+        return _texto_format(matriz, None, ancho_min, None)
+
+    # Columnas de ancho fijo (ancho_min + separador) y última columna con el ancho de su dato más largo
+    ancho_ultima = int(n_digitos[:, -1].max())
+    inicio_ultima = (ancho_min + 1)*(n_col - 1)
+    buf = np.full((filas, inicio_ultima + ancho_ultima + 1), ord(" "), dtype=np.uint8)
+    campos = np.full((filas, n_col - 1, ancho_min + 1), ord(" "), dtype=np.uint8)
+    campos[:, :, :ancho_min] = _digitos_decimales(matriz[:, :-1], n_digitos[:, :-1], ancho_min, potencias)
+    buf[:, :inicio_ultima] = campos.reshape(filas, -1)
+    buf[:, inicio_ultima:-1] = _digitos_decimales(matriz[:, -1:], n_digitos[:, -1:], ancho_ultima, potencias)[:, 0]
+
+    # Fin de línea tras el último dígito (como rstrip): se descartan los espacios sobrantes de la última columna
+    fin = inicio_ultima + n_digitos[:, -1]
+    buf[np.arange(filas), fin] = ord("\n")
+    return buf[np.arange(buf.shape[1]) <= fin[:, None]].tobytes()
+
+
+def texto_filas(matriz, formato, ancho_min=0, desconocido=None):
+    """
+    Texto (bytes) de una matriz de enteros no negativos: una línea por fila, columnas separadas por
+    un espacio y rellenas por la derecha hasta ancho_min (salvo la última). Los datos iguales a
+    desconocido (si se indica) se escriben como "XX...".
+    """
+
+    matriz = np.asarray(matriz, dtype=np.int64)
+    if matriz.ndim == 1:
+        matriz = matriz[:, None]
+    filas, n_col = matriz.shape
+    if filas == 0:
+        return b""
+    if (formato is None) and (desconocido is None):
+        return _texto_decimal(matriz, ancho_min)
+    ancho_tipo = ancho_formato(formato)
+    if ancho_tipo is None:
+        return _texto_format(matriz, formato, ancho_min, desconocido)
+    ancho, tipo = ancho_tipo
+    bits = BITS_DIGITO[tipo]
+    validos = matriz if desconocido is None else matriz[matriz != desconocido]
+    if (ancho*bits > 62) or np.any(validos < 0) or np.any(validos >> (ancho*bits)):
+        return _texto_format(matriz, formato, ancho_min, desconocido)
+
+    # Todas las columnas a la vez: (fila x columna x dígito) -> caracteres, más relleno y separador
+    campo = max(ancho, ancho_min) + 1
+    desplazamientos = np.arange(ancho - 1, -1, -1, dtype=np.int64) * bits
+    caracteres = CARACTERES[tipo][(matriz[:, :, None] >> desplazamientos) & ((1 << bits) - 1)]
+    if desconocido is not None:
+        caracteres[matriz == desconocido] = ord("X")
+    buf = np.full((filas, n_col, campo), ord(" "), dtype=np.uint8)
+    buf[:, :, :ancho] = caracteres
+    buf = buf.reshape(filas, -1)[:, :(n_col - 1)*campo + ancho + 1]     # La última columna sin relleno
+    buf[:, -1] = ord("\n")
+    return buf.tobytes()
+
+
+def escribir_filas(f, matriz, formato, ancho_min=0, desconocido=None, filas_bloque=FILAS_BLOQUE):
+    """Escribe texto_filas(matriz) en un fichero abierto (texto o binario) por bloques de filas."""
+
+    matriz = np.asarray(matriz)
+    texto_modo = isinstance(f, io.TextIOBase)
+    for inicio in range(0, len(matriz), filas_bloque):
+        texto = texto_filas(matriz[inicio:inicio + filas_bloque], formato, ancho_min, desconocido)
+        f.write(texto.decode("ascii") if texto_modo else texto)
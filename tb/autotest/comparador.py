@@ -0,0 +1,374 @@
+import os
+import mmap
+import json
+
+import numpy as np
+
+from pwm_top_generator import COLUMNAS_SALIDAS
+from pwm_top_model import base_formato
+from pwm_enjoyer_model import COLUMNAS_SALIDAS_ENJOYER
+
+
+# Comparación en bloque de las salidas de una simulación (*_outputs.txt) con su referencia
+#   (*_outputs_ref.txt). Los ficheros se mapean en memoria y se convierten por bloques de líneas
+#   completas en matrices de enteros, así que el tiempo y la memoria no dependen de su tamaño.
+#   Se informa de todas las ventanas de filas con diferencias (no solo de la primera, como el
+#   assert del testbench) y, si la referencia las tiene, de su posición (configuración, ciclo, step).
+
+BLOQUE = 1 << 24        # Bytes por bloque de lectura (~16 MB)
+INVALIDO = -1           # Valor de un dato que no se puede interpretar ('U', 'X'...)
+
+# Columnas de los ficheros de salida de cada autotest, columnas que comprueba el testbench y columnas
+#   de la referencia con la posición (configuración, ciclo, step) de cada fila. UNLOCK de pwm_top solo se
+#   compara con check_unlocked (parametros_modulo), como C_CHECK_UNLOCKED en pwm_top_autotest_tb: el del
+#   modelo aún no se ha validado con el RTL
+MODULOS = {
+    "pwm_top": {"columnas": COLUMNAS_SALIDAS,
+                "comparar": ("pwm",),
+                "posicion": ("n_config_out", "ciclo", "steps")},
+    "pwm_enjoyer": {"columnas": COLUMNAS_SALIDAS_ENJOYER,
+                    "comparar": COLUMNAS_SALIDAS_ENJOYER,
+                    "posicion": None},
+    "state_ctrlr": {"columnas": ("rd_addr", "en_cnt", "switch_mem", "last_cyc", "en_wr_config"),
+                    "comparar": None,
+                    "posicion": None},
+    "pwm_dp_mem": {"columnas": None,
+                   "comparar": None,
+                   "posicion": None},
+}
+
+# Valor de cada carácter como dígito (255 si no lo es)
+DIGITOS = np.full(256, 255, dtype=np.uint8)
+DIGITOS[np.frombuffer(b"0123456789", dtype=np.uint8)] = np.arange(10)
+DIGITOS[np.frombuffer(b"abcdef", dtype=np.uint8)] = np.arange(10, 16)
+DIGITOS[np.frombuffer(b"ABCDEF", dtype=np.uint8)] = np.arange(10, 16)
+
+
+def parametros_modulo(modulo, check_unlocked=False):
+    """Argumentos de comparar_ficheros de un módulo de MODULOS; check_unlocked añade UNLOCK en pwm_top."""
+
+    parametros = dict(MODULOS[modulo])
+    if check_unlocked and (modulo == "pwm_top"):
+        parametros["comparar"] += ("unlock",)
+    return parametros
+
+
+# Lectura -------------------------------------------------------------------
+
+def _bloques_bytes(archivo, bloque=BLOQUE):
+    """Recorre un fichero mapeado en memoria por bloques de líneas completas (arrays de bytes)."""
+
+    with open(archivo, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            inicio, tamano = 0, len(mapa)
+            while inicio < tamano:
+                fin = min(inicio + bloque, tamano)
+                if fin < tamano:
+                    corte = mapa.rfind(b"\n", inicio, fin)
+                    fin = corte + 1 if corte >= 0 else (mapa.find(b"\n", fin) + 1 or tamano)
+                yield np.frombuffer(mapa[inicio:fin], dtype=np.uint8)
+                inicio = fin
+
+
+def _digitos_a_valores(digitos, bases):
+    """Convierte una matriz de dígitos (fila x carácter, con 255 = relleno) a enteros en la base de cada fila."""
+
+    valores = np.zeros(digitos.shape[0], dtype=np.int64)
+    invalido = np.zeros(digitos.shape[0], dtype=bool)
+    for k in range(digitos.shape[1]):
+        d = digitos[:, k].astype(np.int64)
+        relleno = d == 255
+        invalido |= (d >= bases) & ~relleno
+        valores = np.where(relleno, valores, valores*bases + d)
+    return np.where(invalido, INVALIDO, valores)
+
+
+def _columna_fija(caracteres, base):
+    """Convierte una matriz de caracteres sin relleno (fila x carácter) a enteros en base."""
+
+    ancho = caracteres.shape[1]
+    if base**ancho > 2**53:
+        return _digitos_a_valores(DIGITOS[caracteres], base)
+    # Exacto en coma flotante: tabla con NaN en los caracteres que no son dígitos de la base y
+    #   producto matricial por las potencias en vez de un bucle por dígito
+    tabla = np.where(DIGITOS < base, DIGITOS, np.nan)
+    valores = tabla[caracteres] @ (float(base)**np.arange(ancho - 1, -1, -1))
+    invalido = np.isnan(valores)
+    return np.where(invalido, INVALIDO, np.where(invalido, 0, valores).astype(np.int64))
+
+
+def _parsear_fijo(buf, bases, indices):
+    """Bloque con todas las líneas del mismo ancho y las columnas alineadas. None si no lo es."""
+
+    ancho = int(np.argmax(buf == 10)) + 1
+    if (buf[ancho - 1] != 10) or (len(buf) % ancho) or np.count_nonzero(buf == 10) != len(buf) // ancho:
+        return None
+    matriz = buf.reshape(-1, ancho)
+    espacios = matriz[0] <= 32
+    if not np.all(matriz[:, espacios] <= 32):
+        return None
+    bordes = np.diff(np.concatenate(([0], (~espacios).astype(np.int8), [0])))
+    tramos = list(zip(np.flatnonzero(bordes == 1), np.flatnonzero(bordes == -1)))
+    if len(tramos) != len(bases):
+        return None
+    valores = np.empty((matriz.shape[0], len(indices)), dtype=np.int64)
+    for c, i in enumerate(indices):
+        inicio, fin = tramos[i]
+        valores[:, c] = _columna_fija(matriz[:, inicio:fin], bases[i])
+        # Un espacio dentro de la columna es un dato más corto (columnas no alineadas), no un dato inválido
+        invalido = valores[:, c] == INVALIDO
+        if invalido.any() and np.any(matriz[invalido, inicio:fin] <= 32):
+            return None
+    return valores
+
+
+def _parsear_tokens(buf, bases, indices, archivo):
+    """Bloque genérico: datos separados por espacios con cualquier ancho."""
+
+    n_col = len(bases)
+    dato = (buf > 32).astype(np.int8)
+    bordes = np.diff(dato, prepend=np.int8(0), append=np.int8(0))
+    inicios, fines = np.flatnonzero(bordes == 1), np.flatnonzero(bordes == -1)
+    linea = np.searchsorted(np.flatnonzero(buf == 10), inicios)
+    if (len(inicios) % n_col) or np.any(linea[::n_col] != linea[n_col - 1::n_col]) or \
+            np.any(np.diff(linea[::n_col]) == 0):
+        raise ValueError(f"{archivo}: alguna fila no tiene {n_col} columnas")
+    longitudes = fines - inicios
+    n_max = int(longitudes.max()) if len(longitudes) else 0
+    # Matriz (dato x carácter) alineada a la derecha, con 255 como relleno
+    posiciones = fines[:, None] - n_max + np.arange(n_max)
+    digitos = np.where(posiciones >= inicios[:, None], DIGITOS[buf[np.maximum(posiciones, 0)]], 255).astype(np.uint8)
+    bases_dato = np.tile(bases, len(inicios) // n_col)
+    return _digitos_a_valores(digitos, bases_dato).reshape(-1, n_col)[:, indices]
+
+
+def _n_columnas(archivo):
+    with open(archivo, "rb") as f:
+        for linea in f:
+            if linea.split():
+                return len(linea.split())
+    return 0
+
+
+def leer_bloques(archivo, base=2, eventos=False, bloque=BLOQUE, indices=None):
+    """
+    Recorre un fichero de salidas por bloques como segmentos (fines, valores): fines es el ciclo
+    (acumulado desde el principio del fichero) en el que acaba cada fila y valores una matriz
+    (fila x columna) con las columnas de indices (todas si None). En modo eventos la primera
+    columna es la duración en decimal y no cuenta en indices.
+    """
+
+    n_col = _n_columnas(archivo)
+    bases = np.array([10]*eventos + [base]*(n_col - eventos), dtype=np.int64)
+    indices = range(n_col - eventos) if indices is None else indices
+    indices = [0]*eventos + [i + eventos for i in indices]
+    ciclo = 0
+    for buf in _bloques_bytes(archivo, bloque):
+        valores = _parsear_fijo(buf, bases, indices)
+        if valores is None:
+            valores = _parsear_tokens(buf, bases, indices, archivo)
+        if not len(valores):
+            continue
+        if eventos:
+            fines = ciclo + np.cumsum(valores[:, 0])
+            valores = valores[:, 1:]
+        else:
+            fines = ciclo + np.arange(1, len(valores) + 1, dtype=np.int64)
+        ciclo = int(fines[-1])
+        yield fines, valores
+
+
+# Comparación ---------------------------------------------------------------
+
+class _Pendiente:
+    """Segmentos leídos de un fichero y todavía sin comparar."""
+
+    def __init__(self, bloques):
+        self.bloques = bloques
+        self.fines = np.zeros(0, dtype=np.int64)
+        self.valores = None
+        self.agotado = False
+
+    def rellenar(self):
+        while not len(self.fines) and not self.agotado:
+            try:
+                fines, valores = next(self.bloques)
+                self.fines, self.valores = fines, valores
+            except StopIteration:
+                self.agotado = True
+
+    def consumir(self, hasta):
+        k = int(np.searchsorted(self.fines, hasta, side="right"))
+        self.fines, self.valores = self.fines[k:], self.valores[k:]
+
+
+def comparar_ficheros(archivo, archivo_ref, base=2, eventos=False, eventos_ref=None, columnas=None,
+                      comparar=None, posicion=None, bloque=BLOQUE):
+    """
+    Compara un fichero de salidas con su referencia y devuelve un informe con todas las ventanas
+    (filas consecutivas) con diferencias, un resumen por columna y, si se indican las columnas de
+    posicion (configuración, ciclo, step) de la referencia, un resumen por configuración.
+    Los ficheros pueden estar cada uno en modo eventos o no (eventos / eventos_ref).
+    """
+
+    eventos_ref = eventos if eventos_ref is None else eventos_ref
+    n_col = _n_columnas(archivo_ref) - eventos_ref
+    if (columnas is None) or (len(columnas) != n_col):
+        columnas = tuple(f"col{i}" for i in range(n_col))
+    comparar = columnas if comparar is None else comparar
+    i_comp = [columnas.index(clave) for clave in comparar]
+    i_pos = [columnas.index(clave) for clave in posicion] if posicion else []
+
+    # Solo se convierten las columnas que se usan: en la referencia, las comparadas y las de posición
+    sim = _Pendiente(leer_bloques(archivo, base, eventos, bloque, i_comp))
+    ref = _Pendiente(leer_bloques(archivo_ref, base, eventos_ref, bloque, i_comp + i_pos))
+    ventanas = []                                   # [inicio, fin, máscara de columnas, esperado, obtenido, posición]
+    filas_columna = np.zeros(len(i_comp), dtype=np.int64)
+    pesos = 1 << np.arange(len(i_comp), dtype=np.int64)
+    ciclo = 0
+
+    while True:
+        sim.rellenar()
+        ref.rellenar()
+        if not (len(sim.fines) and len(ref.fines)):
+            break
+        hasta = min(int(sim.fines[-1]), int(ref.fines[-1]))
+        k_sim = int(np.searchsorted(sim.fines, hasta)) + 1
+        k_ref = int(np.searchsorted(ref.fines, hasta)) + 1
+        fines_sim, fines_ref = sim.fines[:k_sim], ref.fines[:k_ref]
+
+        # Segmentos comunes: unión de los cambios de ambos ficheros (filas alineadas si ninguno está en eventos)
+        if (k_sim == k_ref) and (fines_sim[-1] - ciclo == k_sim) and (fines_ref[-1] - ciclo == k_ref):
+            fines = fines_sim
+            i_sim = i_ref = np.arange(k_sim)
+        else:
+            fines = np.union1d(np.minimum(fines_sim, hasta), np.minimum(fines_ref, hasta))
+            i_sim = np.searchsorted(fines_sim, fines)
+            i_ref = np.searchsorted(fines_ref, fines)
+        obtenido = sim.valores[i_sim]
+        esperado = ref.valores[i_ref][:, :len(i_comp)]
+        distinto = obtenido != esperado
+        inicios = np.concatenate(([ciclo], fines[:-1]))
+        filas_columna += ((fines - inicios)[:, None] * distinto).sum(axis=0)
+
+        # Ventanas: tramos de segmentos consecutivos con alguna diferencia
+        mal = distinto.any(axis=1)
+        if mal.any():
+            bordes = np.diff(np.concatenate(([0], mal.astype(np.int8), [0])))
+            primeros, ultimos = np.flatnonzero(bordes == 1), np.flatnonzero(bordes == -1) - 1
+            mascaras = np.bitwise_or.reduceat(distinto @ pesos, primeros)
+            pos = ref.valores[i_ref[primeros]][:, len(i_comp):]
+            for j, (p, u) in enumerate(zip(primeros, ultimos)):
+                if ventanas and (ventanas[-1][1] == inicios[p]):    # Continúa la del bloque anterior
+                    ventanas[-1][1] = int(fines[u])
+                    ventanas[-1][2] |= int(mascaras[j])
+                    continue
+                ventanas.append([int(inicios[p]), int(fines[u]), int(mascaras[j]), esperado[p].tolist(),
+                                 obtenido[p].tolist(), pos[j].tolist()])
+
+        ciclo = hasta
+        sim.consumir(hasta)
+        ref.consumir(hasta)
+
+    # Lo que queda en uno de los dos ficheros no tiene con qué compararse
+    filas = ciclo + _restante(sim, ciclo)
+    filas_ref = ciclo + _restante(ref, ciclo)
+
+    informe = {"archivo": archivo,
+               "archivo_ref": archivo_ref,
+               "filas": filas,
+               "filas_ref": filas_ref,
+               "filas_distintas": int(sum(fin - inicio for inicio, fin, *_ in ventanas)),
+               "filas_por_columna": dict(zip(comparar, filas_columna.tolist())),
+               "ventanas": [{"inicio": inicio,
+                             "longitud": fin - inicio,
+                             "columnas": [clave for i, clave in enumerate(comparar) if (mascara >> i) & 1],
+                             "esperado": dict(zip(comparar, esp)),
+                             "obtenido": dict(zip(comparar, obt)),
+                             **({"posicion": dict(zip(("config", "ciclo", "step"), pos))} if posicion else {})}
+                            for inicio, fin, mascara, esp, obt, pos in ventanas]}
+    if posicion:
+        informe["por_config"] = resumen_configs(informe["ventanas"])
+    return informe
+
+
+def _restante(pendiente, ciclo):
+    """Ciclos de un fichero a partir de ciclo (se recorre hasta el final)."""
+
+    fin = ciclo
+    while True:
+        pendiente.rellenar()
+        if not len(pendiente.fines):
+            return fin - ciclo
+        fin = int(pendiente.fines[-1])
+        pendiente.fines = pendiente.fines[:0]
+
+
+def resumen_configs(ventanas):
+    """Ventanas, filas distintas y columnas afectadas por configuración (N_CONF_O de la referencia)."""
+
+    resumen = {}
+    for ventana in ventanas:
+        config = ventana["posicion"]["config"]
+        dic = resumen.setdefault(config, {"ventanas": 0, "filas": 0, "columnas": []})
+        dic["ventanas"] += 1
+        dic["filas"] += ventana["longitud"]
+        dic["columnas"] = sorted(set(dic["columnas"]) | set(ventana["columnas"]))
+    return dict(sorted(resumen.items()))
+
+
+def imprimir_informe(informe, n_ventanas=20):
+    """Resumen legible del informe de comparar_ficheros."""
+
+    print(f"{informe['archivo']} vs {informe['archivo_ref']}")
+    if informe["filas"] != informe["filas_ref"]:
+        print(f"  Longitudes distintas: {informe['filas']} filas frente a {informe['filas_ref']} de referencia "
+              f"(se compara la parte común)")
+    if not informe["ventanas"]:
+        print("  Sin diferencias")
+        return
+    print(f"  {informe['filas_distintas']} filas distintas en {len(informe['ventanas'])} ventanas")
+    for clave, filas in informe["filas_por_columna"].items():
+        print(f"    {clave}: {filas} filas")
+    if "por_config" in informe:
+        print("  Por configuración:")
+        for config, dic in informe["por_config"].items():
+            print(f"    {config}: {dic['ventanas']} ventanas, {dic['filas']} filas ({', '.join(dic['columnas'])})")
+    print(f"  Primeras ventanas (de {len(informe['ventanas'])}):")
+    for ventana in informe["ventanas"][:n_ventanas]:
+        posicion = ""
+        if "posicion" in ventana:
+            posicion = " config {config}, ciclo {ciclo}, step {step}".format(**ventana["posicion"])
+        print(f"    fila {ventana['inicio']} (+{ventana['longitud']}){posicion}: {', '.join(ventana['columnas'])} "
+              f"esperado {ventana['esperado']} obtenido {ventana['obtenido']}")
+
+
+if __name__ == "__main__":
+
+    ruta = os.path.dirname(os.path.abspath(__file__))
+
+    # USER: Configurar ----------------------------------------
+    # Módulo de MODULOS (columnas, columnas comparadas y posición) y ficheros
+    modulo = "pwm_top"
+    archivo = os.path.join(ruta, f"{modulo}_outputs.txt")
+    archivo_ref = os.path.join(ruta, f"{modulo}_outputs_ref.txt")
+
+    # Formato y modo eventos de los ficheros (C_HEX y C_EVENTS del testbench)
+    formato = "08b"
+    eventos = False
+
+    # Comparar también UNLOCK en pwm_top (C_CHECK_UNLOCKED = true en pwm_top_autotest_tb)
+    check_unlocked = False
+
+    # Si se indica, se guarda aquí el informe completo (todas las ventanas) en JSON
+    archivo_informe = None
+    # USER ----------------------------------------------------
+
+    informe = comparar_ficheros(archivo, archivo_ref, base_formato(formato), eventos,
+                                **parametros_modulo(modulo, check_unlocked))
+    imprimir_informe(informe)
+    if archivo_informe:
+        with open(archivo_informe, "w") as f:
+            json.dump(informe, f, indent=4)
@@ -0,0 +1,303 @@
+import random
+import os
+
+from pwm_top_generator import EscritorTxt, PARAMETROS, generar_config
+from pwm_top_model import SimuladorPwmTop
+
+
+# Generador de vectores aleatorios de larga duración para pwm_dp_mem_autotest_tb.
+#   Las entradas se generan por transacciones: ráfagas de escritura de la siguiente configuración
+#   (con direcciones repetidas y huecos) mientras se leen los ciclos de la actual, LAST_CYC en el último
+#   ciclo y SWITCH_MEM al final, como lo haría state_ctrlr. Las salidas de referencia las calcula
+#   ModeloPwmDpMem, que replica rtl/pwm_dp_mem.vhd con EN_I = UNLOCKED_I = '1' (las del testbench)
+#   y salta hasta el siguiente cambio de entradas en cuanto el estado deja de cambiar.
+
+MASCARA_ADDR = (1 << 8) - 1     # Direcciones y N_ADDR: C_MEM_SIZE_MAX_L2 = 8 bits
+C_MEM_SIZE_MAX_N = 128          # Profundidad de memoria (G_MEM_DEPTH)
+
+# Columnas de pwm_dp_mem_autotest_tb, en su orden
+COLUMNAS_ENTRADAS = ("wr_en", "wr_addr", "wr_data", "switch_mem", "last_cyc", "n_addr", "rd_addr")
+COLUMNAS_SALIDAS = ("rd_data", "rd_data_next", "rd_data_next_2")
+
+
+class ModeloPwmDpMem:
+    """Estado de pwm_dp_mem tras cada flanco de reloj. fila = tupla con los campos de COLUMNAS_ENTRADAS."""
+
+    def __init__(self, fila, mem_depth=C_MEM_SIZE_MAX_N):
+        self.mem_depth = mem_depth
+        self.fila = fila
+        self.wr_port = 0
+        self.n_addr = 0
+        self.wr_addr_d1 = MASCARA_ADDR
+        self.rd_addr_d1 = 0
+        self.switch_d1 = 0
+        self.last_cyc_d1 = 0
+        self.prev_last = 0
+        self.prev_last2 = 0
+        self.next_first = 0
+        self.next_first2 = 0
+        self.tmp_last = 0
+        self.tmp_last2 = 0
+        self.early_sw = 1
+        self.din = [0, 0]                       # Latch de DIN_A / DIN_B
+        self.dout = [[0, 0], [0, 0], [0, 0]]    # [BRAM][puerto]: actual, +1, +2
+        self.mem = {}                           # Contenido común de las tres BRAM
+        # El latch de DIN no depende del reset: la primera fila ya se puede registrar
+        if fila[0] and (fila[1] != self.wr_addr_d1):
+            self.din[0] = fila[2]
+
+    # Combinacionales ---------------------------------------------------------
+
+    def _direcciones(self):
+        """Direcciones de las tres BRAM en cada puerto (A, B)."""
+
+        n_addr, wr_addr, rd_addr = self.n_addr, self.fila[1], self.fila[6]
+        if rd_addr == ((n_addr - 1) & MASCARA_ADDR):
+            rd_1, rd_2 = 0, 1
+        elif rd_addr == ((n_addr - 2) & MASCARA_ADDR):
+            rd_1, rd_2 = (rd_addr + 1) & MASCARA_ADDR, 0
+        else:
+            rd_1, rd_2 = (rd_addr + 1) & MASCARA_ADDR, (rd_addr + 2) & MASCARA_ADDR
+        direcciones = []
+        for puerto, offset in enumerate((0, self.mem_depth)):
+            if puerto == self.wr_port:     # Puerto de escritura
+                direcciones.append((wr_addr + offset,) * 3)
+            else:
+                direcciones.append((rd_addr + offset, rd_1 + offset, rd_2 + offset))
+        return direcciones
+
+    def salidas(self):
+        """RD_DATA, RD_DATA_NEXT y RD_DATA_NEXT_2."""
+
+        switch = self.fila[3]
+        puerto = 1 - self.wr_port
+        prev_uno = (self.prev_last == 1)
+        fin_mem = self.last_cyc_d1 and (self.rd_addr_d1 == ((self.n_addr - 1) & MASCARA_ADDR))
+        if self.switch_d1:
+            rd = self.prev_last
+        elif switch:
+            rd = self.prev_last2 if prev_uno else self.prev_last
+        else:
+            rd = self.dout[0][puerto]
+        if self.switch_d1 or (switch and not prev_uno):
+            rd_1, rd_2 = self.next_first, self.next_first2
+        elif switch:
+            rd_1, rd_2 = 1, self.next_first
+        elif fin_mem and not prev_uno:
+            rd_1, rd_2 = self.next_first, self.next_first2
+        else:
+            rd_1 = self.dout[1][puerto]
+            if self.last_cyc_d1 and (self.rd_addr_d1 == ((self.n_addr - 2) & MASCARA_ADDR)):
+                rd_2 = self.next_first
+            else:
+                rd_2 = self.dout[2][puerto]
+        return rd, rd_1, rd_2
+
+    # Flanco de reloj ---------------------------------------------------------
+
+    def flanco(self, fila_nueva):
+        """Flanco de subida: los registros muestrean self.fila y el testbench aplica fila_nueva."""
+
+        wr_en, wr_addr, wr_data, switch, last_cyc, n_addr_i, rd_addr = self.fila
+        direcciones = self._direcciones()
+
+        if wr_en:
+            self.wr_addr_d1 = wr_addr
+        self.rd_addr_d1 = rd_addr
+        self.switch_d1 = switch
+        self.last_cyc_d1 = last_cyc
+        if wr_en:
+            if wr_addr == 0:
+                self.next_first = wr_data
+                if self.early_sw and (self.n_addr > 1):
+                    self.prev_last, self.prev_last2 = self.tmp_last, self.tmp_last2
+                else:
+                    self.prev_last = self.prev_last2 = 0
+            elif wr_addr == 1:
+                self.next_first2 = wr_data
+            self.tmp_last, self.tmp_last2 = wr_data, self.tmp_last
+        if switch:
+            self.early_sw = 1
+        elif wr_en:
+            self.early_sw = 0
+        # BRAM en modo read-first: leen todas antes de escribir
+        mem = self.mem
+        for puerto in (0, 1):
+            for bram in (0, 1, 2):
+                self.dout[bram][puerto] = mem.get(direcciones[puerto][bram], 0)
+        mem[direcciones[self.wr_port][0]] = self.din[self.wr_port]
+
+        # Deltas posteriores al flanco ----------------------------------------
+        self.fila = fila_nueva
+        registrar = fila_nueva[0] and (fila_nueva[1] != self.wr_addr_d1)
+        # Flanco de SWITCH_MEM: conmuta los puertos y registra N_ADDR. El latch de DIN se evalúa
+        #   antes con el puerto anterior (WR_EN y WR_ADDR llegan un delta antes que el nuevo WE)
+        if fila_nueva[3] and not switch:
+            if registrar:
+                self.din[self.wr_port] = fila_nueva[2]
+            self.wr_port = 1 - self.wr_port
+            self.n_addr = fila_nueva[5] & MASCARA_ADDR
+        # Latch de DIN: transparente mientras se escribe una dirección nueva
+        if registrar:
+            self.din[self.wr_port] = fila_nueva[2]
+
+    # Salto entre eventos -----------------------------------------------------
+
+    def _foto(self):
+        """Todo el estado salvo el contenido de la memoria."""
+
+        return (self.wr_port, self.n_addr, self.wr_addr_d1, self.rd_addr_d1, self.switch_d1, self.last_cyc_d1,
+                self.prev_last, self.prev_last2, self.next_first, self.next_first2, self.tmp_last, self.tmp_last2,
+                self.early_sw, tuple(self.din), tuple(map(tuple, self.dout)))
+
+    def saltar(self, n):
+        """
+        Avanza hasta n flancos con las entradas fijas. Devuelve los flancos avanzados (>= 1).
+        Si un flanco no cambia ningún registro ni la memoria, todos los siguientes son iguales.
+        """
+
+        foto = self._foto()
+        direccion = self._direcciones()[self.wr_port][0]
+        escribe = self.mem.get(direccion, 0) != self.din[self.wr_port]
+        self.flanco(self.fila)
+        if escribe or (self._foto() != foto):
+            return 1
+        return n
+
+
+class SimuladorPwmDpMem(SimuladorPwmTop):
+    """SimuladorPwmTop con ModeloPwmDpMem: eventos de entrada (duración, fila) y de salida (duración, salidas)."""
+
+    def _crear_modelo(self, fila):
+        return ModeloPwmDpMem(fila, self.mem_depth)
+
+
+def generar_entradas(n_config, n_max_estados, n_max_dato, n_max_ciclos, p_repetir=0.2, p_hueco=0.3,
+                     n_ceros_inicio=5):
+    """
+    Genera los eventos (duración, fila) de un escenario aleatorio:
+    - Escrituras: una fila por dirección, con probabilidad p_repetir de repetir la dirección con otro dato
+      (el latch de DIN no lo registra) y p_hueco de dejar filas sin WR_EN entre medias.
+    - Lecturas: RD_ADDR recorre los estados de la configuración actual durante sus ciclos, LAST_CYC a '1'
+      en el último y SWITCH_MEM en su última fila, ya con el N_ADDR de la siguiente.
+    - La primera configuración se escribe antes de leer nada y entra con un SWITCH_MEM aislado.
+    """
+
+    def escrituras(config):
+        """Filas (duración, (WR_EN, WR_ADDR, WR_DATA)) de la ráfaga de escritura de una configuración."""
+        for addr, dato in zip(config["wr_addr"], config["wr_data"]):
+            yield 1, (1, addr, dato)
+            while random.random() < p_repetir:
+                yield 1, (1, addr, random.randint(1, n_max_dato))
+            if random.random() < p_hueco:
+                yield random.randint(1, 4), (0, addr, random.randint(0, n_max_dato))
+
+    def lecturas(datos, ciclos, n_addr_sig):
+        """Filas (duración, (SWITCH_MEM, LAST_CYC, N_ADDR, RD_ADDR)) de los ciclos de una configuración."""
+        n_addr = len(datos)
+        for ciclo in range(ciclos):
+            ultimo = int(ciclo == ciclos - 1)
+            for rd_addr, dato in enumerate(datos):
+                if ultimo and (rd_addr == n_addr - 1):
+                    if dato > 1:
+                        yield dato - 1, (0, 1, n_addr, rd_addr)
+                    yield 1, (1, 1, n_addr_sig, rd_addr)
+                else:
+                    yield dato, (0, ultimo, n_addr, rd_addr)
+
+    def combinar(filas_escritura, filas_lectura, escritura_fin):
+        """Une las escrituras (al principio) con las lecturas, que marcan la duración total."""
+        pendiente = None
+        for duracion, lectura in filas_lectura:
+            while duracion:
+                if pendiente is None:
+                    pendiente = list(next(filas_escritura, (None, escritura_fin)))
+                if pendiente[0] is None:
+                    yield duracion, pendiente[1] + lectura
+                    break
+                paso = min(duracion, pendiente[0])
+                yield paso, pendiente[1] + lectura
+                duracion -= paso
+                pendiente[0] -= paso
+                if pendiente[0] == 0:
+                    pendiente = None
+
+    yield n_ceros_inicio, (0,) * len(COLUMNAS_ENTRADAS)
+
+    # Primera configuración: escritura y SWITCH_MEM aislado (S_INIT_SW)
+    config = generar_config(0, n_max_estados, n_max_dato, n_max_ciclos)
+    ultima = (0, 0, 0)
+    for duracion, escritura in escrituras(config):
+        yield duracion, escritura + (0, 0, 0, 0)
+        ultima = (0,) + escritura[1:]
+    yield random.randint(1, 10), ultima + (0, 0, 0, 0)
+    yield 1, ultima + (1, 1, config["n_addr"], 0)
+
+    for index in range(1, n_config + 1):
+        # La última configuración solo se escribe para cerrar la anterior
+        siguiente = generar_config(index, n_max_estados, n_max_dato, n_max_ciclos)
+        inicio = random.randint(1, config["n_tot_cyc"])
+        filas_escritura = [(inicio, ultima)] + list(escrituras(siguiente))
+        # Las escrituras tienen que caber antes del último ciclo
+        ciclos = max(config["ciclos"], 2 + sum(d for d, _ in filas_escritura) // config["n_tot_cyc"])
+        ultima = (0,) + filas_escritura[-1][1][1:]
+        yield from combinar(iter(filas_escritura), lecturas(config["wr_data"], ciclos, siguiente["n_addr"]), ultima)
+        config = siguiente
+
+    yield 10, ultima + (0, 0, config["n_addr"], 0)
+
+
+def generar_ficheros(directorio, n_config, n_max_estados, n_max_dato, n_max_ciclos, formato="08x", sufijo="_aleatorio",
+                     mem_depth=C_MEM_SIZE_MAX_N, **opciones):
+    """Genera un escenario aleatorio y exporta a directorio las entradas y las salidas de referencia."""
+
+    archivo_entradas = os.path.join(directorio, f"pwm_dp_mem_inputs{sufijo}.txt")
+    archivo_salidas = os.path.join(directorio, f"pwm_dp_mem_outputs_ref{sufijo}.txt")
+
+    simulador = SimuladorPwmDpMem(mem_depth)
+    n_filas = 0
+
+    def columnas(eventos_salida):
+        dic = {clave: [] for clave in COLUMNAS_SALIDAS}
+        for duracion, salida in eventos_salida:
+            for clave, valor in zip(COLUMNAS_SALIDAS, salida):
+                dic[clave].append((valor, duracion, 0))
+        return dic
+
+    with EscritorTxt(archivo_salidas, COLUMNAS_SALIDAS, formato) as escritor_salidas, \
+         EscritorTxt(archivo_entradas, COLUMNAS_ENTRADAS, formato) as escritor_entradas:
+
+        for duracion, fila in generar_entradas(n_config, n_max_estados, n_max_dato, n_max_ciclos, **opciones):
+            escritor_entradas.anadir({clave: [(valor, duracion, 0)] for clave, valor in zip(COLUMNAS_ENTRADAS, fila)})
+            simulador.anadir(duracion, fila)
+            n_filas += duracion
+            escritor_salidas.anadir(columnas(simulador.avanzar()))
+
+        escritor_salidas.anadir(columnas(simulador.avanzar(n_filas, final=True)))
+
+    return {"archivos": [archivo_entradas, archivo_salidas], "n_filas": n_filas}
+
+
+if __name__ == "__main__":
+
+    ruta = os.path.dirname(os.path.abspath(__file__))
+
+    # USER: Configurar ----------------------------------------
+    # Parámetros de las configuraciones: los de PARAMETROS["normal"] o PARAMETROS["worst_case"]
+    parametros = PARAMETROS["normal"]
+
+    # Formato de los ficheros: WR_DATA es de 32 bits, así que pwm_dp_mem_autotest_tb necesita
+    #   C_WIDTH = 32 (y C_HEX = true con "08x")
+    formato = "08x"
+
+    # Sufijo de los ficheros: sin él se sobrescribirían pwm_dp_mem_inputs.txt y pwm_dp_mem_outputs_ref.txt, los
+    #   vectores de WaveDrom (wavedrom_to_txt) que lee por defecto pwm_dp_mem_autotest_tb (C_WIDTH = 8)
+    sufijo = "_aleatorio"
+
+    # Semilla del generador aleatorio (None -> escenario distinto en cada ejecución)
+    semilla = None
+    # USER ----------------------------------------------------
+
+    random.seed(semilla)
+    resultado = generar_ficheros(ruta, **parametros, formato=formato, sufijo=sufijo)
+    print(f"{resultado['n_filas']} ciclos de reloj")
@@ -0,0 +1,123 @@
+import random
+import os
+
+from pwm_top_generator import EscritorTxt, PARAMETROS, generar_config
+from pwm_enjoyer_model import (SimuladorPwmEnjoyer, CAMPOS_REGISTROS, COLUMNAS_SALIDAS_ENJOYER, CONTROL,
+                               C_PWM_N, UC_IDLE, UC_SHUTDOWN, UC_APAGAR, UC_ACTUALIZAR, UC_CONFIGURAR, columnas_modelo)
+
+
+# Generador de escenarios de pwm_enjoyer a nivel de registros.
+#   En cada fase los canales se reparten en grupos y cada grupo se configura con una única secuencia de
+#   escrituras (REG_DIRECCIONES_I = máscara del grupo), igual que haría el software. Las salidas de
+#   referencia las calcula pwm_enjoyer_model a la vez que se generan las entradas.
+
+CODIGO_CONTROL = {estado: codigo for codigo, estado in CONTROL.items()}
+CODIGO_CONTROL[UC_IDLE] = 0
+
+
+def generar_registros(n_fases, n_max_grupos, n_max_estados, n_max_dato, n_max_ciclos, n_pwm=C_PWM_N,
+                      p_apagar=0.2, p_error=0.1, n_ceros_inicio=5):
+    """
+    Genera los eventos (duración, registros) de un escenario aleatorio:
+    - Por fase: reparto de canales en grupos, APAGAR opcional, CONFIGURAR de cada grupo
+      (WR_DATA_VALID a pulsos, como el wrapper AXI), ACTUALIZAR de todos y espera.
+    - Con probabilidad p_error el N_TOT_CYC escrito no coincide con la suma de los datos
+      (config_error lo detecta y el update se rechaza).
+    - Al final, SHUTDOWN hasta que se apagan todos los canales.
+    """
+
+    registros = dict.fromkeys(CAMPOS_REGISTROS, 0)
+
+    def escribir(duracion, estado=None, **cambios):
+        if estado is not None:
+            cambios["control"] = CODIGO_CONTROL[estado]
+        registros.update(cambios)
+        return duracion, tuple(registros[clave] for clave in CAMPOS_REGISTROS)
+
+    yield escribir(n_ceros_inicio)
+    periodo_prev = 0
+    for fase in range(n_fases):
+        # Reparto de los canales en grupos (-1: el canal no se toca en esta fase)
+        n_grupos = random.randint(1, n_max_grupos)
+        reparto = [random.randint(-1, n_grupos - 1) for _ in range(n_pwm)]
+        mascaras = [sum(1 << canal for canal, g in enumerate(reparto) if g == grupo) for grupo in range(n_grupos)]
+        mascaras = [mascara for mascara in mascaras if mascara]
+        if not mascaras:
+            continue
+
+        periodo = 0
+        for mascara in mascaras:
+            config = generar_config(fase, n_max_estados, n_max_dato, n_max_ciclos)
+            periodo = max(periodo, config["n_tot_cyc"])
+            n_tot_cyc = config["n_tot_cyc"] + (random.random() < p_error)
+
+            # APAGAR: se espera a que termine el ciclo en curso
+            if random.random() < p_apagar:
+                yield escribir(2*periodo_prev + 10, UC_APAGAR, direcciones=mascara)
+
+            yield escribir(1, UC_CONFIGURAR, direcciones=mascara, n_addr=config["n_addr"], n_tot_cyc=n_tot_cyc,
+                           pwm_init=config["pwm_init"])
+            for dato in config["wr_data"]:
+                yield escribir(1, wr_data=dato, wr_data_valid=1)
+                yield escribir(1, wr_data_valid=0)
+
+        # ACTUALIZAR tras dar tiempo a config_error a contar la última escritura. El cambio
+        #   se hace al final del ciclo en curso de cada canal
+        yield escribir(10, UC_IDLE)
+        yield escribir(10, UC_ACTUALIZAR, direcciones=sum(mascaras))
+        yield escribir(periodo_prev + random.randint(2, n_max_ciclos)*periodo, UC_IDLE)
+        periodo_prev = periodo
+
+    yield escribir(2*periodo_prev + 10, UC_SHUTDOWN, direcciones=(1 << n_pwm) - 1)
+    yield escribir(10, UC_IDLE)
+
+
+def generar_ficheros(directorio, n_fases, n_max_grupos, n_max_estados, n_max_dato, n_max_ciclos,
+                     formato="08x", eventos=True, sufijo="", **opciones):
+    """Genera un escenario aleatorio y exporta a directorio las entradas y las salidas de referencia."""
+
+    archivo_entradas = os.path.join(directorio, f"pwm_enjoyer_inputs{sufijo}.txt")
+    archivo_salidas = os.path.join(directorio, f"pwm_enjoyer_outputs_ref{sufijo}.txt")
+
+    simulador = SimuladorPwmEnjoyer()
+    n_filas = 0
+
+    with EscritorTxt(archivo_salidas, COLUMNAS_SALIDAS_ENJOYER, formato, eventos) as escritor_salidas, \
+         EscritorTxt(archivo_entradas, CAMPOS_REGISTROS, formato, eventos) as escritor_entradas:
+
+        for duracion, fila in generar_registros(n_fases, n_max_grupos, n_max_estados, n_max_dato, n_max_ciclos,
+                                                **opciones):
+            escritor_entradas.anadir({clave: [(valor, duracion, 0)] for clave, valor in zip(CAMPOS_REGISTROS, fila)})
+            # El modelo avanza hasta donde lo permiten las entradas ya generadas
+            simulador.anadir(duracion, fila)
+            n_filas += duracion
+            escritor_salidas.anadir(columnas_modelo(simulador.avanzar()))
+
+        escritor_salidas.anadir(columnas_modelo(simulador.avanzar(n_filas, final=True)))
+
+    return {"archivos": [archivo_entradas, archivo_salidas], "n_filas": n_filas}
+
+
+if __name__ == "__main__":
+
+    ruta = os.path.dirname(os.path.abspath(__file__))
+
+    # USER: Configurar ----------------------------------------
+    # Parámetros de cada configuración: los de PARAMETROS["normal"] o PARAMETROS["worst_case"]
+    parametros = {clave: valor for clave, valor in PARAMETROS["normal"].items() if clave != "n_config"}
+
+    # Número de fases (reparto de canales + configuración + update) y máximo de grupos por fase
+    n_fases = 10
+    n_max_grupos = 4
+
+    # Formato y modo eventos de los ficheros (C_HEX y C_EVENTS en pwm_enjoyer_autotest_tb)
+    formato = "08x"
+    eventos = True
+
+    # Semilla del generador aleatorio (None -> escenario distinto en cada ejecución)
+    semilla = None
+    # USER ----------------------------------------------------
+
+    random.seed(semilla)
+    resultado = generar_ficheros(ruta, n_fases, n_max_grupos, **parametros, formato=formato, eventos=eventos)
+    print(f"{resultado['n_filas']} ciclos de reloj")
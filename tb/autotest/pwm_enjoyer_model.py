@@ -0,0 +1,479 @@
+import os
+import copy
+import itertools
+
+import numpy as np
+
+from pwm_top_model import SimuladorPwmTop, ModeloPwmTop, CAMPOS_FILA, MASCARA, base_formato, leer_eventos
+from pwm_top_generator import EscritorTxt
+
+
+# Modelo de referencia de pwm_enjoyer (control_unit + config_error + G_PWM_N pwm_top) ciclo a ciclo.
+#   Los registros de los canales se guardan como matrices de NumPy (canal x campo): las escrituras de
+#   control_unit con REG_DIRECCIONES_I se aplican a todos los canales seleccionados a la vez y
+#   REG_ERRORES_O se calcula sobre los 32 canales en bloque. REG_REDUNDANCIAS_O es siempre 0: control_unit
+#   asigna C_CEROS_PWM a s_redundancias con y sin G_EN_REDUNDANCY (las combinaciones están comentadas).
+#   Los canales con el mismo estado comparten un único ModeloPwmTop (grupo). Un grupo se divide cuando una
+#   escritura selecciona parte de sus canales y los grupos se vuelven a fusionar en cuanto sus estados
+#   coinciden (p. ej. tras APAGAR o SHUTDOWN, o al reconfigurarlos igual). Si solo difiere el contenido de
+#   la memoria, el grupo guarda una variante por canal (MemoriaGrupo) y solo se separa si alguna lectura
+#   llega a ver datos distintos. Simular el módulo completo cuesta lo mismo que simular tantos canales
+#   como grupos y, entre eventos, solo dan un flanco completo los grupos a los que les toca.
+
+C_PWM_N = 32                # Número de módulos PWM (G_PWM_N)
+C_MEM_SIZE_MAX_N = 128      # Profundidad de memoria (G_MEM_SIZE_MAX_N)
+MASCARA_ADDR = (1 << 8) - 1     # WR_ADDR y N_ADDR de pwm_top: C_MEM_SIZE_MAX_L2 = 8 bits
+
+# Estados de control_unit (REG_CONTROL_I)
+UC_IDLE, UC_SHUTDOWN, UC_APAGAR, UC_ACTUALIZAR, UC_CONFIGURAR = range(5)
+CONTROL = {0b0001: UC_SHUTDOWN, 0b0010: UC_APAGAR, 0b0100: UC_ACTUALIZAR, 0b1000: UC_CONFIGURAR}
+
+# Registros de entrada y de salida, en el orden de pwm_enjoyer_autotest_tb
+CAMPOS_REGISTROS = ("direcciones", "control", "wr_data", "wr_data_valid", "n_addr", "n_tot_cyc", "pwm_init")
+COLUMNAS_SALIDAS_ENJOYER = ("pwms", "redundancias", "errores", "status")
+
+# Columnas de la matriz de entradas de los pwm_top (r_pwm_top_inputs): EN + campos de una fila de pwm_top
+CAMPOS_CANAL = ("en",) + CAMPOS_FILA
+E_EN, E_N_ADDR, E_N_TOT_CYC, E_PWM_INIT, E_WR_EN, E_WR_ADDR, E_WR_DATA, E_UPD_MEM = range(len(CAMPOS_CANAL))
+
+class MemoriaGrupo:
+    """
+    Memoria de un grupo de canales fusionados cuyas BRAM aún no coinciden: una variante (canales, dict)
+    por contenido. Se lee como un dict mientras todas las variantes coincidan en las direcciones leídas
+    (lo comprueba ModeloPwmEnjoyer antes de cada flanco) y las escrituras van a todas.
+    """
+
+    def __init__(self, variantes):
+        self.variantes = variantes
+
+    def get(self, direccion, defecto=0):
+        return self.variantes[0][1].get(direccion, defecto)
+
+    def __setitem__(self, direccion, valor):
+        for _, mem in self.variantes:
+            mem[direccion] = valor
+
+    def coinciden(self, direcciones):
+        """True si todas las variantes tienen el mismo contenido en las direcciones indicadas."""
+        primera = self.variantes[0][1]
+        return all(mem.get(d, 0) == primera.get(d, 0) for _, mem in self.variantes[1:] for d in direcciones)
+
+
+def a_palabras(matriz, n_pwm=C_PWM_N):
+    """Empaqueta una matriz de bits (canal o canal x segmento) en registros de 32 bits (bit i = canal i)."""
+
+    pesos = np.left_shift(np.uint64(1), np.arange(n_pwm, dtype=np.uint64))
+    return pesos @ np.asarray(matriz, dtype=np.uint64)
+
+
+def a_bits(palabras, n_pwm=C_PWM_N):
+    """Desempaqueta registros de 32 bits en una matriz de bits (canal x ...)."""
+
+    palabras = np.asarray(palabras, dtype=np.uint64)
+    desplazamientos = np.arange(n_pwm, dtype=np.uint64).reshape((n_pwm,) + (1,)*palabras.ndim)
+    return ((palabras >> desplazamientos) & np.uint64(1)).astype(np.uint8)
+
+
+class ModeloPwmEnjoyer:
+    """
+    Estado de pwm_enjoyer tras cada flanco de reloj. fila = tupla con los registros de CAMPOS_REGISTROS.
+    Mismo interfaz que ModeloPwmTop (flanco, saltar, salidas), para usarlo con SimuladorPwmTop.
+    """
+
+    def __init__(self, fila, mem_depth=C_MEM_SIZE_MAX_N, n_pwm=C_PWM_N):
+        self.fila = fila
+        self.n_pwm = n_pwm
+        self.canales = np.arange(n_pwm)
+        # control_unit: registros
+        self.r_direcciones = 0
+        self.r_control = 0
+        self.r_wr_data = 0
+        self.r_wr_data_valid = 0
+        self.r_n_addr = 0
+        self.r_n_tot_cyc = 0
+        self.r_pwm_init = 0
+        self.r_errores = np.zeros(n_pwm, dtype=np.int64)
+        self.r_status = 0
+        # control_unit: máquina de estados
+        self.estado_d1 = UC_IDLE
+        self.r_wr_addr = 0
+        self.s_status = 0
+        self.invalid_n_addr = 0
+        self.entradas = np.zeros((n_pwm, len(CAMPOS_CANAL)), dtype=np.int64)  # r_pwm_top_inputs
+        # config_error
+        self.cnt_n_addr = np.zeros(n_pwm, dtype=np.int64)
+        self.cnt_n_tot = np.zeros(n_pwm, dtype=np.int64)
+        self.wr_en_d1 = np.zeros(n_pwm, dtype=np.int64)
+        self.wr_en_d2 = np.zeros(n_pwm, dtype=np.int64)
+        # pwm_top: un modelo por grupo de canales idénticos
+        self.grupo = np.zeros(n_pwm, dtype=np.int64)
+        self.primero = np.zeros(1, dtype=np.int64)      # Un canal representativo de cada grupo
+        self.modelos = [ModeloPwmTop((0,)*len(CAMPOS_FILA), mem_depth)]
+        self.ventanas = [[0, 0, 0]]     # Por grupo: flancos en los que solo avanzan sus contadores y pasos
+        # control_unit en reposo: no cambia mientras no cambien los registros ni las salidas de los pwm_top
+        self.uc_fija = False
+        self.salidas_uc = None
+
+    # Salidas -----------------------------------------------------------------
+
+    def _salidas_canales(self):
+        """PWM, UNLOCKED y STATUS de cada canal, a partir de los de cada grupo."""
+
+        por_grupo = np.array([(m.pwm, m.unlocked(), m.status()) for m in self.modelos], dtype=np.int64)
+        return por_grupo[self.grupo].T
+
+    def salidas(self):
+        pwm = self._salidas_canales()[0]
+        return int(a_palabras(pwm, self.n_pwm)), 0, int(a_palabras(self.r_errores, self.n_pwm)), self.r_status
+
+    # control_unit + config_error ---------------------------------------------
+
+    def _foto_uc(self):
+        return (self.r_direcciones, self.r_control, self.r_wr_data, self.r_wr_data_valid, self.r_n_addr,
+                self.r_n_tot_cyc, self.r_pwm_init, self.r_status, self.estado_d1, self.r_wr_addr, self.s_status,
+                self.invalid_n_addr, self.r_errores.tobytes(),
+                self.entradas.tobytes(), self.cnt_n_addr.tobytes(), self.cnt_n_tot.tobytes(),
+                self.wr_en_d1.tobytes(), self.wr_en_d2.tobytes())
+
+    def _config_error(self):
+        """CONFIG_ERROR_O de los config_error de todos los canales."""
+
+        ent = self.entradas
+        error = ((self.cnt_n_addr != ent[:, E_N_ADDR]) | (self.cnt_n_tot != ent[:, E_N_TOT_CYC]) |
+                 (self.cnt_n_addr < 2) | (self.cnt_n_addr > C_MEM_SIZE_MAX_N) | (self.cnt_n_tot < 2))
+        return (error & (ent[:, E_EN] == 1)).astype(np.int64)
+
+    def _flanco_uc(self):
+        """
+        Flanco de control_unit y de los config_error con las salidas de los pwm_top anteriores al flanco.
+        Devuelve True si ha cambiado algún registro.
+        """
+
+        # El PWM de los canales no llega a ningún registro (REG_REDUNDANCIAS_O es siempre 0)
+        _, unlocked, status = self._salidas_canales()
+        salidas = (unlocked.tobytes(), status.tobytes())
+        if self.uc_fija and (salidas == self.salidas_uc):
+            return False
+        foto = self._foto_uc()
+        self.salidas_uc = salidas
+
+        ent = self.entradas
+        nuevo = ent.copy()
+        estado = CONTROL.get(self.r_control, UC_IDLE)
+        sel = ((self.r_direcciones >> self.canales) & 1).astype(bool)
+        config_error = self._config_error()
+        s_status = self.s_status
+        invalid_n_addr = self.invalid_n_addr
+
+        # P_FSM
+        if estado in (UC_SHUTDOWN, UC_APAGAR):
+            if estado == UC_APAGAR:
+                nuevo[sel] = 0
+            elif self.estado_d1 != UC_SHUTDOWN:
+                nuevo[:] = 0
+            if np.any(status == 0b11):
+                s_status = 0b011
+            elif np.any(status == 0b01):
+                s_status = 0b001
+            elif np.all(status == 0b00):
+                s_status = 0b000
+        elif (estado == UC_ACTUALIZAR) and sel.any():
+            if self.estado_d1 != UC_ACTUALIZAR:
+                if not self.r_errores.any():
+                    nuevo[sel, E_UPD_MEM] = 1
+                    s_status = 0b011
+                else:
+                    s_status = 0b100
+                self.r_wr_addr = 0
+            else:
+                nuevo[sel, E_UPD_MEM] = 0
+        elif estado == UC_CONFIGURAR:
+            if self.r_n_addr > 1:
+                invalid_n_addr = 0
+                activos = sel & (unlocked == 1)
+                nuevo[activos, E_EN] = 1
+                nuevo[activos, E_WR_EN] = 0
+                nuevo[activos, E_N_ADDR] = self.r_n_addr & MASCARA_ADDR
+                nuevo[activos, E_N_TOT_CYC] = self.r_n_tot_cyc
+                nuevo[activos, E_PWM_INIT] = self.r_pwm_init
+                if self.r_wr_data_valid and activos.any():
+                    nuevo[activos, E_WR_EN] = 1
+                    nuevo[activos, E_WR_ADDR] = self.r_wr_addr
+                    nuevo[activos, E_WR_DATA] = self.r_wr_data
+                    if self.r_wr_addr == ((self.r_n_addr - 1) & MASCARA):
+                        self.r_wr_addr = 0
+                    else:
+                        self.r_wr_addr = (self.r_wr_addr + 1) & MASCARA_ADDR
+                s_status = 0b010
+            else:
+                invalid_n_addr = 1
+
+        # P_REG
+        self.r_errores = config_error | (1 - unlocked) | self.invalid_n_addr
+        self.r_status = self.s_status
+        (self.r_direcciones, control, self.r_wr_data, wr_data_valid,
+         self.r_n_addr, self.r_n_tot_cyc, pwm_init) = self.fila
+        self.r_control = control & 0b1111
+        self.r_wr_data_valid = wr_data_valid & 1
+        self.r_pwm_init = pwm_init & 1
+        self.estado_d1 = estado
+        self.s_status = s_status
+        self.invalid_n_addr = invalid_n_addr
+
+        # config_error: P_EDGE y P_SUM
+        en = ent[:, E_EN] == 1
+        reinicio = (ent[:, E_WR_EN] == 1) & (self.wr_en_d1 == 0) & (ent[:, E_WR_ADDR] == 0)
+        suma = en & (self.wr_en_d1 == 1) & (self.wr_en_d2 == 0)
+        borrar = reinicio | ~en
+        self.cnt_n_addr = np.where(borrar, 0, np.where(suma, (self.cnt_n_addr + 1) & MASCARA_ADDR, self.cnt_n_addr))
+        self.cnt_n_tot = np.where(borrar, 0, np.where(suma, (self.cnt_n_tot + ent[:, E_WR_DATA]) & MASCARA,
+                                                      self.cnt_n_tot))
+        self.wr_en_d2 = self.wr_en_d1
+        self.wr_en_d1 = ent[:, E_WR_EN].copy()
+
+        self.entradas = nuevo
+        self.uc_fija = (self._foto_uc() == foto)
+        return not self.uc_fija
+
+    # pwm_top -----------------------------------------------------------------
+
+    def _separar_grupos(self):
+        """Divide los grupos cuyos canales van a recibir entradas distintas."""
+
+        claves = np.column_stack((self.grupo, self.entradas))
+        _, primero, grupo = np.unique(claves, axis=0, return_index=True, return_inverse=True)
+        modelos, usados = [], set()
+        for canal in primero:
+            g = int(self.grupo[canal])
+            modelos.append(copy.deepcopy(self.modelos[g]) if g in usados else self.modelos[g])
+            usados.add(g)
+        self._reagrupar(modelos, grupo.reshape(-1))
+
+    def _reagrupar(self, modelos, grupo):
+        """Aplica un nuevo reparto de canales en grupos y deja en cada MemoriaGrupo solo sus canales."""
+
+        self.modelos = modelos
+        self.grupo = grupo
+        self.primero = np.array([np.flatnonzero(grupo == g)[0] for g in range(len(modelos))], dtype=np.int64)
+        self.ventanas = [[0, 0, 0] for _ in modelos]
+        for g, modelo in enumerate(modelos):
+            if isinstance(modelo.mem, MemoriaGrupo):
+                propios = grupo == g
+                variantes = [(canales[propios[canales]], mem) for canales, mem in modelo.mem.variantes]
+                variantes = [(canales, mem) for canales, mem in variantes if len(canales)]
+                modelo.mem = MemoriaGrupo(variantes) if len(variantes) > 1 else variantes[0][1]
+
+    def _fusionar_grupos(self):
+        """Fusiona los grupos con las mismas entradas y el mismo estado (la memoria puede diferir)."""
+
+        _, clases = np.unique(self.entradas[self.primero], axis=0, return_inverse=True)
+        clases = clases.reshape(-1)
+        if len(set(clases.tolist())) == len(self.modelos):
+            return
+        destino = list(range(len(self.modelos)))
+        conservados = {}    # Por clase de entradas: (grupo, estado) de los grupos que se conservan
+        for g, modelo in enumerate(self.modelos):
+            estado = {clave: valor for clave, valor in modelo.__dict__.items() if clave != "mem"}
+            lista = conservados.setdefault(clases[g], [])
+            for h, estado_h in lista:
+                if estado == estado_h:
+                    destino[g] = h
+                    break
+            else:
+                lista.append((g, estado))
+        if destino == list(range(len(self.modelos))):
+            return
+
+        # Variantes de memoria de cada grupo resultante (las iguales se unen)
+        variantes = {}
+        for g, modelo in enumerate(self.modelos):
+            propias = modelo.mem.variantes if isinstance(modelo.mem, MemoriaGrupo) else \
+                [(np.flatnonzero(self.grupo == g), modelo.mem)]
+            lista = variantes.setdefault(destino[g], [])
+            for canales, mem in propias:
+                for k, (canales_k, mem_k) in enumerate(lista):
+                    if mem_k == mem:
+                        lista[k] = (np.union1d(canales_k, canales), mem_k)
+                        break
+                else:
+                    lista.append((canales, mem))
+        nuevos = sorted(set(destino))
+        indice = {g: i for i, g in enumerate(nuevos)}
+        modelos = []
+        for g in nuevos:
+            modelo = self.modelos[g]
+            lista = variantes[g]
+            modelo.mem = MemoriaGrupo(lista) if len(lista) > 1 else lista[0][1]
+            modelos.append(modelo)
+        self._reagrupar(modelos, np.array([indice[destino[g]] for g in self.grupo], dtype=np.int64))
+
+    def _separar_memorias(self, grupos):
+        """Separa por variantes de memoria los grupos indicados si su próximo flanco lee datos distintos."""
+
+        for g in grupos:
+            modelo = self.modelos[g]
+            if isinstance(modelo.mem, MemoriaGrupo):
+                direcciones = [d for puerto in modelo._direcciones() for d in puerto]
+                if not modelo.mem.coinciden(direcciones):
+                    memoria, modelo.mem = modelo.mem, None
+                    modelos, grupo = list(self.modelos), self.grupo.copy()
+                    for k, (canales, mem) in enumerate(memoria.variantes):
+                        nuevo = modelo if k == 0 else copy.deepcopy(modelo)
+                        nuevo.mem = mem
+                        if k:
+                            modelos.append(nuevo)
+                            grupo[canales] = len(modelos) - 1
+                    ventanas = self.ventanas
+                    self._reagrupar(modelos, grupo)
+                    self.ventanas[:len(ventanas)] = ventanas
+
+    def _flanco_canales(self, entradas_anteriores):
+        """Flanco de los pwm_top: muestrean las entradas anteriores y reciben las de control_unit."""
+
+        if not np.array_equal(self.entradas, entradas_anteriores):
+            self._separar_grupos()
+        self._separar_memorias(range(len(self.modelos)))
+        for modelo, canal in zip(self.modelos, self.primero):
+            entradas = self.entradas[canal]
+            modelo.flanco(tuple(int(x) for x in entradas[1:]), en=modelo.en, en_nuevo=int(entradas[E_EN]))
+        self.ventanas = [[0, 0, 0] for _ in self.modelos]
+        if len(self.modelos) > 1:
+            self._fusionar_grupos()
+
+    # Flanco de reloj ---------------------------------------------------------
+
+    def flanco(self, fila_nueva):
+        """Flanco de subida: los registros muestrean self.fila y el testbench aplica fila_nueva."""
+
+        entradas = self.entradas
+        self._flanco_uc()
+        self._flanco_canales(entradas)
+        if fila_nueva != self.fila:
+            self.fila = fila_nueva
+            self.uc_fija = False
+
+    def saltar(self, n):
+        """Intenta avanzar hasta n flancos con los registros fijos. Devuelve los flancos avanzados (>= 1)."""
+
+        entradas = self.entradas
+        if self._flanco_uc() or (n == 1):
+            self._flanco_canales(entradas)
+            return 1
+        # control_unit no cambia: los pwm_top tienen las entradas fijas. Solo dan un flanco completo los grupos
+        #   cuya ventana de contadores se ha agotado; el resto avanza sus contadores. Se salta lo que permitan todos
+        self._separar_memorias([g for g, ventana in enumerate(self.ventanas) if ventana[0] == 0])
+        for modelo, ventana in zip(self.modelos, self.ventanas):
+            if ventana[0] == 0:
+                ventana[:] = modelo.flanco_fijo(n - 1, en=modelo.en)
+            else:
+                modelo.avanzar_contadores(1, ventana[1], ventana[2])
+                ventana[0] -= 1
+        salto = min(n - 1, min(ventana[0] for ventana in self.ventanas))
+        for modelo, ventana in zip(self.modelos, self.ventanas):
+            modelo.avanzar_contadores(salto, ventana[1], ventana[2])
+            ventana[0] -= salto
+        return 1 + salto
+
+
+class SimuladorPwmEnjoyer(SimuladorPwmTop):
+    """SimuladorPwmTop con ModeloPwmEnjoyer: eventos de entrada (duración, registros) y de salida
+    (duración, (pwms, redundancias, errores, status))."""
+
+    def __init__(self, mem_depth=C_MEM_SIZE_MAX_N, n_pwm=C_PWM_N):
+        super().__init__(mem_depth)
+        self.n_pwm = n_pwm
+
+    def _crear_modelo(self, fila):
+        return ModeloPwmEnjoyer(fila, self.mem_depth, self.n_pwm)
+
+
+def simular(eventos, n_filas, mem_depth=C_MEM_SIZE_MAX_N, n_pwm=C_PWM_N):
+    """Genera los eventos de salida de las n_filas primeras filas a partir de los eventos de entrada."""
+
+    simulador = SimuladorPwmEnjoyer(mem_depth, n_pwm)
+    for duracion, fila in eventos:
+        simulador.anadir(duracion, fila)
+        yield from simulador.avanzar(n_filas)
+    yield from simulador.avanzar(n_filas, final=True)
+
+
+def matriz_segmentos(eventos_salida, n_pwm=C_PWM_N):
+    """
+    Salidas del modelo en bloque: duración de cada segmento y, por cada registro de
+    COLUMNAS_SALIDAS_ENJOYER, una matriz (canal x segmento) con sus bits (STATUS se deja como palabra).
+    """
+
+    duraciones, salidas = zip(*eventos_salida)
+    palabras = np.array(salidas, dtype=np.uint64).T
+    matrices = {clave: a_bits(fila, n_pwm) for clave, fila in zip(COLUMNAS_SALIDAS_ENJOYER, palabras)}
+    matrices["status"] = palabras[-1]
+    return np.array(duraciones, dtype=np.int64), matrices
+
+
+def columnas_modelo(eventos_salida):
+    """Columnas segmentadas de pwm_enjoyer_outputs_ref a partir de eventos de salida del modelo."""
+
+    columnas = {clave: [] for clave in COLUMNAS_SALIDAS_ENJOYER}
+    for duracion, salida in eventos_salida:
+        for clave, valor in zip(COLUMNAS_SALIDAS_ENJOYER, salida):
+            columnas[clave].append((valor, duracion, 0))
+    return columnas
+
+
+def exportar_salidas(eventos_salida, archivo, formato=None, eventos=False):
+    """Escribe las salidas del modelo con las columnas de pwm_enjoyer_outputs_ref."""
+
+    with EscritorTxt(archivo, COLUMNAS_SALIDAS_ENJOYER, formato, eventos) as escritor:
+        for evento in eventos_salida:
+            escritor.anadir(columnas_modelo([evento]))
+
+
+def leer_registros(archivo, eventos=False, base=2):
+    """Lee un fichero de entradas de pwm_enjoyer_autotest_tb como eventos (duración, registros)."""
+
+    yield from leer_eventos(archivo, eventos, base, CAMPOS_REGISTROS, CAMPOS_REGISTROS)
+
+
+def comparar_salidas(eventos_salida, archivo, eventos=False, base=2, columnas=COLUMNAS_SALIDAS_ENJOYER):
+    """Compara las columnas indicadas con un fichero de salidas. Devuelve la primera fila distinta o None."""
+
+    indices = [COLUMNAS_SALIDAS_ENJOYER.index(clave) for clave in columnas]
+    with open(archivo) as f:
+        filas = (linea.split() for linea in f if linea.strip())
+        if eventos:
+            filas = itertools.chain.from_iterable(itertools.repeat(v[1:], int(v[0])) for v in filas)
+        fila = 0
+        for duracion, salida in eventos_salida:
+            esperado = [salida[i] for i in indices]
+            for valores in itertools.islice(filas, duracion):
+                if [int(valores[i], base) for i in indices] != esperado:
+                    return fila
+                fila += 1
+    return None
+
+
+if __name__ == "__main__":
+
+    ruta = os.path.dirname(os.path.abspath(__file__))
+
+    # USER: Configurar ----------------------------------------
+    # Entradas de pwm_enjoyer_autotest_tb y salidas de la simulación con las que contrastar el modelo
+    archivo_entradas = os.path.join(ruta, "pwm_enjoyer_inputs.txt")
+    archivo_salidas = os.path.join(ruta, "pwm_enjoyer_outputs.txt")
+    formato = "08x"         # Formato de ambos ficheros ("032b", "08x"...)
+    eventos = True          # Ficheros en modo eventos (C_EVENTS = true)
+    # USER ----------------------------------------------------
+
+    base = base_formato(formato)
+    with open(archivo_salidas) as f:
+        if eventos:
+            n_filas = sum(int(linea.split()[0]) for linea in f if linea.strip())
+        else:
+            n_filas = sum(1 for linea in f if linea.strip())
+
+    fila = comparar_salidas(simular(leer_registros(archivo_entradas, eventos, base), n_filas), archivo_salidas,
+                            eventos, base)
+    if fila is None:
+        print(f"Modelo == {archivo_salidas} ({n_filas} filas)")
+    else:
+        print(f"Modelo != {archivo_salidas} en la fila {fila}")
@@ -0,0 +1,270 @@
+import os
+import sys
+import json
+import time
+import random
+import platform
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from pwm_top_generator import (PARAMETROS, generar_configs, generar_salidas, generar_entradas, calcular_offsets,
+                               seg_longitud, seg_expandir, int_a_bin, exportar_txt)
+from wavedrom_to_txt import tabular_datos, exportar_txt as exportar_txt_wavedrom
+
+
+# Benchmark de las herramientas de generación de vectores del autotest.
+#   Cada caso (conjunto de parámetros) se mide en un proceso nuevo para que el pico de RSS sea solo suyo.
+#   Dentro de un caso el pico es acumulado (lo arrastran las funciones siguientes), así que de cada
+#   función se guarda también cuánto lo ha subido. Cada función cuenta su trabajo en su propia unidad
+#   (configuraciones, segmentos, valores, filas, celdas): muestras/s solo se compara entre ejecuciones.
+#   Los resultados se añaden como una línea JSON por ejecución a un fichero, y cada ejecución se compara
+#   con la anterior para que las regresiones se vean de un vistazo.
+
+CLAVES_PARAMETROS = ("n_config", "n_max_estados", "n_max_dato", "n_max_ciclos")
+
+
+def barrido(n_puntos=3, base=PARAMETROS["normal"], tope=PARAMETROS["worst_case"]):
+    """
+    Casos del barrido: cada parámetro por separado desde base hasta tope (progresión geométrica,
+    el resto en base), más el caso tope completo.
+    """
+
+    casos = {"normal": dict(base)}
+    for clave in CLAVES_PARAMETROS:
+        for i in range(1, n_puntos + 1):
+            valor = round(base[clave] * (tope[clave] / base[clave])**(i / n_puntos))
+            if valor != base[clave]:
+                casos[f"{clave}={valor}"] = {**base, clave: valor}
+    casos["worst_case"] = dict(tope)
+    return casos
+
+
+def pico_rss():
+    """Pico de memoria residente del proceso en MB (ru_maxrss está en KB en Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def medir(resultados, funcion, llamada, muestras=None, unidad=None, **extra):
+    """
+    Ejecuta llamada(), añade su medida a resultados y devuelve lo que devuelva. muestras(valor) cuenta
+    el trabajo hecho en la unidad indicada. pico_rss_mb es el pico acumulado del proceso e
+    incremento_rss_mb lo que lo ha subido esta llamada (0 si no ha superado el de las anteriores).
+    """
+
+    rss_antes = pico_rss()
+    inicio = time.perf_counter()
+    valor = llamada()
+    segundos = time.perf_counter() - inicio
+    n = muestras(valor) if muestras else None
+    resultados.append({"funcion": funcion,
+                       "segundos": segundos,
+                       "muestras": n,
+                       "unidad": unidad,
+                       "muestras_s": (n / segundos) if (n and segundos) else None,
+                       "pico_rss_mb": pico_rss(),
+                       "incremento_rss_mb": pico_rss() - rss_antes,
+                       **extra})
+    return valor
+
+
+def n_segmentos(lista):
+    """Segmentos de una lista de diccionarios de columnas segmentadas."""
+    return sum(len(columna) for dic in lista for columna in dic.values())
+
+
+def medir_caso(nombre, parametros, semilla, n_max_muestras, formato):
+    """Mide las funciones del generador de pwm_top con un conjunto de parámetros. Se ejecuta en un proceso del pool."""
+
+    random.seed(semilla)
+    resultados = []
+
+    # Configuraciones
+    config_list = medir(resultados, "generar_config",
+                        lambda: generar_configs(**parametros), len, "configs")
+
+    # Salidas y entradas como columnas segmentadas: el trabajo son los segmentos generados, no las filas
+    #   que describen (un tramo constante de millones de filas es un solo segmento)
+    salidas = medir(resultados, "generar_salidas",
+                    lambda: [generar_salidas(config) for config in config_list],
+                    n_segmentos, "segmentos")
+
+    def entradas():
+        # Mismo encadenamiento que generar_escenario, sin las salidas
+        n_ceros_inicio = 5
+        offsets = calcular_offsets(config_list, n_ceros_inicio + 3 + config_list[0]["first_upd"])
+        inicio = n_ceros_inicio
+        lista = []
+        for n, config in enumerate(config_list):
+            config_prev = config_list[n - 1] if n > 0 else {}
+            config_next = config_list[n + 1] if n < (len(config_list) - 1) else {"n_addr": 0}
+            lista.append(generar_entradas(config, n, offsets, inicio, config_prev, config_next))
+            inicio += seg_longitud(lista[-1]["n_addr"])
+        return lista
+
+    medir(resultados, "generar_entradas", entradas, n_segmentos, "segmentos")
+
+    # Conversión y exportación de como mucho n_max_muestras filas de las salidas
+    dic = {clave: [] for clave in salidas[0]}
+    filas = 0
+    for dic_config in salidas:
+        for clave, columna in dic_config.items():
+            dic[clave] += columna
+        filas += seg_longitud(dic_config["pwm"])
+        if filas >= n_max_muestras:
+            break
+    filas = min(filas, n_max_muestras)
+    dic = {clave: recortar(columna, filas) for clave, columna in dic.items()}
+
+    valores = list(seg_expandir(dic["steps"]))
+    medir(resultados, "int_a_bin", lambda valores=valores: int_a_bin(valores, formato), len, "valores",
+          formato=formato)
+    del valores
+
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, "salidas.txt")
+        medir(resultados, "exportar_txt", lambda: exportar_txt(dic, archivo, formato), lambda _: filas, "filas",
+              formato=formato)
+        resultados[-1]["bytes"] = os.path.getsize(archivo)
+
+    for resultado in resultados:
+        resultado.update(caso=nombre, parametros=parametros)
+    return resultados
+
+
+def recortar(columna, n):
+    """Primeras n muestras de una columna segmentada."""
+
+    recortada = []
+    for valor, longitud, paso in columna:
+        if n <= 0:
+            break
+        recortada.append((valor, min(longitud, n), paso))
+        n -= longitud
+    return recortada
+
+
+def medir_wavedrom(n_ciclos, n_senales, semilla, formato="08b"):
+    """Mide la conversión de wavedrom_to_txt con un diagrama sintético de n_senales x n_ciclos."""
+
+    random.seed(semilla)
+    signals = [{"nombre": "CLK", "datos": "p" + "."*(n_ciclos - 1), "info": []}]
+    for i in range(n_senales - 1):
+        wave = "".join(random.choice("2....") for _ in range(n_ciclos))
+        wave = "2" + wave[1:]
+        signals.append({"nombre": f"S{i}", "datos": wave, "info": [str(random.randint(0, 255))
+                                                                    for _ in range(wave.count("2"))]})
+
+    resultados = []
+    tabla = medir(resultados, "tabular_datos", lambda: [tabular_datos(signal, formato) for signal in signals],
+                  lambda _: n_ciclos*n_senales, "celdas", formato=formato)
+    with tempfile.TemporaryDirectory() as directorio:
+        medir(resultados, "wavedrom.exportar_txt",
+              lambda: exportar_txt_wavedrom(tabla, os.path.join(directorio, "inputs.txt")), lambda _: n_ciclos,
+              "filas", formato=formato)
+
+    parametros = {"n_ciclos": n_ciclos, "n_senales": n_senales}
+    for resultado in resultados:
+        resultado.update(caso=f"wavedrom_{n_ciclos}", parametros=parametros)
+    return resultados
+
+
+def version_repo(ruta):
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ruta, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(casos, semilla, n_max_muestras, formato, ciclos_wavedrom=(), n_procesos=1):
+    """
+    Mide todos los casos (un proceso nuevo por caso) y devuelve el registro de la ejecución.
+    Con n_procesos > 1 los casos se solapan y los tiempos se influyen entre sí.
+    """
+
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=n_procesos, mp_context=contexto, max_tasks_per_child=1) as pool:
+        futuros = [pool.submit(medir_caso, nombre, parametros, semilla, n_max_muestras, formato)
+                   for nombre, parametros in casos.items()]
+        futuros += [pool.submit(medir_wavedrom, n_ciclos, 20, semilla) for n_ciclos in ciclos_wavedrom]
+        resultados = [resultado for futuro in futuros for resultado in futuro.result()]
+
+    return {"fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": version_repo(os.path.dirname(os.path.abspath(__file__))),
+            "python": platform.python_version(),
+            "maquina": platform.node(),
+            "semilla": semilla,
+            "n_max_muestras": n_max_muestras,
+            "resultados": resultados}
+
+
+def leer_ultima(archivo):
+    """Último registro del fichero de resultados, o None."""
+
+    if not os.path.exists(archivo):
+        return None
+    ultima = None
+    with open(archivo) as f:
+        for linea in f:
+            if linea.strip():
+                ultima = linea
+    return json.loads(ultima) if ultima else None
+
+
+def imprimir(registro, anterior=None):
+    """
+    Tabla de resultados; con anterior, relación de muestras/s respecto a la ejecución anterior (solo si
+    se midieron en la misma unidad). RSS acum.: pico del proceso hasta esa función; +RSS: lo que la subió.
+    """
+
+    previos = {}
+    if anterior:
+        previos = {(r["caso"], r["funcion"]): r for r in anterior["resultados"]}
+
+    print(f"{'caso':<28} {'función':<22} {'segundos':>9} {'muestras/s':>12} {'unidad':<10} {'RSS acum.':>9} "
+          f"{'+RSS':>7} {'vs ant.':>8}")
+    for r in registro["resultados"]:
+        relacion = ""
+        previo = previos.get((r["caso"], r["funcion"]))
+        if previo and (previo.get("unidad") == r["unidad"]) and previo["muestras_s"] and r["muestras_s"]:
+            relacion = f"{r['muestras_s'] / previo['muestras_s']:.2f}x"
+        muestras_s = f"{r['muestras_s']:.3g}" if r["muestras_s"] else "-"
+        print(f"{r['caso']:<28} {r['funcion']:<22} {r['segundos']:>9.3f} {muestras_s:>12} {r['unidad'] or '-':<10} "
+              f"{r['pico_rss_mb']:>9.1f} {r['incremento_rss_mb']:>7.1f} {relacion:>8}")
+
+
+if __name__ == "__main__":
+
+    ruta = os.path.dirname(os.path.abspath(__file__))
+
+    # USER: Configurar ----------------------------------------
+    # Casos: barrido de cada parámetro desde "normal" hasta "worst_case" con n_puntos por parámetro
+    n_puntos = 2
+    casos = barrido(n_puntos)
+
+    # Filas máximas que se convierten con int_a_bin y exportar_txt (el worst_case completo no cabe en disco)
+    n_max_muestras = 1_000_000
+    formato = "032b"
+
+    # Longitudes de los diagramas sintéticos de wavedrom_to_txt (20 señales)
+    ciclos_wavedrom = (1_000, 100_000)
+
+    # Semilla común a todos los casos y procesos en paralelo (1 -> tiempos sin interferencias)
+    semilla = 1
+    n_procesos = 1
+
+    # Fichero de resultados: una línea JSON por ejecución
+    archivo_resultados = os.path.join(ruta, "benchmark_resultados.jsonl")
+    # USER ----------------------------------------------------
+
+    if len(sys.argv) > 1:   # Selección de casos por nombre
+        casos = {nombre: parametros for nombre, parametros in casos.items() if nombre in sys.argv[1:]}
+
+    registro = ejecutar(casos, semilla, n_max_muestras, formato, ciclos_wavedrom, n_procesos)
+    imprimir(registro, leer_ultima(archivo_resultados))
+    with open(archivo_resultados, "a") as f:
+        f.write(json.dumps(registro) + "\n")
+    print(f"Resultados añadidos a {archivo_resultados}")
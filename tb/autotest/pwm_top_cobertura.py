@@ -0,0 +1,287 @@
+import os
+import sys
+import json
+import random
+import itertools
+from collections import Counter
+
+from pwm_top_generator import PARAMETROS, N_TOT_CYC_MIN, calcular_offsets, generar_ficheros
+from pwm_top_io_check import leer_escenario
+
+
+# Generación de escenarios de pwm_top dirigida por cobertura.
+#   generar_config y generar_entradas solo llegan a los casos límite por probabilidad (dato 1 al principio
+#   o al final en un 25 %, update y PWM_INIT al azar), a costa de simulaciones muy largas. Aquí se define un
+#   modelo de cobertura (bins) y se eligen de forma voraz, entre configuraciones candidatas mínimas, las que
+#   cierran más bins pendientes por ciclo de reloj simulado.
+#   Uso: python pwm_top_cobertura.py [escenario.json]  (con escenario, solo se informa de su cobertura)
+
+# Bins (grupo, valor). El update de cada configuración (salvo la primera) se mide en pasos hasta el final
+#   del ciclo de la anterior: N (0), N-1 (1), N-3 (3, el último posible), 1 (N - 1) u otro intermedio
+BINS = (("n_addr", "mínimo"), ("n_addr", "máximo"),
+        ("paridad", "par"), ("paridad", "impar"),
+        ("primer estado", "= 1"), ("primer estado", "> 1"),
+        ("último estado", "= 1"), ("último estado", "> 1"),
+        ("pwm_init x paridad", "0 par"), ("pwm_init x paridad", "0 impar"),
+        ("pwm_init x paridad", "1 par"), ("pwm_init x paridad", "1 impar"),
+        ("update", "paso N"), ("update", "paso N-1"), ("update", "paso N-3"), ("update", "paso 1"),
+        ("update", "intermedio"))
+
+N_CEROS_INICIO = 5  # Como en generar_ficheros
+
+
+def bins_update(upd_fin, n_tot_cyc_prev):
+    """Bins del update a upd_fin pasos del final del ciclo de la configuración anterior."""
+
+    pasos = ((0, "paso N"), (1, "paso N-1"), (3, "paso N-3"), (n_tot_cyc_prev - 1, "paso 1"))
+    bins = {("update", nombre) for valor, nombre in pasos if upd_fin == valor}
+    return bins or {("update", "intermedio")}
+
+
+def bins_config(config, n_max_estados, upd_fin=None, n_tot_cyc_prev=None):
+    """Bins que cubre una configuración. Sin upd_fin (primera configuración) no cubre ningún bin de update."""
+
+    n_addr, data = config["n_addr"], config["wr_data"]
+    paridad = "par" if n_addr % 2 == 0 else "impar"
+    bins = {("paridad", paridad),
+            ("primer estado", "= 1" if data[0] == 1 else "> 1"),
+            ("último estado", "= 1" if data[-1] == 1 else "> 1"),
+            ("pwm_init x paridad", f"{config['pwm_init']} {paridad}")}
+    if n_addr == 2:
+        bins.add(("n_addr", "mínimo"))
+    if n_addr == n_max_estados:
+        bins.add(("n_addr", "máximo"))
+    if upd_fin is not None:
+        bins |= bins_update(upd_fin, n_tot_cyc_prev)
+    return bins
+
+
+def cobertura(config_list, n_max_estados, upds_fin):
+    """Veces que se cubre cada bin. upds_fin: pasos del update al final del ciclo anterior por configuración."""
+
+    cuenta = Counter({bin_: 0 for bin_ in BINS})
+    for n, (config, upd_fin) in enumerate(zip(config_list, upds_fin)):
+        n_tot_cyc_prev = config_list[n - 1]["n_tot_cyc"] if n > 0 else None
+        cuenta.update(bins_config(config, n_max_estados, upd_fin if n > 0 else None, n_tot_cyc_prev))
+    return cuenta
+
+
+def upds_fin_escenario(escenario):
+    """upd_fin de cada configuración de un escenario (leer_escenario), a partir de los pulsos de UPD_MEM."""
+
+    # Trozo n: entradas de la configuración n, con su update, tras los ceros del inicio
+    configs, offsets = escenario["configs"], escenario["offsets"]
+    upds = []
+    pos = escenario["n_ceros_inicio"]
+    for trozo in escenario["entradas"]:
+        for valor, longitud, _ in trozo["upd_mem"]:
+            if valor:
+                upds.append(pos)
+            pos += longitud
+
+    upds_fin = [None]
+    for n, upd in enumerate(upds[1:len(configs)], 1):
+        n_tot_cyc = configs[n - 1]["n_tot_cyc"]
+        upds_fin.append(n_tot_cyc - 1 - (upd - offsets[n - 1]) % n_tot_cyc)
+    return upds_fin
+
+
+def ciclos_reloj(config_list, n_ceros_inicio=N_CEROS_INICIO):
+    """Ciclos de reloj simulados por el escenario (filas del fichero de salidas)."""
+
+    offsets = calcular_offsets(config_list, n_ceros_inicio + 3 + config_list[0]["first_upd"])
+    return offsets[-1] + config_list[-1]["n_tot_cyc"]*config_list[-1]["ciclos"]
+
+
+def candidatos(n_max_estados, n_max_dato):
+    """
+    Configuraciones mínimas (4 ciclos, estados de 1 paso salvo el primero y el último, de 1 o 2) con
+    N_ADDR en los extremos y sus vecinos de la otra paridad, y los dos PWM_INIT.
+    """
+
+    lista = []
+    for n_addr in sorted({2, 3, n_max_estados - 1, n_max_estados} & set(range(2, n_max_estados + 1))):
+        for primero, ultimo in itertools.product((1, 2), repeat=2):
+            data = [1]*n_addr
+            data[0], data[-1] = primero, ultimo
+
+            # Si no se llega a N_TOT_CYC_MIN, la diferencia se suma a un estado que no tenga que ser 1
+            deficit = N_TOT_CYC_MIN - sum(data)
+            if deficit > 0:
+                ajustables = list(range(1, n_addr - 1)) + [i for i, dato in ((0, primero), (n_addr - 1, ultimo))
+                                                           if dato > 1]
+                if not ajustables:
+                    continue
+                data[ajustables[0]] += deficit
+            if max(data) > n_max_dato:
+                continue
+
+            for init in (0, 1):
+                lista.append({"n_addr": n_addr,
+                              "wr_addr": list(range(n_addr)),
+                              "wr_data": list(data),
+                              "pwm_init": init,
+                              "ciclos": 4,
+                              "n_tot_cyc": sum(data)})
+    return lista
+
+
+def opciones_update(config_prev):
+    """Valores de upd_fin que tiene sentido forzar tras config_prev: uno por bin de update alcanzable."""
+
+    n_tot_cyc = config_prev["n_tot_cyc"]
+    opciones = {0, 1, 3, n_tot_cyc - 1}
+    if n_tot_cyc >= 6:
+        opciones.add(4)     # Intermedio
+    return sorted(opciones)
+
+
+def ciclos_necesarios(config_prev, n_addr, upd_fin):
+    """
+    Ciclos mínimos de la configuración anterior para que, con el update forzado a upd_fin, las entradas
+    de la siguiente (N_ADDR escrituras y el update) quepan tras su paso 2 (ver generar_entradas).
+    """
+
+    # posicion_update - offset = (ciclo - 1)*N + N - upd_fin - 1 >= n_addr + 2, con ciclo = ciclos - k
+    n_tot_cyc = config_prev["n_tot_cyc"]
+    k = 2 if upd_fin <= 1 else 1
+    return max(config_prev["ciclos"], k + -(-(n_addr + upd_fin + 3) // n_tot_cyc))
+
+
+def pasos(seleccion, candidatos_, n_max_ciclos):
+    """Posibles siguientes configuraciones: (config, upd_fin, ciclos de la anterior, coste en ciclos de reloj)."""
+
+    for candidato in candidatos_:
+        if not seleccion:
+            # Primera configuración: el update va lo antes posible tras las escrituras
+            first_upd = candidato["n_addr"] + 1
+            yield {**candidato, "first_upd": first_upd}, None, None, \
+                candidato["n_tot_cyc"]*candidato["ciclos"] + 3 + first_upd
+            continue
+        prev = seleccion[-1]
+        for upd_fin in opciones_update(prev):
+            ciclos_prev = ciclos_necesarios(prev, candidato["n_addr"], upd_fin)
+            if ciclos_prev > n_max_ciclos:
+                continue
+            coste = (ciclos_prev - prev["ciclos"])*prev["n_tot_cyc"] + candidato["n_tot_cyc"]*candidato["ciclos"]
+            yield {**candidato, "first_upd": 0, "upd_fin": upd_fin}, upd_fin, ciclos_prev, coste
+
+
+def anadir(seleccion, config, ciclos_prev):
+    """Añade una configuración a la selección, alargando la anterior si hace falta."""
+
+    if ciclos_prev is not None:
+        seleccion[-1]["ciclos"] = ciclos_prev
+    seleccion.append({"n_config": len(seleccion) + 1, **config})
+
+
+def seleccionar_configs(n_max_estados, n_max_dato, n_max_ciclos):
+    """
+    Selección voraz: en cada paso se añade la configuración candidata (con su upd_fin) que cubre más bins
+    pendientes por ciclo de reloj añadido. Si ninguna cubre nada nuevo (p. ej. el bin intermedio del
+    update necesita una anterior de N_TOT_CYC >= 6) se mira un paso más allá. Devuelve la lista de
+    configuraciones, lista para generar_ficheros(configs=...).
+    """
+
+    candidatos_ = candidatos(n_max_estados, n_max_dato)
+    seleccion = []
+    pendientes = set(BINS)
+
+    def mejor(seleccion):
+        opciones = []
+        for config, upd_fin, ciclos_prev, coste in pasos(seleccion, candidatos_, n_max_ciclos):
+            n_tot_cyc_prev = seleccion[-1]["n_tot_cyc"] if seleccion else None
+            nuevos = len(bins_config(config, n_max_estados, upd_fin, n_tot_cyc_prev) & pendientes)
+            if nuevos:
+                opciones.append((nuevos / coste, -coste, config, ciclos_prev))
+        return max(opciones, key=lambda opcion: opcion[:2], default=None)
+
+    while pendientes:
+        paso = mejor(seleccion)
+        if paso:
+            _, _, config, ciclos_prev = paso
+            anadir(seleccion, config, ciclos_prev)
+        else:
+            # Dos pasos: el primero no cubre nada pero hace alcanzable algún bin
+            dobles = []
+            for config, _, ciclos_prev, coste in pasos(seleccion, candidatos_, n_max_ciclos):
+                prueba = [dict(config_sel) for config_sel in seleccion]
+                anadir(prueba, config, ciclos_prev)
+                segundo = mejor(prueba)
+                if segundo:
+                    coste_total = coste + (-segundo[1])
+                    dobles.append((segundo[0]*(-segundo[1]) / coste_total, -coste_total, config, ciclos_prev))
+            if not dobles:
+                break   # Los bins pendientes no son alcanzables con estos parámetros
+            _, _, config, ciclos_prev = max(dobles, key=lambda opcion: opcion[:2])
+            anadir(seleccion, config, ciclos_prev)
+            continue
+
+        pendientes -= bins_config(seleccion[-1], n_max_estados, seleccion[-1].get("upd_fin"),
+                                  seleccion[-2]["n_tot_cyc"] if len(seleccion) > 1 else None)
+
+    return seleccion
+
+
+def informe_cobertura(cuenta, ciclos, archivo=None):
+    """Imprime la cobertura (veces por bin) y, con archivo, la guarda en JSON. Devuelve el informe."""
+
+    cubiertos = sum(1 for bin_ in BINS if cuenta[bin_])
+    print(f"{'grupo':<20} {'bin':<12} {'veces':>8}")
+    for grupo, valor in BINS:
+        veces = cuenta[(grupo, valor)]
+        print(f"{grupo:<20} {valor:<12} {veces:>8}{'' if veces else '   SIN CUBRIR'}")
+    print(f"Cobertura: {cubiertos}/{len(BINS)} bins ({100*cubiertos/len(BINS):.0f} %) en {ciclos} ciclos de reloj")
+
+    informe = {"ciclos_reloj": ciclos,
+               "cubiertos": cubiertos,
+               "total": len(BINS),
+               "bins": {f"{grupo}: {valor}": cuenta[(grupo, valor)] for grupo, valor in BINS}}
+    if archivo:
+        with open(archivo, "w") as f:
+            json.dump(informe, f, indent=4, ensure_ascii=False)
+        print(f"{archivo} creado correctamente.")
+    return informe
+
+
+def cobertura_escenario(archivo_escenario, n_max_estados):
+    """Cobertura de un escenario ya generado (pwm_top_escenario<sufijo>.json) y sus ciclos de reloj."""
+
+    escenario = leer_escenario(archivo_escenario)
+    cuenta = cobertura(escenario["configs"], n_max_estados, upds_fin_escenario(escenario))
+    return cuenta, ciclos_reloj(escenario["configs"], escenario["n_ceros_inicio"])
+
+
+if __name__ == "__main__":
+
+    ruta = os.path.dirname(os.path.abspath(__file__))
+
+    # USER: Configurar ----------------------------------------
+    # Parámetros que definen los extremos (n_max_estados, n_max_dato) y el tope de ciclos por configuración
+    parametros = PARAMETROS["normal"]
+
+    # Opciones de generar_ficheros (ver pwm_top_generator)
+    formato = "032b"
+    eventos = False
+    modelo = True
+    sufijo = "_COB"
+
+    # Semilla: solo afecta al fin de las entradas de cada configuración (las escrituras y updates son fijos)
+    semilla = 1
+    # USER ----------------------------------------------------
+
+    if len(sys.argv) > 1:   # Cobertura de un escenario existente
+        cuenta, ciclos = cobertura_escenario(sys.argv[1], parametros["n_max_estados"])
+        informe_cobertura(cuenta, ciclos)
+        sys.exit(0)
+
+    config_list = seleccionar_configs(parametros["n_max_estados"], parametros["n_max_dato"],
+                                      parametros["n_max_ciclos"])
+    random.seed(semilla)
+    resultado = generar_ficheros(ruta, **{**parametros, "n_config": len(config_list)}, formato=formato,
+                                 eventos=eventos, modelo=modelo, sufijo=sufijo, configs=config_list)
+
+    # Cobertura medida sobre el escenario generado (posiciones reales de los updates)
+    cuenta, ciclos = cobertura_escenario(os.path.join(ruta, f"pwm_top_escenario{sufijo}.json"),
+                                         parametros["n_max_estados"])
+    informe_cobertura(cuenta, ciclos, os.path.join(ruta, f"pwm_top_cobertura{sufijo}.json"))
@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import bisect
+import itertools
+
+import numpy as np
+
+from pwm_top_generator import COLUMNAS_SALIDAS, calcular_offsets, seg_anadir
+from pwm_top_model import base_formato
+from comparador import leer_bloques
+
+
+# Consulta analítica de las salidas de referencia de pwm_top en cualquier ciclo de reloj, sin generar
+#   ninguna muestra: la configuración sale de las sumas prefijas de N_TOT_CYC*ciclos, el ciclo y el step
+#   de una división y el estado de una búsqueda binaria en la suma acumulada de WR_DATA. Permite
+#   comprobar por muestreo simulaciones del worst_case cuyo pwm_top_outputs_ref.txt no cabría en disco.
+#   Uso: python pwm_top_consulta.py [escenario.json] [t ...]  (sin t, comprueba las salidas simuladas)
+
+
+class ReferenciaPwmTop:
+    """
+    PWM y UNLOCKED esperados en cada fila t del fichero de salidas (ciclo de reloj desde el inicio),
+    a partir de las configuraciones de generar_configs. Las consultas admiten un entero (búsqueda
+    binaria con bisect) o un array de enteros (en bloque con NumPy).
+    - PWM: el de las reglas de generar_salidas, que es el de pwm_top_outputs_ref.txt (0 antes de la primera
+      configuración). pwm_top_model, como el RTL, no avanza RD_ADDR si el primer estado de la primera
+      configuración dura 2 y difiere de él desde ahí: divergencias_pwm (filas y primera, de generar_ficheros)
+      indica si pasa en el escenario; None si no se sabe.
+    - UNLOCKED: como pwm_top_model: 0 en el ciclo bloqueado previo a cada configuración (el último de
+      la anterior, o uno solo para la primera), adelantado una fila; 1 en el resto.
+    """
+
+    def __init__(self, config_list, n_ceros_inicio=5, divergencias_pwm=None):
+        self.configs = config_list
+        self.divergencias_pwm = divergencias_pwm
+        self.offsets = calcular_offsets(config_list, n_ceros_inicio + 3 + config_list[0]["first_upd"])
+        self.n_filas = self.offsets[-1] + config_list[-1]["n_tot_cyc"]*config_list[-1]["ciclos"]
+        self.acumulados = [list(itertools.accumulate(config["wr_data"])) for config in config_list]
+
+        # Tramos con UNLOCKED = 0: [inicio, fin)
+        bloqueos = [1] + [config["n_tot_cyc"] for config in config_list[:-1]]
+        self.bloqueo_inicios = [offset - longitud - 1 for offset, longitud in zip(self.offsets, bloqueos)]
+        self.bloqueo_fines = [offset - 1 for offset in self.offsets]
+        self.bordes_bloqueo = sorted(self.bloqueo_inicios + self.bloqueo_fines)
+
+        # Versión en arrays: los estados de todas las configuraciones van seguidos, cada configuración
+        #   desplazada por la suma de los N_TOT_CYC anteriores
+        n_tot_cyc = [config["n_tot_cyc"] for config in config_list]
+        self._offsets = np.array(self.offsets, dtype=np.int64)
+        self._n_tot_cyc = np.array(n_tot_cyc, dtype=np.int64)
+        self._n_addr = np.array([config["n_addr"] for config in config_list], dtype=np.int64)
+        self._pwm_init = np.array([config["pwm_init"] for config in config_list], dtype=np.int64)
+        self._base_steps = np.cumsum([0] + n_tot_cyc[:-1], dtype=np.int64)
+        self._base_estados = np.cumsum([0] + [config["n_addr"] for config in config_list[:-1]], dtype=np.int64)
+        self._fines_estados = np.concatenate([base + np.array(acumulados, dtype=np.int64)
+                                              for base, acumulados in zip(self._base_steps, self.acumulados)])
+        self._bloqueo_inicios = np.array(self.bloqueo_inicios, dtype=np.int64)
+        self._bloqueo_fines = np.array(self.bloqueo_fines, dtype=np.int64)
+
+    @classmethod
+    def desde_escenario(cls, archivo):
+        """Referencia de un escenario compacto (pwm_top_escenario<sufijo>.json)."""
+
+        with open(archivo) as f:
+            escenario = json.load(f)
+        return cls(escenario["configs"], escenario["n_ceros_inicio"], escenario.get("divergencias_pwm"))
+
+    def aviso_pwm(self):
+        """Aviso si el PWM del RTL puede no coincidir con esta referencia (None si coincide)."""
+
+        if self.divergencias_pwm is None:
+            if self.configs[0]["wr_data"][0] == 2:
+                return ("el primer estado de la primera configuración dura 2: el PWM del RTL puede diferir "
+                        "de la referencia (escenario sin divergencias_pwm)")
+        elif self.divergencias_pwm["filas"]:
+            return (f"el PWM de pwm_top_model (y del RTL) difiere de la referencia en "
+                    f"{self.divergencias_pwm['filas']} filas desde la fila {self.divergencias_pwm['primera']}")
+        return None
+
+    def _comprobar(self, t):
+        if np.ndim(t) == 0:
+            fuera = (t < 0) or (t >= self.n_filas)
+        else:
+            fuera = np.any(np.asarray(t) < 0) or np.any(np.asarray(t) >= self.n_filas)
+        if fuera:
+            raise ValueError(f"Fila fuera del escenario (0 ... {self.n_filas - 1})")
+
+    # Consultas ---------------------------------------------------------------
+
+    def posicion(self, t):
+        """(configuración, ciclo, step) de la fila t, desde 1 como en la depuración (0 antes de la primera)."""
+
+        self._comprobar(t)
+        if np.ndim(t) == 0:
+            k = bisect.bisect_right(self.offsets, t) - 1
+            if k < 0:
+                return 0, 0, 0
+            ciclo, step = divmod(t - self.offsets[k], self.configs[k]["n_tot_cyc"])
+            return k + 1, ciclo + 1, step + 1
+        k, ciclo, step = self._posiciones(np.asarray(t, dtype=np.int64))
+        valido = k >= 0
+        return np.where(valido, k + 1, 0), np.where(valido, ciclo + 1, 0), np.where(valido, step + 1, 0)
+
+    def _posiciones(self, t):
+        """Configuración (-1 antes de la primera), ciclo y step (desde 0) de un array de filas."""
+
+        k = np.searchsorted(self._offsets, t, side="right") - 1
+        ciclo, step = np.divmod(t - self._offsets[np.maximum(k, 0)], self._n_tot_cyc[np.maximum(k, 0)])
+        return k, ciclo, step
+
+    def pwm_en(self, t):
+        """PWM esperado en la fila t (entero o array)."""
+
+        self._comprobar(t)
+        if np.ndim(t) == 0:
+            k = bisect.bisect_right(self.offsets, t) - 1
+            if k < 0:
+                return 0
+            config = self.configs[k]
+            ciclo, step = divmod(t - self.offsets[k], config["n_tot_cyc"])
+            estado = bisect.bisect_right(self.acumulados[k], step)
+            # Con N_ADDR impar los ciclos pares (desde 1) salen invertidos
+            init = config["pwm_init"] ^ (ciclo % 2 & config["n_addr"] % 2)
+            return (init + estado) % 2
+
+        t = np.asarray(t, dtype=np.int64)
+        k, ciclo, step = self._posiciones(t)
+        kk = np.maximum(k, 0)
+        estado = np.searchsorted(self._fines_estados, self._base_steps[kk] + step, side="right")
+        estado -= self._base_estados[kk]
+        init = self._pwm_init[kk] ^ (ciclo % 2 & self._n_addr[kk] % 2)
+        return np.where(k >= 0, (init + estado) % 2, 0)
+
+    def unlock_en(self, t):
+        """UNLOCKED esperado en la fila t (entero o array)."""
+
+        self._comprobar(t)
+        if np.ndim(t) == 0:
+            k = bisect.bisect_right(self.bloqueo_inicios, t) - 1
+            return int((k < 0) or (t >= self.bloqueo_fines[k]))
+
+        t = np.asarray(t, dtype=np.int64)
+        k = np.searchsorted(self._bloqueo_inicios, t, side="right") - 1
+        return ((k < 0) | (t >= self._bloqueo_fines[np.maximum(k, 0)])).astype(np.int64)
+
+    def unlock_segmentos(self, inicio, n):
+        """UNLOCKED de las filas [inicio, inicio + n) como columna segmentada (un segmento por tramo)."""
+
+        columna = []
+        fin = min(inicio + n, self.n_filas)
+        while inicio < fin:
+            i = bisect.bisect_right(self.bordes_bloqueo, inicio)
+            siguiente = min(self.bordes_bloqueo[i], fin) if i < len(self.bordes_bloqueo) else fin
+            seg_anadir(columna, self.unlock_en(inicio), siguiente - inicio)
+            inicio = siguiente
+        return columna
+
+    def salidas_en(self, t, columnas=("pwm", "unlock")):
+        """Matriz (fila x columna) con las columnas indicadas en un array de filas."""
+
+        consultas = {"pwm": self.pwm_en, "unlock": self.unlock_en}
+        return np.column_stack([consultas[clave](t) for clave in columnas])
+
+
+# Comprobación por muestreo ----------------------------------------------------
+
+def puntos_control(referencia, n_aleatorios=10_000, semilla=None):
+    """
+    Filas a comprobar, ordenadas: alrededor del inicio de cada configuración y de cada tramo bloqueado,
+    la última fila y n_aleatorios filas al azar.
+    """
+
+    bordes = np.concatenate([referencia._offsets, referencia._bloqueo_inicios, referencia._bloqueo_fines])
+    filas = [(bordes[:, None] + np.arange(-2, 2)).ravel(), [referencia.n_filas - 1],
+             np.random.default_rng(semilla).integers(0, referencia.n_filas, n_aleatorios)]
+    filas = np.unique(np.concatenate(filas).astype(np.int64))
+    return filas[(filas >= 0) & (filas < referencia.n_filas)]
+
+
+def comprobar_muestras(referencia, archivo, filas, base=2, eventos=False, columnas=("pwm", "unlock"),
+                       n_max_errores=20):
+    """
+    Comprueba solo las filas indicadas (ordenadas) de un fichero de salidas simulado, que se recorre por
+    bloques (comparador.leer_bloques) sin expandirlo. Devuelve las muestras comprobadas, las que no llegó a
+    simular y los primeros errores (fila, posición, esperado, obtenido).
+    """
+
+    indices = [COLUMNAS_SALIDAS.index(clave) for clave in columnas]
+    filas = np.asarray(filas, dtype=np.int64)
+    informe = {"muestras": 0, "errores": 0, "sin_simular": 0, "primeros_errores": []}
+    i = 0
+    for fines, valores in leer_bloques(archivo, base, eventos, indices=indices):
+        j = int(np.searchsorted(filas, fines[-1], side="left"))
+        if j == i:
+            continue
+        muestras = filas[i:j]
+        obtenido = valores[np.searchsorted(fines, muestras, side="right")]
+        esperado = referencia.salidas_en(muestras, columnas)
+        distintas = np.nonzero(np.any(obtenido != esperado, axis=1))[0]
+        informe["muestras"] += len(muestras)
+        informe["errores"] += len(distintas)
+        for d in distintas[:max(n_max_errores - len(informe["primeros_errores"]), 0)]:
+            informe["primeros_errores"].append({"fila": int(muestras[d]),
+                                                "posicion": referencia.posicion(int(muestras[d])),
+                                                "esperado": esperado[d].tolist(),
+                                                "obtenido": obtenido[d].tolist()})
+        i = j
+    informe["sin_simular"] = len(filas) - i
+    return informe
+
+
+if __name__ == "__main__":
+
+    ruta = os.path.dirname(os.path.abspath(__file__))
+
+    # USER: Configurar ----------------------------------------
+    # Escenario compacto escrito por pwm_top_generator y salidas de la simulación (pwm_top_autotest_tb)
+    archivo_escenario = os.path.join(ruta, "pwm_top_escenario.json")
+    archivo_salidas = os.path.join(ruta, "pwm_top_outputs.txt")
+    formato = "08b"         # Formato del fichero de salidas ("032b", "08b", "08x"...)
+    eventos = False         # Fichero en modo eventos (C_EVENTS = true)
+    comprobar_unlock = False    # Como C_CHECK_UNLOCKED en pwm_top_autotest_tb: UNLOCKED aún sin validar en RTL
+
+    # Filas comprobadas: bordes de configuraciones y de tramos bloqueados más n_aleatorios al azar
+    n_aleatorios = 100_000
+    semilla = None
+    # USER ----------------------------------------------------
+
+    # Argumentos: [escenario.json] [t ...]
+    argumentos = sys.argv[1:]
+    if argumentos and not argumentos[0].isdigit():
+        archivo_escenario = argumentos.pop(0)
+    referencia = ReferenciaPwmTop.desde_escenario(archivo_escenario)
+    aviso = referencia.aviso_pwm()
+    if aviso:
+        print(f"Aviso: {aviso}.")
+
+    if argumentos:
+        print(f"{'FILA':<12} {'CONFIG':>6} {'CICLO':>6} {'STEP':>10} {'PWM':>4} {'UNLOCK':>6}")
+        for t in map(int, argumentos):
+            config, ciclo, step = referencia.posicion(t)
+            print(f"{t:<12} {config:>6} {ciclo:>6} {step:>10} {referencia.pwm_en(t):>4} {referencia.unlock_en(t):>6}")
+        sys.exit(0)
+
+    filas = puntos_control(referencia, n_aleatorios, semilla)
+    columnas = ("pwm", "unlock") if comprobar_unlock else ("pwm",)
+    informe = comprobar_muestras(referencia, archivo_salidas, filas, base_formato(formato), eventos, columnas)
+    sin_simular = f", {informe['sin_simular']} sin simular" if informe["sin_simular"] else ""
+    print(f"{informe['muestras']} filas comprobadas de {referencia.n_filas}, "
+          f"{informe['errores']} con errores{sin_simular}")
+    for error in informe["primeros_errores"]:
+        print("    fila {fila} (config {posicion[0]}, ciclo {posicion[1]}, step {posicion[2]}): "
+              "esperado {esperado} obtenido {obtenido}".format(**error))
@@ -0,0 +1,331 @@
+import os
+import sys
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from pwm_top_generator import (calcular_offsets, posicion_update, seg_longitud, seg_tramos, trozo_entradas,
+                               trozo_inicio, generar_ficheros)
+from pwm_top_model import SimuladorPwmTop, CAMPOS_FILA, base_formato
+from comparador import parametros_modulo, comparar_ficheros, resumen_configs, imprimir_informe
+
+
+# División de un escenario de pwm_top en fragmentos independientes para simularlos en paralelo.
+#   Cada fragmento es un escenario completo (entradas, salidas de referencia y escenario compacto) con
+#   unas configuraciones consecutivas del original. Salvo el primero, empieza con un preámbulo: desde
+#   reset se cargan las configuraciones anteriores a la primera del fragmento con los ciclos justos
+#   para que los últimos de la anterior, con las escrituras y el update de la siguiente en las mismas
+#   posiciones que en el original, dejen pwm_top en el mismo estado. Las entradas de las configuraciones
+#   propias son los mismos trozos que en el original, así que se simula exactamente lo mismo.
+#   Un índice (pwm_top_fragmentos<sufijo>.json) relaciona las filas de cada fragmento con las del
+#   original, para fusionar las comparaciones de todos en un único informe con filas y ciclos globales.
+#   Uso: python pwm_top_fragmentos.py [escenario.json | índice.json]  (con índice, compara y fusiona)
+
+SUFIJO_INDICE = "pwm_top_fragmentos"
+
+# Cada fragmento (salvo el primero) responde de los CICLOS_SOLAPE últimos ciclos de la configuración del
+#   preámbulo: el fragmento anterior acaba en ella sin update posterior, así que su último ciclo no se
+#   bloquea (UNLOCKED) como en el original
+CICLOS_SOLAPE = 2
+
+# Configuraciones mínimas del preámbulo. Con datos muy pequeños el RTL arrastra algún desfase de RD_ADDR
+#   de una configuración a las siguientes (p. ej. [2, 1, 1] cargada desde reset) y hace falta más historia
+#   para reproducirlo: con salidas de pwm_top_model el preámbulo se alarga de dos en dos hasta que el
+#   modelo llega a la primera fila propia en el mismo estado que en el original (en el peor caso, con
+#   todas las configuraciones anteriores recortadas)
+PROFUNDIDAD = 2
+
+
+def leer_json(archivo):
+    with open(archivo) as f:
+        return json.load(f)
+
+
+def repartir(config_list, n_fragmentos):
+    """Índices de la primera configuración de cada fragmento, con filas (ciclos de reloj) parecidas."""
+
+    filas = [config["n_tot_cyc"]*config["ciclos"] for config in config_list]
+    total = sum(filas)
+    n_fragmentos = max(1, min(n_fragmentos, len(config_list)))
+    inicios = [0]
+    acumulado = 0
+    for n, filas_config in enumerate(filas[:-1]):
+        acumulado += filas_config
+        quedan_configs = len(config_list) - (n + 1)
+        quedan_fragmentos = n_fragmentos - len(inicios)
+        if quedan_fragmentos and ((acumulado >= total*len(inicios)/n_fragmentos) or
+                                  (quedan_configs == quedan_fragmentos)):
+            inicios.append(n + 1)
+    return inicios
+
+
+def ciclos_hasta(config_dic, filas, ciclos_min=4):
+    """Ciclos mínimos (con la paridad de los de config_dic, de la que depende el PWM con N_ADDR impar) para
+    que haya al menos filas filas desde el paso 2 del primer ciclo hasta el final de la configuración."""
+
+    ciclos = max(ciclos_min, -(-(filas + 1) // config_dic["n_tot_cyc"]))
+    return ciclos + (config_dic["ciclos"] - ciclos) % 2
+
+
+def recortar_config(config_dic, ciclos, first_upd):
+    """Copia de una configuración con menos ciclos, para un preámbulo (first_upd: su update si va la primera)."""
+
+    recortada = {clave: valor for clave, valor in config_dic.items() if clave != "upd_fin"}
+    recortada["ciclos_omitidos"] = config_dic["ciclos"] - ciclos + config_dic.get("ciclos_omitidos", 0)
+    recortada["ciclos"] = ciclos
+    recortada["first_upd"] = first_upd
+    return recortada
+
+
+def fragmento(escenario, a, b, profundidad=PROFUNDIDAD):
+    """
+    Configuraciones y trozos de entradas del fragmento con las configuraciones [a, b) del escenario, y la
+    fila en la que empiezan sus filas propias en el fragmento y en el original.
+    El preámbulo recorta al menos las profundidad configuraciones anteriores (una si a = 1): el estado de
+    pwm_dp_mem durante la configuración a - 1 depende de los últimos datos escritos de la a - 2 (PREV_LAST),
+    y el puerto de escritura alterna en cada configuración, así que el número de configuraciones del
+    preámbulo tiene la paridad de a, para que a empiece con el mismo puerto que en el original.
+    """
+
+    configs, trozos = escenario["configs"], escenario["entradas"]
+    n_ceros = escenario["n_ceros_inicio"]
+    offsets = calcular_offsets(configs, n_ceros + 3 + configs[0]["first_upd"])
+    if a == 0:
+        return configs[:b], trozos[:b], 0, 0
+
+    # Filas desde que empiezan las entradas de la configuración a hasta el final de la anterior
+    inicio_a = n_ceros + sum(seg_longitud(trozo["n_addr"]) for trozo in trozos[:a])
+    antes_fin = offsets[a] - inicio_a
+    previa = configs[a - 1]
+    ciclos_previa = ciclos_hasta(previa, antes_fin, CICLOS_SOLAPE + 2)
+
+    # La primera configuración del preámbulo se carga desde reset, como en el original si es la primera
+    n_preambulo = min(a, profundidad + (a - profundidad) % 2)
+    primera = configs[a - n_preambulo]
+    first_upd = primera["first_upd"] if n_preambulo == a else primera["n_addr"] + 1
+    offset_previa = n_ceros + 3 + first_upd
+    inicio, upd = n_ceros, n_ceros + first_upd - 1
+    preambulo, entradas = [], []
+    for config, siguiente in zip(configs[a - n_preambulo:a - 1], configs[a - n_preambulo + 1:a]):
+        # Con los ciclos justos para que las escrituras de la siguiente quepan antes de su update,
+        #   forzado en el paso N_TOT_CYC - 3 de su penúltimo ciclo
+        ciclos = ciclos_hasta(config, config["n_tot_cyc"] + siguiente["n_addr"] + 5)
+        preambulo.append(recortar_config(config, ciclos, first_upd if not preambulo else 0))
+        entradas.append(trozo_entradas(preambulo[-1], offset_previa + 1 - inicio, upd - inicio))
+        inicio, upd = offset_previa + 1, posicion_update(offset_previa, preambulo[-1], 3)
+        offset_previa += ciclos*config["n_tot_cyc"]
+    preambulo.append(recortar_config(previa, ciclos_previa, first_upd if n_preambulo == 1 else 0))
+
+    # Entradas de la configuración a - 1 hasta donde empiezan las de a (mismas filas antes del final)
+    offset_a = offset_previa + ciclos_previa*previa["n_tot_cyc"]
+    entradas.append(trozo_entradas(preambulo[-1], offset_a - antes_fin - inicio, upd - inicio))
+
+    solape = CICLOS_SOLAPE*previa["n_tot_cyc"]
+    return preambulo + configs[a:b], entradas + trozos[a:b], offset_a - solape, offsets[a] - solape
+
+
+def estados_modelo(trozos, filas, n_ceros_inicio):
+    """
+    Estado de pwm_top_model (registros, sin la fila de entradas ni el contenido de la memoria) en cada
+    una de las filas indicadas (ordenadas) de un escenario con esos trozos de entradas (uno por configuración).
+    """
+
+    simulador = SimuladorPwmTop()
+    trozos = [trozo_inicio(n_ceros_inicio)] + trozos
+    eventos = (evento for trozo in trozos for evento in seg_tramos(trozo, CAMPOS_FILA))
+    estados = []
+    for fila in filas:
+        while simulador.filas <= fila:
+            evento = next(eventos, None)
+            if evento is None:
+                for _ in simulador.avanzar(fila + 1, final=True):
+                    pass
+                break
+            simulador.anadir(*evento)
+            for _ in simulador.avanzar(fila + 1):
+                pass
+        estado = dict(simulador.modelo.__dict__)
+        del estado["fila"], estado["mem"]
+        # DIN y DOUT se modifican en el sitio
+        estado["din"], estado["dout"] = tuple(estado["din"]), tuple(map(tuple, estado["dout"]))
+        estados.append(estado)
+    return estados
+
+
+def fragmento_exacto(escenario, a, b, estado, profundidad=PROFUNDIDAD):
+    """fragmento con el preámbulo más corto (desde profundidad) con el que el modelo llega a la primera fila
+    propia en estado."""
+
+    while True:
+        resultado = fragmento(escenario, a, b, profundidad)
+        configs_fragmento, entradas, inicio_local, _ = resultado
+        n_preambulo = len(configs_fragmento) - (b - a)
+        if (n_preambulo == a) or (estados_modelo(entradas, [inicio_local], escenario["n_ceros_inicio"]) == [estado]):
+            return resultado
+        profundidad = n_preambulo + 2
+
+
+def generar_fragmento(directorio, configs, entradas, n_ceros_inicio, sufijo, opciones):
+    """Escribe un fragmento con generar_ficheros. Se ejecuta en un proceso del pool."""
+
+    return generar_ficheros(directorio, len(configs), 0, 0, 0, **opciones, sufijo=sufijo,
+                            n_ceros_inicio=n_ceros_inicio, configs=configs, entradas=entradas)
+
+
+def generar_fragmentos(directorio, archivo_escenario, n_fragmentos, opciones, sufijo="", n_procesos=None,
+                       profundidad=PROFUNDIDAD):
+    """
+    Divide el escenario en n_fragmentos (por filas) y genera cada fragmento en paralelo, con sufijo
+    <sufijo>_F<k>, junto con el índice. opciones: las de generar_ficheros (formato, eventos, modelo...).
+    Devuelve el índice.
+    """
+
+    escenario = leer_json(archivo_escenario)
+    configs = escenario["configs"]
+    offsets = calcular_offsets(configs, escenario["n_ceros_inicio"] + 3 + configs[0]["first_upd"])
+    n_filas = offsets[-1] + configs[-1]["n_tot_cyc"]*configs[-1]["ciclos"]
+    inicios = repartir(configs, n_fragmentos)
+    limites = list(zip(inicios, inicios[1:] + [len(configs)]))
+
+    # Con salidas del modelo, su estado en la primera fila propia de cada fragmento (una sola pasada)
+    modelo = opciones.get("modelo", True)
+    if modelo:
+        filas_propias = [offsets[a] - CICLOS_SOLAPE*configs[a - 1]["n_tot_cyc"] for a in inicios[1:]]
+        estados = [None] + estados_modelo(escenario["entradas"], filas_propias, escenario["n_ceros_inicio"])
+
+    fragmentos = []
+    with ProcessPoolExecutor(max_workers=n_procesos) as pool:
+        futuros = []
+        for k, (a, b) in enumerate(limites):
+            if modelo and a:
+                partes = fragmento_exacto(escenario, a, b, estados[k], profundidad)
+            else:
+                partes = fragmento(escenario, a, b, profundidad)
+            configs_fragmento, entradas, inicio_local, inicio_global = partes
+            sufijo_fragmento = f"{sufijo}_F{k:02d}"
+            futuros.append(pool.submit(generar_fragmento, directorio, configs_fragmento, entradas,
+                                       escenario["n_ceros_inicio"], sufijo_fragmento, opciones))
+            preambulo = configs_fragmento[:len(configs_fragmento) - (b - a)]
+            fragmentos.append({"sufijo": sufijo_fragmento,
+                               "configs": [a + 1, b],
+                               "preambulo": [config["n_config"] for config in preambulo],
+                               "inicio_local": inicio_local,
+                               "inicio_global": inicio_global,
+                               "salidas": f"pwm_top_outputs{sufijo_fragmento}.txt"})
+        for futuro, dic in zip(futuros, fragmentos):
+            dic["archivos"] = [os.path.basename(archivo) for archivo in futuro.result()["archivos"]]
+
+    # Filas propias: hasta donde empiezan las del siguiente fragmento
+    for dic, siguiente in zip(fragmentos, fragmentos[1:] + [{"inicio_global": n_filas}]):
+        dic["filas"] = siguiente["inicio_global"] - dic["inicio_global"]
+
+    indice = {"escenario": os.path.basename(archivo_escenario),
+              "n_filas": n_filas,
+              "opciones": opciones,
+              "fragmentos": fragmentos}
+    archivo_indice = os.path.join(directorio, f"{SUFIJO_INDICE}{sufijo}.json")
+    with open(archivo_indice, "w") as f:
+        json.dump(indice, f, indent=4)
+    print(f"{archivo_indice} creado correctamente.")
+    return indice
+
+
+# Comparación y fusión ---------------------------------------------------------
+
+def comparar_fragmento(directorio, dic, base, eventos, check_unlocked=False):
+    """comparar_ficheros de un fragmento: salidas de su simulación frente a su referencia (UNLOCK solo con
+    check_unlocked, como en comparador)."""
+
+    archivo_ref = next(archivo for archivo in dic["archivos"] if archivo.startswith("pwm_top_outputs_ref"))
+    return comparar_ficheros(os.path.join(directorio, dic["salidas"]), os.path.join(directorio, archivo_ref),
+                             base, eventos, **parametros_modulo("pwm_top", check_unlocked))
+
+
+def fusionar_informes(indice, informes):
+    """
+    Un informe como el de comparar_ficheros para el escenario original a partir de los de sus fragmentos.
+    Las ventanas en filas propias pasan a filas globales; las del preámbulo o del final no propio de cada
+    fragmento (que también deben estar vacías) se listan aparte en "fuera_de_rango". filas_por_columna
+    suma las de los fragmentos completos.
+    """
+
+    ventanas, fuera = [], []
+    filas = 0
+    filas_por_columna = {}
+    for dic, informe in zip(indice["fragmentos"], informes):
+        inicio, fin = dic["inicio_local"], dic["inicio_local"] + dic["filas"]
+        desplazamiento = dic["inicio_global"] - inicio
+        filas += max(0, min(informe["filas"], fin) - inicio)
+        for clave, n in informe["filas_por_columna"].items():
+            filas_por_columna[clave] = filas_por_columna.get(clave, 0) + n
+        for ventana in informe["ventanas"]:
+            primera, ultima = ventana["inicio"], ventana["inicio"] + ventana["longitud"]
+            if (primera < inicio) or (ultima > fin):
+                fuera.append({**ventana, "fragmento": dic["sufijo"]})
+            if (ultima > inicio) and (primera < fin):
+                primera, ultima = max(primera, inicio), min(ultima, fin)
+                ventanas.append({**ventana, "inicio": primera + desplazamiento, "longitud": ultima - primera,
+                                 "fragmento": dic["sufijo"]})
+
+    informe = {"archivo": f"{len(informes)} fragmentos",
+               "archivo_ref": indice["escenario"],
+               "filas": filas,
+               "filas_ref": indice["n_filas"],
+               "filas_distintas": sum(ventana["longitud"] for ventana in ventanas),
+               "filas_por_columna": filas_por_columna,
+               "ventanas": ventanas,
+               "fuera_de_rango": fuera}
+    if all("posicion" in ventana for ventana in ventanas):
+        informe["por_config"] = resumen_configs(ventanas)
+    return informe
+
+
+def comparar_fragmentos(archivo_indice, n_procesos=None, check_unlocked=False):
+    """Compara en paralelo todos los fragmentos del índice con sus referencias y fusiona los informes."""
+
+    directorio = os.path.dirname(os.path.abspath(archivo_indice))
+    indice = leer_json(archivo_indice)
+    base = base_formato(indice["opciones"].get("formato", "032b"))
+    eventos = indice["opciones"].get("eventos", False)
+    with ProcessPoolExecutor(max_workers=n_procesos) as pool:
+        informes = list(pool.map(comparar_fragmento, [directorio]*len(indice["fragmentos"]), indice["fragmentos"],
+                                 [base]*len(indice["fragmentos"]), [eventos]*len(indice["fragmentos"]),
+                                 [check_unlocked]*len(indice["fragmentos"])))
+    return fusionar_informes(indice, informes)
+
+
+if __name__ == "__main__":
+
+    ruta = os.path.dirname(os.path.abspath(__file__))
+
+    # USER: Configurar ----------------------------------------
+    # Escenario compacto que se divide (pwm_top_escenario<sufijo>.json) y número de fragmentos
+    archivo_escenario = os.path.join(ruta, "pwm_top_escenario_WC.json")
+    n_fragmentos = os.cpu_count()
+
+    # Opciones de generar_ficheros de los fragmentos (las mismas que en pwm_top_autotest_tb)
+    opciones = {"formato": "08x", "eventos": True, "modelo": True}
+
+    # Comparar también UNLOCK (C_CHECK_UNLOCKED = true en pwm_top_autotest_tb)
+    check_unlocked = False
+
+    # Procesos en paralelo (None -> uno por núcleo)
+    n_procesos = None
+    # USER ----------------------------------------------------
+
+    # Argumento: escenario (se fragmenta) o índice (se comparan y fusionan las simulaciones de los fragmentos).
+    #   Cada fragmento se simula con C_INPUTS_PATH, C_OUTPUTS_REF_PATH y C_OUTPUTS_PATH apuntando a sus ficheros
+    if len(sys.argv) > 1:
+        archivo_escenario = sys.argv[1]
+
+    if os.path.basename(archivo_escenario).startswith(SUFIJO_INDICE):
+        informe = comparar_fragmentos(archivo_escenario, n_procesos, check_unlocked)
+        imprimir_informe(informe)
+        if informe["fuera_de_rango"]:
+            print(f"  {len(informe['fuera_de_rango'])} ventanas con diferencias fuera de las filas propias "
+                  f"(preámbulo o final de un fragmento)")
+    else:
+        nombre = os.path.basename(archivo_escenario)
+        sufijo = nombre[len("pwm_top_escenario"):-len(".json")]
+        indice = generar_fragmentos(os.path.dirname(os.path.abspath(archivo_escenario)), archivo_escenario,
+                                    n_fragmentos, opciones, sufijo, n_procesos)
+        print(f"{len(indice['fragmentos'])} fragmentos de {indice['n_filas']} filas")
@@ -1,37 +1,161 @@
 import random
 import os
-import math
-
-
-def generar_config(index, n_max_estados, n_max_dato, n_max_ciclos):
-    """Crear los datos iniciales."""
-
-    n_tot_cyc = 0     # (*)
-    iter = 0
-    while n_tot_cyc not in range(3, 2**32):
-        # N_ADDR
-        n_addr = random.randint(2, n_max_estados)
-
-        # WR_DATA
-        data = [random.randint(1, n_max_dato) for _ in range(n_addr)]
-
-        # Probabilidad de empezar en 1
-        if random.random() < 0.25:
-            data[0] = 1
+import json
+import time
+import itertools
+from collections import deque, Counter
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+from binarizar import texto_filas, escribir_filas
+
+
+# Cada columna se guarda como una lista de segmentos (valor, longitud, paso):
+#   la muestra k (0 <= k < longitud) del segmento vale valor + k*paso.
+#   Con paso = 0 el segmento es un tramo constante (RLE).
+
+COLUMNAS_ENTRADAS = ("n_config", "n_addr", "n_tot_cyc", "pwm_init", "wr_en", "wr_addr", "wr_data", "upd_mem")
+COLUMNAS_SALIDAS = ("steps", "pwm", "unlock", "n_config_out", "ciclo")
+COLUMNAS_DEBUG = ("n_config", "steps", "n_config_out", "ciclo")     # No las comprueba el autotest
+
+# Límites de N_TOT_CYC: registro de 32 bits y, como mínimo, 4 pasos para que el update de la
+#   siguiente configuración tenga sitio (paso N_TOT_CYC - 3 del penúltimo ciclo)
+N_TOT_CYC_MIN = 4
+N_TOT_CYC_MAX = 2**32 - 1
+
+# Mínimo de ciclos de una configuración: el update de la siguiente va en el antepenúltimo o el
+#   penúltimo y el fin de sus entradas, tras el paso 2 del primero
+CICLOS_MIN = 4
+
+# Filas medias por estado que conserva ajustar_presupuesto: con menos presupuesto se descartan configuraciones
+#   antes que reducir más los datos, para que no queden casi todos los estados de longitud 1
+FILAS_ESTADO_MIN = 4
+
+# Estados (segmentos de PWM) por trozo de salidas de generar_escenario
+SEGMENTOS_BLOQUE = 1 << 14
+
+# Conjuntos de parámetros de generación. Hay que tener en cuenta que los registros son de 32 bits:
+#   n_max_dato puede llegar a 2**32 - 1 = 4.294.967.295, pero para que sea coherente con
+#   N_TOT_CYC = SUM(dato_i) tiene que ser como mucho 1FF_FFFF = 33.554.431.
+PARAMETROS = {
+    "worst_case": {"n_config": 50,          # Número de secuencias
+                   "n_max_estados": 128,    # Número máximo de estados (128)
+                   "n_max_dato": 15000,     # Valor máximo de un dato
+                   "n_max_ciclos": 1500},   # Número máximo de repeticiones de ciclos
+    "normal": {"n_config": 30,
+               "n_max_estados": 20,
+               "n_max_dato": 150,
+               "n_max_ciclos": 40},
+}
+CABECERAS = {"n_config": "N_CONFIG",
+             "n_addr": "N_ADDR",
+             "n_tot_cyc": "N_TOT_CY",
+             "pwm_init": "PWM_INIT",
+             "wr_en": "WR_EN",
+             "wr_addr": "WR_ADDR",
+             "wr_data": "WR_DATA",
+             "upd_mem": "UPD_MEM",
+             "steps": "STEPS",
+             "pwm": "PWM",
+             "unlock": "UNLOCK",
+             "n_config_out": "N_CONF_O",
+             "ciclo": "CICLO"}
+
+
+def seg_anadir(columna, valor, longitud, paso=0):
+    """Añade un segmento a una columna, fusionándolo con el anterior si es el mismo tramo constante."""
+
+    if longitud <= 0:
+        return
+    if columna and (paso == 0):
+        valor_ant, longitud_ant, paso_ant = columna[-1]
+        if (paso_ant == 0) and (valor_ant == valor):
+            columna[-1] = (valor_ant, longitud_ant + longitud, 0)
+            return
+    columna.append((valor, longitud, paso))
+
+
+def seg_anadir_lista(columna, lista):
+    """Añade una lista de valores a una columna agrupando los tramos constantes y las rampas."""
+
+    i = 0
+    while i < len(lista):
+        j = i + 1
+        paso = (lista[j] - lista[i]) if (j < len(lista)) and isinstance(lista[i], int) else 0
+        while (j < len(lista)) and (lista[j] == lista[j - 1] + paso):
+            j += 1
+        if paso and (j - i == 2):   # Dos valores sueltos no justifican una rampa
+            j -= 1
+            paso = 0
+        seg_anadir(columna, lista[i], j - i, paso)
+        i = j
+
+
+def seg_longitud(columna):
+    """Número de muestras de una columna segmentada."""
+    return sum(longitud for _, longitud, _ in columna)
+
+
+def seg_expandir(columna):
+    """Genera los valores de una columna segmentada muestra a muestra."""
+
+    for valor, longitud, paso in columna:
+        if paso:
+            yield from range(valor, valor + longitud*paso, paso)
+        else:
+            yield from itertools.repeat(valor, longitud)
 
-        # Probabilidad de acabar en 1
-        if random.random() < 0.25:
-            data[-1] = 1
 
-        # Número de pulsos por ciclo (N_TOT_CYC)
-        n_tot_cyc = sum(data)
+def seg_tramos(dic, claves):
+    """Recorre columnas segmentadas de igual longitud como tramos constantes (longitud, valores)."""
 
-        # print(  f"CONFIG: {index}\n" +
-        #         f"TRY: {iter}\n" +
-        #         f"ESTADOS: {n_addr}\n" +
-        #         f"DATOS: {data}\n" +
-        #         f"SUMA: {n_tot_cyc} => {int(math.log2(n_tot_cyc)) + 1} bits \n")
-        iter += 1
+    colas = [deque(list(seg) for seg in dic[clave] if seg[1] > 0) for clave in claves]
+    while all(colas):
+        cabezas = [cola[0] for cola in colas]
+        longitud = 1 if any(seg[2] for seg in cabezas) else min(seg[1] for seg in cabezas)
+        yield longitud, tuple(seg[0] for seg in cabezas)
+        for cola, seg in zip(colas, cabezas):
+            if seg[1] == longitud:
+                cola.popleft()
+            else:
+                seg[0] += seg[2]*longitud
+                seg[1] -= longitud
+
+
+def generar_config(index, n_max_estados, n_max_dato, n_max_ciclos, config_prev=None):
+    """
+    Crear los datos iniciales directamente válidos, sin descartar configuraciones:
+    - N_TOT_CYC en [N_TOT_CYC_MIN, N_TOT_CYC_MAX].
+    - N_ADDR limitado para que las escrituras de esta configuración quepan en los ciclos de
+      config_prev que quedan tras su primer paso (ver generar_entradas).
+    """
+
+    # N_ADDR
+    n_max = n_max_estados
+    if config_prev:
+        n_max = min(n_max, (config_prev["ciclos"] - 1)*config_prev["n_tot_cyc"] - 6)
+    n_addr = random.randint(2, n_max)
+
+    # Probabilidad de empezar y de acabar en 1 (con 2 estados no ambas, no se llegaría a N_TOT_CYC_MIN)
+    uno_inicio = random.random() < 0.25
+    uno_fin = (random.random() < 0.25) and not (uno_inicio and (n_addr == 2))
+    fijos = [i for i, uno in ((0, uno_inicio), (n_addr - 1, uno_fin)) if uno]
+    libres = [i for i in range(n_addr) if i not in fijos]
+
+    # WR_DATA: cada dato libre se acota para que la suma no desborde N_TOT_CYC_MAX
+    dato_max = min(n_max_dato, (N_TOT_CYC_MAX - len(fijos)) // len(libres))
+    data = [1] * n_addr
+    for i in libres:
+        data[i] = random.randint(1, dato_max)
+
+    # Si no se llega a N_TOT_CYC_MIN, la diferencia se suma a un dato libre
+    deficit = N_TOT_CYC_MIN - sum(data)
+    if deficit > 0:
+        data[random.choice(libres)] += deficit
+
+    # Número de pulsos por ciclo (N_TOT_CYC)
+    n_tot_cyc = sum(data)
 
     # WR_ADDR
     addr = list(range(n_addr))
@@ -40,7 +164,7 @@ def generar_config(index, n_max_estados, n_max_dato, n_max_ciclos):
     init = random.choice([0, 1])
 
     # Número entero de ciclos
-    ciclos = random.randint(4, n_max_ciclos) 
+    ciclos = random.randint(CICLOS_MIN, n_max_ciclos)
 
     # Update de la primera configuración
     if index == 0:
@@ -59,11 +183,126 @@ def generar_config(index, n_max_estados, n_max_dato, n_max_ciclos):
             }
 
 
-def generar_salidas(config_dic, index):
+def generar_configs(n_config, n_max_estados, n_max_dato, n_max_ciclos, n_ciclos=None, n_ceros_inicio=5):
+    """
+    Genera la lista de configuraciones, encadenando cada una con la anterior. Con n_ciclos, el
+    escenario se ajusta a ese número de filas (ciclos de reloj) con ajustar_presupuesto.
+    """
+
+    config_list = []
+    for i in range(n_config):
+        config_list.append(generar_config(i, n_max_estados, n_max_dato, n_max_ciclos,
+                                          config_list[-1] if config_list else None))
+    if n_ciclos is not None:
+        config_list = ajustar_presupuesto(config_list, n_ciclos, n_max_estados, n_max_dato, n_max_ciclos,
+                                          n_ceros_inicio)
+    return config_list
+
+
+def filas_escenario(config_list, n_ceros_inicio):
+    """Número de filas (ciclos de reloj) del escenario de generar_escenario."""
+
+    return n_ceros_inicio + 3 + config_list[0]["first_upd"] + sum(config["n_tot_cyc"]*config["ciclos"]
+                                                                    for config in config_list)
+
+
+def ciclos_minimos(config_dic, config_dic_next=None):
+    """Ciclos mínimos de una configuración para que quepan las escrituras de la siguiente (ver generar_config)."""
+
+    if not config_dic_next:
+        return CICLOS_MIN
+    return max(CICLOS_MIN, 1 - (-(config_dic_next["n_addr"] + 6) // config_dic["n_tot_cyc"]))
+
+
+def escalar_config(config_dic, factor):
+    """
+    Reduce los datos de una configuración (N_TOT_CYC) en la proporción factor < 1, redondeando hacia abajo
+    y sin bajar de 1 ni de N_TOT_CYC_MIN en total, así que se mantienen N_ADDR y la forma de los estados.
+    """
+
+    data = [max(1, int(dato*factor)) for dato in config_dic["wr_data"]]
+    deficit = N_TOT_CYC_MIN - sum(data)
+    if deficit > 0:
+        data[data.index(max(data))] += deficit
+    return dict(config_dic, wr_data=data, n_tot_cyc=sum(data))
+
+
+def ajustar_presupuesto(config_list, n_ciclos, n_max_estados, n_max_dato, n_max_ciclos, n_ceros_inicio=5):
+    """
+    Ajusta las configuraciones para que el escenario dure n_ciclos filas (ciclos de reloj), sin
+    cambiar cómo se sortean los estados ni las posiciones de los updates (generar_entradas):
+    - Si faltan filas, se sortean más configuraciones con los mismos parámetros.
+    - Si sobran, se reduce por orden: los ciclos de todas en la misma proporción (sin bajar de
+      CICLOS_MIN), el número de configuraciones (se descartan desde el final mientras no quepan
+      FILAS_ESTADO_MIN filas por estado y ciclo; como mínimo queda una) y, por último, los datos de
+      todas en la misma proporción (escalar_config). Si aun así no caben, se siguen descartando.
+    - El resto se reparte en ciclos desde la última configuración, así que el escenario queda por
+      debajo de n_ciclos en menos de un N_TOT_CYC (salvo que no quepa ni una configuración).
+    """
+
+    # Total de filas llevado a mano: recalcularlo en cada configuración añadida sería cuadrático
+    filas = filas_escenario(config_list, n_ceros_inicio)
+    while filas < n_ciclos:
+        config_list.append(generar_config(len(config_list), n_max_estados, n_max_dato, n_max_ciclos,
+                                          config_list[-1]))
+        filas += config_list[-1]["n_tot_cyc"]*config_list[-1]["ciclos"]
+
+    fijas = n_ceros_inicio + 3 + config_list[0]["first_upd"]
+    presupuesto = max(n_ciclos - fijas, 0)
+    pasos = filas_escenario(config_list, n_ceros_inicio) - fijas
+    if pasos > presupuesto:
+        factor = presupuesto / pasos
+        config_list = [dict(config, ciclos=max(CICLOS_MIN, round(config["ciclos"]*factor))) for config in config_list]
+        while (len(config_list) > 1) and \
+                (sum(config["n_addr"]*config["ciclos"] for config in config_list)*FILAS_ESTADO_MIN > presupuesto):
+            config_list.pop()
+        pasos = filas_escenario(config_list, n_ceros_inicio) - fijas
+        while pasos > presupuesto:
+            # Los datos que no bajan de 1 hacen que a veces no baste con una pasada
+            escaladas = [escalar_config(config, presupuesto / pasos) for config in config_list]
+            if escaladas == config_list:
+                break
+            config_list = escaladas
+            pasos = filas_escenario(config_list, n_ceros_inicio) - fijas
+
+    while True:
+        # Ciclos mínimos para que quepan las escrituras de la siguiente (los datos han podido cambiar)
+        #   y reparto del resto desde la última configuración
+        siguientes = config_list[1:] + [None]
+        minimos = [ciclos_minimos(config, config_next) for config, config_next in zip(config_list, siguientes)]
+        for config, minimo in zip(config_list, minimos):
+            config["ciclos"] = max(config["ciclos"], minimo)
+        resto = n_ciclos - filas_escenario(config_list, n_ceros_inicio)
+        for config, minimo in zip(reversed(config_list), reversed(minimos)):
+            if 0 <= resto < config["n_tot_cyc"]:
+                break
+            ciclos = max(minimo, config["ciclos"] + resto // config["n_tot_cyc"])
+            resto -= (ciclos - config["ciclos"])*config["n_tot_cyc"]
+            config["ciclos"] = ciclos
+        if (resto >= 0) or (len(config_list) == 1):
+            return config_list
+        config_list.pop()
+
+
+def tasa_simulador(archivo, segundos, eventos=False):
+    """
+    Ciclos de reloj por segundo del simulador, medidos en una simulación de pwm_top_autotest_tb que
+    tardó segundos con el fichero de salidas (o de entradas) archivo. Sirve para pasar un tiempo de
+    simulación a n_ciclos.
+    """
+
+    with open(archivo) as f:
+        if eventos:
+            n_filas = sum(int(linea.split()[0]) for linea in f if linea.strip())
+        else:
+            n_filas = sum(1 for linea in f if linea.strip())
+    return n_filas / segundos
+
+
+def generar_salidas_ciclo(config_dic, ciclo):
+    """Genera las salidas esperadas de un ciclo de una configuración como columnas segmentadas."""
 
     longitud_ciclo = config_dic["n_tot_cyc"]
-    init = config_dic["pwm_init"]
-    datos = config_dic["wr_data"]
 
     dic_salidas = {"steps": [],
                    "pwm": [],
@@ -71,34 +310,129 @@ def generar_salidas(config_dic, index):
                    "n_config_out": [],
                    "ciclo": []
                    }
-    
-    pwm_ciclo_impar = []
-    for dato in datos:
-        pwm_ciclo_impar += [init]*dato
-        if init == 1:
-            init = 0
-        else:
-            init = 1
-    pwm_ciclo_par = [int(math.fabs(x - 1)) for x in pwm_ciclo_impar]
-    
-    for ciclo in range(1, config_dic["ciclos"] + 1):
-        dic_salidas["steps"]    += [n + 1 for n in range(longitud_ciclo)]
-        dic_salidas["ciclo"]    += [ciclo for _ in range(longitud_ciclo)]
-        dic_salidas["n_config_out"] += [index + 1 for _ in range(longitud_ciclo)]
-
-        if (ciclo % 2 != 0):
-            dic_salidas["pwm"]  += pwm_ciclo_impar
-        elif (config_dic["n_addr"] % 2 == 0):
-            dic_salidas["pwm"]  += pwm_ciclo_impar
-        else:
-            dic_salidas["pwm"]  += pwm_ciclo_par
-            
-        dic_salidas["unlock"] += [0 for _ in range(longitud_ciclo)]
+
+    # Cada estado alterna el nivel a partir de PWM_INIT. Con N_ADDR impar los ciclos pares salen invertidos
+    init = config_dic["pwm_init"]
+    if (ciclo % 2 == 0) and (config_dic["n_addr"] % 2 != 0):
+        init = 1 - init
+    for i, dato in enumerate(config_dic["wr_data"]):
+        seg_anadir(dic_salidas["pwm"], (init + i) % 2, dato)
+
+    seg_anadir(dic_salidas["steps"], 1, longitud_ciclo, 1)
+    seg_anadir(dic_salidas["unlock"], 0, longitud_ciclo)
+    seg_anadir(dic_salidas["n_config_out"], config_dic["n_config"], longitud_ciclo)
+    # Los ciclos omitidos (preámbulos de pwm_top_fragmentos) solo desplazan la numeración de depuración
+    seg_anadir(dic_salidas["ciclo"], ciclo + config_dic.get("ciclos_omitidos", 0), longitud_ciclo)
 
     return dic_salidas
 
 
-def generar_entradas (config_dic, index, dic_salidas, long_ent_prev, config_dic_prev={}, config_dic_next={"n_addr": 0}):
+def generar_salidas(config_dic, primero=1, n_ciclos=None):
+    """
+    Genera las salidas esperadas de los ciclos [primero, primero + n_ciclos) de una configuración (por
+    defecto, todos) como columnas segmentadas. Mismas reglas que generar_salidas_ciclo, pero con NumPy:
+    np.tile de los niveles de los estados (invertidos en los ciclos pares con N_ADDR impar) y de sus datos.
+    """
+
+    if n_ciclos is None:
+        n_ciclos = config_dic["ciclos"] - primero + 1
+    longitud_ciclo = config_dic["n_tot_cyc"]
+    datos = np.asarray(config_dic["wr_data"], dtype=np.int64)
+    ciclos = np.arange(primero, primero + n_ciclos, dtype=np.int64)
+
+    # Nivel de cada estado en cada ciclo y fusión de los estados consecutivos con el mismo nivel
+    init = np.full(n_ciclos, config_dic["pwm_init"], dtype=np.int64)
+    if config_dic["n_addr"] % 2 != 0:
+        init ^= (ciclos % 2 == 0)
+    niveles = ((init[:, None] + np.arange(len(datos))) % 2).ravel()
+    longitudes = np.tile(datos, n_ciclos)
+    cambios = np.flatnonzero(np.concatenate(([True], niveles[1:] != niveles[:-1])))
+    pwm = list(zip(niveles[cambios].tolist(), np.add.reduceat(longitudes, cambios).tolist(),
+                   itertools.repeat(0)))
+
+    # Los ciclos omitidos (preámbulos de pwm_top_fragmentos) solo desplazan la numeración de depuración
+    ciclos += config_dic.get("ciclos_omitidos", 0)
+    return {"steps": [(1, longitud_ciclo, 1)]*n_ciclos,
+            "pwm": pwm,
+            "unlock": [(0, longitud_ciclo*n_ciclos, 0)],
+            "n_config_out": [(config_dic["n_config"], longitud_ciclo*n_ciclos, 0)],
+            "ciclo": list(zip(ciclos.tolist(), itertools.repeat(longitud_ciclo), itertools.repeat(0)))
+            }
+
+
+def calcular_offsets(config_list, inicio):
+    """Índice de la primera muestra de salida de cada configuración (sumas prefijas de N_TOT_CYC*ciclos)."""
+
+    offsets = []
+    pos = inicio
+    for config in config_list:
+        offsets.append(pos)
+        pos += config["n_tot_cyc"] * config["ciclos"]
+    return offsets
+
+
+def posicion_salida(offset, config_dic, ciclo, step):
+    """Índice de la muestra (ciclo, step) de una configuración en las salidas, o None si no existe."""
+
+    if (1 <= ciclo <= config_dic["ciclos"]) and (1 <= step <= config_dic["n_tot_cyc"]):
+        return offset + (ciclo - 1)*config_dic["n_tot_cyc"] + (step - 1)
+    return None
+
+
+def posicion_update(offset, config_dic_prev, upd_fin):
+    """
+    Índice del update forzado a upd_fin pasos del final de un ciclo de la configuración anterior:
+    pasos N_TOT_CYC (0) y N_TOT_CYC - 1 (1) del antepenúltimo ciclo o N_TOT_CYC - 3 (3) ... 1
+    (N_TOT_CYC - 1) del penúltimo, que es la ventana del update de generar_entradas.
+    """
+
+    n_tot_cyc = config_dic_prev["n_tot_cyc"]
+    if not ((upd_fin in (0, 1)) or (3 <= upd_fin <= n_tot_cyc - 1)):
+        raise ValueError(f"Update a {upd_fin} pasos del final fuera de la ventana (N_TOT_CYC = {n_tot_cyc})")
+    ciclo = config_dic_prev["ciclos"] - (2 if upd_fin <= 1 else 1)
+    return posicion_salida(offset, config_dic_prev, ciclo, n_tot_cyc - upd_fin)
+
+
+def generar_entradas(config_dic, index, offsets, inicio, config_dic_prev={}, config_dic_next={"n_addr": 0}):
+    """
+    Genera las entradas de una configuración, desde la fila absoluta inicio hasta la primera de la
+    siguiente. Las posiciones se sortean en ventanas que generar_config garantiza no vacías:
+    - Update: tras las escrituras y entre el paso N_TOT_CYC - 1 del antepenúltimo ciclo y el paso
+      N_TOT_CYC - 3 del penúltimo ciclo de la configuración anterior.
+    - Fin: tras el paso 2 del primer ciclo, dejando sitio a las escrituras y al update de la siguiente.
+    Si la configuración lleva "upd_fin" (pwm_top_cobertura), el update no se sortea: va en
+    posicion_update, y el fin de la anterior deja sitio a las escrituras antes de él.
+    """
+
+    n_addr = config_dic["n_addr"]
+
+    # Posición del update
+    if index == 0:
+        upd = inicio + config_dic["first_upd"] - 1
+    elif config_dic.get("upd_fin") is not None:
+        upd = posicion_update(offsets[index - 1], config_dic_prev, config_dic["upd_fin"])
+    else:
+        upd_start = posicion_salida(offsets[index - 1], config_dic_prev, config_dic_prev["ciclos"] - 2, config_dic_prev["n_tot_cyc"] - 1)
+        upd_end = posicion_salida(offsets[index - 1], config_dic_prev, config_dic_prev["ciclos"] - 1, config_dic_prev["n_tot_cyc"] - 3)
+        upd = random.randint(max(upd_start, inicio + n_addr + 1), upd_end)
+
+    # Longitud del vector de entradas
+    fin_min = max(posicion_salida(offsets[index], config_dic, 1, 2), upd + 1)
+    if config_dic_next["n_addr"]:
+        fin_max = posicion_salida(offsets[index], config_dic, config_dic["ciclos"] - 1, config_dic["n_tot_cyc"] - 3)
+        fin_max -= config_dic_next["n_addr"] + 1
+    else:
+        fin_max = posicion_salida(offsets[index], config_dic, config_dic["ciclos"] - 1, config_dic["n_tot_cyc"] - 1) - 1
+    if config_dic_next.get("upd_fin") is not None:
+        fin_max = min(fin_max, posicion_update(offsets[index], config_dic, config_dic_next["upd_fin"])
+                      - config_dic_next["n_addr"] - 1)
+    longitud = random.randint(fin_min, fin_max) - inicio
+
+    return trozo_entradas(config_dic, longitud, upd - inicio)
+
+
+def trozo_entradas(config_dic, longitud, upd_pos):
+    """Entradas de una configuración de longitud filas: escrituras al principio y update en la fila upd_pos."""
 
     dic_entradas = {"n_config": [],
                     "n_addr": [],
@@ -110,81 +444,510 @@ def generar_entradas (config_dic, index, dic_salidas, long_ent_prev, config_dic_
                     "upd_mem": []
                 }
 
-    # Longitud del vector de entradas
-    lon_start = 0
-    lon_end = 0
-    for i in range(len(dic_salidas["pwm"])):
-        if (int(dic_salidas["n_config_out"][i], 2) == (index + 1)) and (int(dic_salidas["ciclo"][i], 2) == 1) and (int(dic_salidas["steps"][i], 2) == 2):
-            lon_start = i
-        elif (int(dic_salidas["n_config_out"][i], 2) == (index + 1)) and (int(dic_salidas["ciclo"][i], 2) == (config_dic["ciclos"] - 1)) and (int(dic_salidas["steps"][i], 2) == (config_dic["n_tot_cyc"] - 1)):
-            lon_end = i - config_dic_next["n_addr"] - 1
-    longitud = random.randint(lon_start, lon_end) - long_ent_prev
+    n_addr = config_dic["n_addr"]
 
-    # Posición del update
-    upd_start = 0
-    upd_end = 0
-    upd_pos = -1
-    if index > 0:
-        for i in range(len(dic_salidas["pwm"])):
-            if (int(dic_salidas["n_config_out"][i], 2) == index) and (int(dic_salidas["ciclo"][i], 2) == (config_dic_prev["ciclos"] - 2)) and (int(dic_salidas["steps"][i], 2) == (config_dic_prev["n_tot_cyc"] - 1)):
-                upd_start = i
-            elif (int(dic_salidas["n_config_out"][i], 2) == index) and (int(dic_salidas["ciclo"][i], 2) == (config_dic_prev["ciclos"] - 1)) and (int(dic_salidas["steps"][i], 2) == (config_dic_prev["n_tot_cyc"] - 3)):
-                upd_end = i
-
-    upd_pos = random.randint(max(upd_start, long_ent_prev), upd_end) - long_ent_prev
-    while (upd_pos < config_dic["n_addr"] + 1):
-        upd_pos += 1
-
-    for n, i in enumerate(range(longitud)):
-        dic_entradas["n_config"].append(index + 1)
-        dic_entradas["n_addr"].append(config_dic["n_addr"])
-        dic_entradas["n_tot_cyc"].append(config_dic["n_tot_cyc"])
-        dic_entradas["pwm_init"].append(config_dic["pwm_init"])
-
-        if i < config_dic["n_addr"]:
-            dic_entradas["wr_en"].append(1)
-            dic_entradas["wr_addr"].append(config_dic["wr_addr"][i])
-            dic_entradas["wr_data"].append(config_dic["wr_data"][i])
-        else:
-            dic_entradas["wr_en"].append(0)
-            dic_entradas["wr_addr"].append(config_dic["wr_addr"][config_dic["n_addr"] - 1])                  
-            dic_entradas["wr_data"].append(config_dic["wr_data"][config_dic["n_addr"] - 1])
+    # Valores constantes durante toda la configuración
+    seg_anadir(dic_entradas["n_config"], config_dic["n_config"], longitud)
+    seg_anadir(dic_entradas["n_addr"], n_addr, longitud)
+    seg_anadir(dic_entradas["n_tot_cyc"], config_dic["n_tot_cyc"], longitud)
+    seg_anadir(dic_entradas["pwm_init"], config_dic["pwm_init"], longitud)
 
-        if index == 0:
-            if n == (config_dic["first_upd"] - 1):
-                dic_entradas["upd_mem"].append(1)
-            else:
-                dic_entradas["upd_mem"].append(0)
-        else:
-            if n == upd_pos:
-                dic_entradas["upd_mem"].append(1)
-            else:
-                dic_entradas["upd_mem"].append(0)
+    # Escritura de la memoria y mantenimiento del último dato
+    seg_anadir(dic_entradas["wr_en"], 1, n_addr)
+    seg_anadir(dic_entradas["wr_en"], 0, longitud - n_addr)
+    seg_anadir_lista(dic_entradas["wr_addr"], config_dic["wr_addr"])
+    seg_anadir(dic_entradas["wr_addr"], config_dic["wr_addr"][-1], longitud - n_addr)
+    seg_anadir_lista(dic_entradas["wr_data"], config_dic["wr_data"])
+    seg_anadir(dic_entradas["wr_data"], config_dic["wr_data"][-1], longitud - n_addr)
+
+    # Pulso de update
+    seg_anadir(dic_entradas["upd_mem"], 0, upd_pos)
+    seg_anadir(dic_entradas["upd_mem"], 1, 1)
+    seg_anadir(dic_entradas["upd_mem"], 0, longitud - upd_pos - 1)
 
     return dic_entradas
 
 
-def exportar_txt(dic, archivo):
-    """Convierte un diccionario de listas en un fichero .txt con una lista por columna."""
+def trozo_inicio(n_ceros_inicio):
+    """Trozo de entradas del inicio: n_ceros_inicio filas a cero antes de la primera configuración."""
 
-    # Obtener las listas en el orden de las claves
-    listas = list(dic.values())
+    return {clave: [(0, n_ceros_inicio, 0)] for clave in COLUMNAS_ENTRADAS}
 
-    # Transponer con zip: filas -> columnas
-    filas = zip(*listas)
 
-    # Escribir al fichero
-    with open(archivo, "w") as f:
-        for fila in filas:
-            linea = " ".join(f"{str(valor):<8}" for valor in fila)
-            f.write(linea.rstrip() + "\n")
+def generar_escenario(config_list, n_ceros_inicio, entradas=None):
+    """
+    Genera el escenario completo de forma perezosa como trozos (tipo, columnas segmentadas, fin).
+    - tipo: "entradas" o "salidas".
+    - fin: True en el último trozo de cada bloque (inicio o configuración).
+    Las entradas de cada configuración se emiten antes que sus salidas, ciclo a ciclo, para que
+    los escritores no tengan que retener más que unos pocos segmentos pendientes. Con entradas
+    (un trozo por configuración, como en el escenario compacto de exportar_escenario o los fragmentos de
+    pwm_top_fragmentos) no se sortean sino que se usan esas.
+    """
+
+    # Inicio
+    yield "entradas", trozo_inicio(n_ceros_inicio), True
+    yield "salidas", {clave: [(0, n_ceros_inicio, 0)] for clave in COLUMNAS_SALIDAS}, True
+    yield "salidas", {clave: [(0, 3 + config_list[0]["first_upd"], 0)] for clave in COLUMNAS_SALIDAS}, True
+
+    # Posición de cada configuración en el vector de salidas
+    offsets = calcular_offsets(config_list, n_ceros_inicio + 3 + config_list[0]["first_upd"])
+
+    # Fila absoluta en la que empiezan las entradas de cada configuración
+    inicio = n_ceros_inicio
+    for n, config in enumerate(config_list):
+
+        # Generar las entradas en el momento correspondiente a las salidas
+        config_prev = config_list[n - 1] if n > 0 else {}
+        config_next = config_list[n + 1] if n < (len(config_list) - 1) else {"n_addr": 0}
+        if entradas is not None:
+            dic_entradas_gen = entradas[n]
+        else:
+            dic_entradas_gen = generar_entradas(config, n, offsets, inicio, config_prev, config_next)
+        inicio += seg_longitud(dic_entradas_gen["n_addr"])
+        yield "entradas", dic_entradas_gen, True
+
+        # Generar las salidas por bloques de ciclos de como mucho SEGMENTOS_BLOQUE estados
+        bloque = max(1, SEGMENTOS_BLOQUE // len(config["wr_data"]))
+        for primero in range(1, config["ciclos"] + 1, bloque):
+            n_ciclos = min(bloque, config["ciclos"] - primero + 1)
+            yield "salidas", generar_salidas(config, primero, n_ciclos), (primero + n_ciclos > config["ciclos"])
+
+
+class EscritorTxt:
+    """
+    Escritor en streaming de columnas segmentadas a un fichero .txt con una columna por clave.
+    Las filas se escriben en cuanto todas las columnas tienen segmentos pendientes, por lo que la
+    memoria ocupada no depende de la longitud total del fichero.
+    En modo eventos solo se escribe una fila por cambio, precedida del número de ciclos de reloj que
+    se mantiene ("duración valores..."). Las columnas de depuración no generan eventos: muestran el
+    valor del primer ciclo del evento.
+    """
+
+    FILAS_BLOQUE = 4096         # Filas idénticas por escritura
+    FILAS_RAMPA = 1 << 16       # Filas de un tramo con rampas convertidas de una vez
+    FILAS_RAMPA_MIN = 16        # Con menos filas es más rápido convertirlas una a una
+    ANCHO_COLUMNA = 8           # Ancho mínimo de cada columna
+    DURACION_MAX = 2**31 - 1    # Duración máxima de un evento (integer de VHDL)
+
+    def __init__(self, archivo, columnas, formato=None, eventos=False, columnas_debug=(), buffer=1 << 20,
+                 instrumentacion=None):
+        self.archivo = archivo
+        self.instrumentacion = instrumentacion
+        self.formato = formato
+        self.claves = list(columnas)
+        self.pendientes = {clave: deque() for clave in self.claves}
+        self.eventos = eventos
+        self.indices_evento = [i for i, clave in enumerate(self.claves) if clave not in columnas_debug]
+        self.evento = None      # [valores, clave del evento, duración]
+        self.f = open(archivo, "w", buffering=buffer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar(ok=(tipo is None))
+
+    def anadir(self, dic):
+        """Añade segmentos a las columnas del diccionario y vuelca las filas ya completas."""
+        for clave, columna in dic.items():
+            pendiente = self.pendientes[clave]
+            for seg in columna:
+                if seg[1] > 0:
+                    pendiente.append(list(seg))
+        self._volcar()
+
+    def _fila(self, valores):
+        if self.formato and self.instrumentacion:
+            with self.instrumentacion.etapa("binarizar"):
+                valores = int_a_bin(valores, self.formato)
+        elif self.formato:
+            valores = int_a_bin(valores, self.formato)
+        linea = " ".join(f"{valor:<{self.ANCHO_COLUMNA}}" for valor in valores)
+        return linea.rstrip() + "\n"
+
+    def _volcar(self):
+        colas = [self.pendientes[clave] for clave in self.claves]
+        while all(colas):
+            cabezas = [cola[0] for cola in colas]
+            longitud = min(seg[1] for seg in cabezas)
+
+            if self.eventos:
+                # Un tramo es un único evento salvo que cambie alguna columna que no sea de depuración
+                if any(cabezas[i][2] for i in self.indices_evento):
+                    for k in range(longitud):
+                        self._evento([seg[0] + k*seg[2] for seg in cabezas], 1)
+                else:
+                    self._evento([seg[0] for seg in cabezas], longitud)
+
+            # Las filas de un tramo sin rampas son idénticas: se escriben por bloques de tamaño acotado
+            elif all(seg[2] == 0 for seg in cabezas):
+                linea = self._fila([seg[0] for seg in cabezas])
+                bloque = linea * min(longitud, self.FILAS_BLOQUE)
+                for _ in range(longitud // self.FILAS_BLOQUE):
+                    self.f.write(bloque)
+                self.f.write(linea * (longitud % self.FILAS_BLOQUE))
+            # Tramo con rampas: todas sus filas se convierten en bloque
+            else:
+                self._escribir_rampa(cabezas, longitud)
+
+            for cola, seg in zip(colas, cabezas):
+                if seg[1] == longitud:
+                    cola.popleft()
+                else:
+                    if seg[2]:
+                        seg[0] += seg[2]*longitud
+                    seg[1] -= longitud
+
+    def _escribir_rampa(self, cabezas, longitud):
+        if (longitud < self.FILAS_RAMPA_MIN) or not all(isinstance(seg[0], (int, np.integer)) for seg in cabezas):
+            for k in range(longitud):
+                self.f.write(self._fila([seg[0] + k*seg[2] if seg[2] else seg[0] for seg in cabezas]))
+            return
+        valores = np.array([seg[0] for seg in cabezas], dtype=np.int64)
+        pasos = np.array([seg[2] for seg in cabezas], dtype=np.int64)
+        for inicio in range(0, longitud, self.FILAS_RAMPA):
+            k = np.arange(inicio, min(longitud, inicio + self.FILAS_RAMPA), dtype=np.int64)
+            matriz = valores + k[:, None]*pasos
+            if self.instrumentacion:
+                with self.instrumentacion.etapa("binarizar"):
+                    escribir_filas(self.f, matriz, self.formato, self.ANCHO_COLUMNA)
+            else:
+                escribir_filas(self.f, matriz, self.formato, self.ANCHO_COLUMNA)
+
+    def _evento(self, valores, duracion):
+        clave = tuple(valores[i] for i in self.indices_evento)
+        while duracion > 0:
+            if (self.evento is not None) and (self.evento[1] == clave) and (self.evento[2] < self.DURACION_MAX):
+                n = min(duracion, self.DURACION_MAX - self.evento[2])
+                self.evento[2] += n
+                duracion -= n
+            else:
+                self._escribir_evento()
+                self.evento = [valores, clave, 0]
+
+    def _escribir_evento(self):
+        if self.evento is not None:
+            self.f.write(f"{self.evento[2]:<8} " + self._fila(self.evento[0]))
+            self.evento = None
+
+    def cerrar(self, ok=True):
+        """Cierra el fichero. Las filas incompletas (columnas más largas que otras) se descartan, como con zip."""
+        if ok:
+            self._escribir_evento()
+        self.f.close()
+        if ok:
+            print(f"{self.archivo} creado correctamente.")
+
+
+class ComparadorColumnas:
+    """
+    Compara en streaming dos columnas segmentadas de tramos constantes que llegan a trozos de distinto
+    tamaño (p. ej. el PWM de las reglas y el de pwm_top_model). Cuenta las filas distintas y guarda la
+    primera.
+    """
+
+    def __init__(self):
+        self.colas = (deque(), deque())
+        self.fila = 0
+        self.filas_distintas = 0
+        self.primera = None
+
+    def anadir(self, lado, columna):
+        """Añade segmentos a la columna lado (0 o 1) y compara las filas que ya tienen las dos."""
+        self.colas[lado].extend(list(seg) for seg in columna if seg[1] > 0)
+        cola_a, cola_b = self.colas
+        while cola_a and cola_b:
+            seg_a, seg_b = cola_a[0], cola_b[0]
+            longitud = min(seg_a[1], seg_b[1])
+            if seg_a[0] != seg_b[0]:
+                self.filas_distintas += longitud
+                if self.primera is None:
+                    self.primera = self.fila
+            self.fila += longitud
+            for cola, seg in ((cola_a, seg_a), (cola_b, seg_b)):
+                if seg[1] == longitud:
+                    cola.popleft()
+                else:
+                    seg[1] -= longitud
+
+
+class Instrumentacion:
+    """
+    Medidas opcionales de generar_ficheros, volcadas a un informe JSON:
+    - Tiempo y llamadas por etapa (configs, salidas, entradas, modelo, binarizar, exportar).
+      "exportar" no incluye el tiempo de "binarizar", que ocurre dentro de la escritura.
+    - Contadores (configuraciones, filas y segmentos generados, bytes escritos).
+    - Progreso por configuración con las filas generadas y el tiempo estimado restante.
+    - Con perfil, estadísticas de cProfile (<informe>.prof y las funciones más costosas en el informe).
+    - Con memoria, pico de tracemalloc y las líneas que más memoria reservan.
+    """
+
+    N_TOP = 25      # Funciones / líneas en el informe
+
+    def __init__(self, archivo=None, progreso=True, perfil=False, memoria=False):
+        self.archivo = archivo
+        self.progreso = progreso
+        self.perfil = perfil
+        self.memoria = memoria
+        self.etapas = {}
+        self.contadores = Counter()
+        self.inicio = None
+        self.profiler = None
+
+    @contextmanager
+    def etapa(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            medida = self.etapas.setdefault(nombre, {"segundos": 0.0, "llamadas": 0})
+            medida["segundos"] += time.perf_counter() - inicio
+            medida["llamadas"] += 1
+
+    def contar(self, clave, n=1):
+        self.contadores[clave] += n
+
+    def cronometrar(self, iterable, etapa_de):
+        """Recorre un generador sumando el tiempo de cada next() a la etapa etapa_de(elemento)."""
+        iterador = iter(iterable)
+        while True:
+            inicio = time.perf_counter()
+            try:
+                elemento = next(iterador)
+            except StopIteration:
+                return
+            medida = self.etapas.setdefault(etapa_de(elemento), {"segundos": 0.0, "llamadas": 0})
+            medida["segundos"] += time.perf_counter() - inicio
+            medida["llamadas"] += 1
+            yield elemento
+
+    def empezar(self):
+        self.inicio = time.perf_counter()
+        if self.memoria:
+            import tracemalloc
+            tracemalloc.start()
+        if self.perfil:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def avance(self, n_config, n_configs, filas, filas_total):
+        """Progreso tras generar una configuración: filas de salida generadas y tiempo estimado restante."""
+        if not self.progreso:
+            return
+        transcurrido = time.perf_counter() - self.inicio
+        eta = transcurrido * (filas_total - filas) / filas if filas else float("nan")
+        print(f"Config {n_config}/{n_configs}: {filas}/{filas_total} filas ({100*filas/filas_total:.1f} %), "
+              f"{transcurrido:.1f} s, ETA {eta:.1f} s", flush=True)
+
+    def terminar(self, **info):
+        """Cierra las medidas y escribe el informe (si hay archivo). Devuelve el informe."""
+        informe = {**info,
+                   "segundos": time.perf_counter() - self.inicio,
+                   "etapas": {nombre: dict(medida) for nombre, medida in self.etapas.items()},
+                   "contadores": dict(self.contadores)}
+        if "binarizar" in self.etapas and "exportar" in informe["etapas"]:
+            informe["etapas"]["exportar"]["segundos"] -= self.etapas["binarizar"]["segundos"]
+
+        if self.profiler:
+            import pstats
+            self.profiler.disable()
+            estadisticas = pstats.Stats(self.profiler)
+            if self.archivo:
+                informe["perfil"] = os.path.splitext(self.archivo)[0] + ".prof"
+                estadisticas.dump_stats(informe["perfil"])
+            funciones = sorted(estadisticas.stats.items(), key=lambda item: item[1][3], reverse=True)
+            informe["perfil_top"] = [{"funcion": f"{archivo}:{linea}({nombre})", "llamadas": llamadas,
+                                      "segundos_propios": propio, "segundos_acumulados": acumulado}
+                                     for (archivo, linea, nombre), (_, llamadas, propio, acumulado, _)
+                                     in funciones[:self.N_TOP]]
+
+        if self.memoria:
+            import tracemalloc
+            _, pico = tracemalloc.get_traced_memory()
+            lineas = tracemalloc.take_snapshot().statistics("lineno")[:self.N_TOP]
+            tracemalloc.stop()
+            informe["tracemalloc"] = {"pico_mb": pico / 2**20,
+                                      "top": [{"linea": str(estadistica.traceback), "mb": estadistica.size / 2**20,
+                                               "bloques": estadistica.count} for estadistica in lineas]}
+
+        if self.archivo:
+            with open(self.archivo, "w") as f:
+                json.dump(informe, f, indent=4)
+            print(f"{self.archivo} creado correctamente.")
+        return informe
+
+
+def exportar_escenario(archivo, config_list, n_ceros_inicio, trozos_entradas, modelo=True, divergencias_pwm=None):
+    """
+    Guarda el escenario en forma compacta: configuraciones y un trozo de entradas por configuración
+    (columnas segmentadas, las posiciones de escritura y update son aleatorias), que es lo que admite
+    generar_ficheros(entradas=...); los ceros del inicio salen de n_ceros_inicio (trozo_inicio). Las salidas
+    se deducen de las configuraciones; modelo indica si UNLOCK de la referencia salió de pwm_top_model (si
+    no, es 0) y divergencias_pwm, dónde difiere el PWM del modelo (y del RTL) del de las reglas.
+    pwm_top_io_check genera a partir de él la vista io_check de cualquier ventana de filas y
+    pwm_top_consulta, la referencia analítica.
+    """
 
+    with open(archivo, "w") as f:
+        json.dump({"n_ceros_inicio": n_ceros_inicio,
+                   "modelo": modelo,
+                   "divergencias_pwm": divergencias_pwm,
+                   "configs": config_list,
+                   "entradas": trozos_entradas}, f)
     print(f"{archivo} creado correctamente.")
 
 
+def exportar_txt(dic, archivo, formato=None):
+    """Expande un diccionario de columnas segmentadas en un fichero .txt con una columna por clave."""
+
+    with EscritorTxt(archivo, dic.keys(), formato) as escritor:
+        escritor.anadir(dic)
+
+
 def int_a_bin (lista, formato):
     """Convierte una lista de enteros a una lista en el formato definido."""
-    return [format(int(x), formato) for x in lista]
+    if len(lista) < 64:     # Para pocos datos es más rápido format() que preparar el bloque
+        return [format(int(x), formato) for x in lista]
+    return texto_filas(np.asarray(lista, dtype=np.int64), formato).decode("ascii").split()
+
+
+def generar_ficheros(directorio, n_config, n_max_estados, n_max_dato, n_max_ciclos,
+                     formato="032b", eventos=False, modelo=True, sufijo="", n_ceros_inicio=5,
+                     instrumentacion=None, io_check=False, configs=None, entradas=None, n_ciclos=None):
+    """
+    Genera un escenario aleatorio completo y lo exporta a directorio (entradas, salidas de referencia
+    y escenario compacto para pwm_top_io_check; con io_check, también la vista io_check completa).
+    Las configuraciones sorteadas encajan siempre, así que no se reintenta nada: cualquier error se propaga.
+    Con configs (lista fija de configuraciones, p. ej. de pwm_top_cobertura) no se sortean; con entradas
+    (un trozo por configuración, como el "entradas" del escenario compacto) tampoco se sortean las entradas.
+    Con n_ciclos, las configuraciones sorteadas se ajustan para que el escenario dure ~n_ciclos filas.
+    Con modelo, UNLOCK sale de pwm_top_model y el PWM del modelo se contrasta con el de las reglas, que es
+    el que se escribe: si difieren (p. ej. primer estado de longitud 2, en el que el RTL no avanza
+    RD_ADDR) se avisa, porque el RTL no pasará el autotest.
+    Devuelve un diccionario con los ficheros creados, los intentos por configuración (n_try) y, con modelo,
+    las filas en las que difiere el PWM ("divergencias_pwm": filas y primera). Con instrumentacion (Instrumentacion)
+    se miden las etapas, se informa del progreso y se escribe su informe.
+    """
+
+    if modelo:
+        from pwm_top_model import SimuladorPwmTop, CAMPOS_FILA, columnas_modelo
+        from pwm_top_consulta import ReferenciaPwmTop
+
+    archivo_salidas = os.path.join(directorio, f"pwm_top_outputs_ref{sufijo}.txt")
+    archivo_entradas = os.path.join(directorio, f"pwm_top_inputs{sufijo}.txt")
+    archivo_check = os.path.join(directorio, f"pwm_top_io_check{sufijo}.txt")
+    archivo_escenario = os.path.join(directorio, f"pwm_top_escenario{sufijo}.json")
+
+    separacion = "-------"
+
+    instr = instrumentacion
+    etapa = instr.etapa if instr else (lambda nombre: nullcontext())
+    if instr:
+        instr.empezar()
+
+    # Intentos por configuración: generar_config y generar_entradas sortean directamente valores válidos,
+    #   así que no se descarta ninguna (un error, p. ej. de E/S, se propaga)
+    n_try = 1
+
+    # Generar configuraciones automáticamente
+    with etapa("configs"):
+        config_list = configs or generar_configs(n_config, n_max_estados, n_max_dato, n_max_ciclos,
+                                                 n_ciclos=n_ciclos, n_ceros_inicio=n_ceros_inicio)
+    if (entradas is not None) and (len(entradas) != len(config_list)):
+        raise ValueError(f"{len(entradas)} trozos de entradas para {len(config_list)} configuraciones")
+    n_filas_total = sum(config["n_tot_cyc"]*config["ciclos"] for config in config_list)
+
+    simulador = SimuladorPwmTop() if modelo else None
+    # La vista io_check lleva el mismo UNLOCK que la referencia (el del modelo, calculado por tramos)
+    referencia = ReferenciaPwmTop(config_list, n_ceros_inicio) if (modelo and io_check) else None
+    comparador = ComparadorColumnas()
+    n_filas_salidas = 0
+    trozos_entradas = []
+
+    # Generar y exportar el escenario configuración a configuración
+    with EscritorTxt(archivo_salidas, COLUMNAS_SALIDAS, formato, eventos, COLUMNAS_DEBUG,
+                     instrumentacion=instr) as escritor_salidas, \
+         EscritorTxt(archivo_entradas, COLUMNAS_ENTRADAS, formato, eventos, COLUMNAS_DEBUG,
+                     instrumentacion=instr) as escritor_entradas, \
+         (EscritorTxt(archivo_check, CABECERAS) if io_check else nullcontext()) as escritor_check:
+
+        if escritor_check:
+            escritor_check.anadir({clave: [(cabecera, 1, 0)] for clave, cabecera in CABECERAS.items()})
+
+        escenario = generar_escenario(config_list, n_ceros_inicio, entradas)
+        if instr:
+            escenario = instr.cronometrar(escenario, lambda trozo: trozo[0])
+
+        for tipo, dic, fin in escenario:
+            if tipo == "entradas":
+                trozos_entradas.append(dic)
+                with etapa("exportar"):
+                    escritor_entradas.anadir(dic)
+                if simulador:
+                    # El modelo avanza hasta donde lo permiten las entradas ya generadas
+                    with etapa("modelo"):
+                        for duracion, fila in seg_tramos(dic, CAMPOS_FILA):
+                            simulador.anadir(duracion, fila)
+                        columnas = columnas_modelo(simulador.avanzar())
+                        comparador.anadir(1, columnas["pwm"])
+                    with etapa("exportar"):
+                        escritor_salidas.anadir({"unlock": columnas["unlock"]})
+            else:
+                if referencia:
+                    dic_check = dict(dic, unlock=referencia.unlock_segmentos(n_filas_salidas,
+                                                                             seg_longitud(dic["pwm"])))
+                n_filas_salidas += seg_longitud(dic["pwm"])
+                if simulador:
+                    comparador.anadir(0, dic["pwm"])
+                with etapa("exportar"):
+                    if simulador:
+                        escritor_salidas.anadir({clave: dic[clave] for clave in dic if clave != "unlock"})
+                    else:
+                        escritor_salidas.anadir(dic)
+            if escritor_check:
+                with etapa("exportar"):
+                    escritor_check.anadir(dic_check if (referencia and tipo == "salidas") else dic)
+                    if fin:
+                        escritor_check.anadir({clave: [(separacion, 1, 0)] for clave in dic})
+
+            if instr:
+                instr.contar(f"segmentos_{tipo}", sum(len(columna) for columna in dic.values()))
+                n_config_actual = dic["n_config_out"][0][0] if tipo == "salidas" else 0    # 0: inicio
+                if n_config_actual:
+                    instr.contar("filas_configs", seg_longitud(dic["pwm"]))
+                    if fin:
+                        instr.avance(n_config_actual, n_config, instr.contadores["filas_configs"],
+                                     n_filas_total)
+
+        if simulador:
+            with etapa("modelo"):
+                columnas = columnas_modelo(simulador.avanzar(n_filas_salidas, final=True))
+                comparador.anadir(1, columnas["pwm"])
+            with etapa("exportar"):
+                escritor_salidas.anadir({"unlock": columnas["unlock"]})
+
+    divergencias = None
+    if modelo:
+        divergencias = {"filas": comparador.filas_distintas, "primera": comparador.primera}
+    # Sin el trozo del inicio: uno por configuración
+    exportar_escenario(archivo_escenario, config_list, n_ceros_inicio, trozos_entradas[1:], modelo, divergencias)
+    if divergencias and divergencias["filas"]:
+        print(f"Aviso: el PWM de pwm_top_model difiere de las reglas en {divergencias['filas']} filas "
+              f"(la primera, {divergencias['primera']}). La referencia sigue las reglas: "
+              f"el RTL no pasará el autotest.")
+    archivos = [archivo_entradas, archivo_salidas, archivo_escenario] + [archivo_check]*io_check
+    if instr:
+        instr.contar("filas_salidas", n_filas_salidas)
+        if divergencias:
+            instr.contar("filas_pwm_divergentes", divergencias["filas"])
+        instr.contar("bytes", sum(os.path.getsize(archivo) for archivo in archivos))
+        instr.terminar(parametros={"n_config": n_config, "n_max_estados": n_max_estados, "n_max_dato": n_max_dato,
+                                   "n_max_ciclos": n_max_ciclos, "n_ciclos": n_ciclos},
+                       opciones={"formato": formato, "eventos": eventos, "modelo": modelo},
+                       intentos=n_try)
+    return {"archivos": archivos, "n_try": n_try, "divergencias_pwm": divergencias}
 
 
 if __name__ == "__main__":
@@ -192,118 +955,58 @@ if __name__ == "__main__":
     ruta = os.path.dirname(os.path.abspath(__file__))
 
     # USER: Configurar ----------------------------------------
-    # Hay que tener en cuenta que los registros son de 32 bits.
-    #   Si bien el requisto máximo es de 128 estados de 32 bits, el valor de
-    #   N_TOT_CYC = SUM(dato_i) no puede superar (2*32 - 1) (*)
-
+    # Parámetros de PARAMETROS["worst_case"] o PARAMETROS["normal"]
     worst_case = True
 
-    if worst_case:
-        n_config = 50           # Número de secuencias
-        n_max_estados = 128     # Número máximo de estados (128)
-        n_max_dato = 15000      # Valor máximo de un dato (2**32 - 1 = 4.294.967.295, pero para que sea coherente con TOT_CYC tiene que ser 1FF_FFFF = 33.554.431
-        n_max_ciclos = 1500     # Número máximo de repeticiones de ciclos
-    else:
-        n_config = 30           # Número de secuencias
-        n_max_estados = 20      # Número máximo de estados (128)
-        n_max_dato = 150        # Valor máximo de un dato (2**32 - 1 = 4.294.967.295, pero para que sea coherente con TOT_CYC tiene que ser 1FF_FFFF = 33.554.431
-        n_max_ciclos = 40       # Número máximo de repeticiones de ciclos
+    # Formato de los ficheros de entradas y salidas:
+    #   "032b" -> binario, leído con read
+    #   "08x"  -> hexadecimal, leído con hread (C_HEX = true en pwm_top_autotest_tb), ~4 veces más pequeño
+    formato = "032b"
 
-    # USER ----------------------------------------------------
+    # Modo eventos: cada fila indica cuántos ciclos de reloj se mantienen sus valores (C_EVENTS = true en
+    #   pwm_top_autotest_tb). El tamaño de los ficheros depende del número de cambios y no de la duración.
+    eventos = False
 
-    ok = False
-    n_try = 0
+    # UNLOCKED de referencia calculado con pwm_top_model (modelo ciclo a ciclo del RTL) en lugar de a 0. El PWM
+    #   sigue las reglas de generar_salidas y se contrasta con el del modelo (aviso si el RTL se desvía).
+    modelo = True
 
-    while not ok:
-        try:
+    # Semilla del generador aleatorio (None -> escenario distinto en cada ejecución)
+    semilla = None
 
-            n_try += 1 
-
-            config_list = []
-            ceros_inicio = [0]*5
-            separacion = ["-------"]
-            formato = "032b"
-
-            dic_salidas = {"steps": [],
-                        "pwm": [],
-                        "unlock": [],
-                        "n_config_out": [],
-                        "ciclo": []
-                        }
-            
-            dic_entradas = {"n_config": [],
-                            "n_addr": [],
-                            "n_tot_cyc": [],
-                            "pwm_init": [],
-                            "wr_en": [],
-                            "wr_addr": [],
-                            "wr_data": [],
-                            "upd_mem": []
-                            }
-            
-            dic_check = {"n_config": ["N_CONFIG"],
-                        "n_addr": ["N_ADDR"],
-                        "n_tot_cyc": ["N_TOT_CY"],
-                        "pwm_init": ["PWM_INIT"],
-                        "wr_en": ["WR_EN"],
-                        "wr_addr": ["WR_ADDR"],
-                        "wr_data": ["WR_DATA"],
-                        "upd_mem": ["UPD_MEM"],
-                        "steps": ["STEPS"],
-                        "pwm": ["PWM"],
-                        "unlock": ["UNLOCK"],
-                        "n_config_out": ["N_CONF_O"],
-                        "ciclo": ["CICLO"]}
-
-            # Generar configuraciones automáticamente
-            for i in range(n_config):
-                config_list.append(generar_config(i, n_max_estados, n_max_dato, n_max_ciclos))
-
-            for n, config in enumerate(config_list):
-
-                first_update_list = [0,0,0] + [0 for _ in range(config["first_upd"])]
-
-                dic_salidas_gen = {}
-                dic_entradas_gen = {}
-
-                # Generar las salidas
-                dic_salidas_gen = generar_salidas(config, n)
-                for salida, lista in dic_salidas.items():
-                    # Inicio
-                    if n == 0:
-                        lista += int_a_bin(ceros_inicio + first_update_list, formato) 
-                        dic_check[salida] += ceros_inicio + separacion + first_update_list + separacion
-                    # Configuraciones
-                    lista += int_a_bin(dic_salidas_gen[salida], formato)
-                    dic_check[salida] += dic_salidas_gen[salida] + separacion
-
-                # Generar las entradas en el momento correspondiente a las salidas
-                if n == 0:
-                    dic_entradas_gen = generar_entradas(config, n, dic_salidas, len(dic_entradas["n_addr"]))
-                elif n < (n_config - 1):
-                    dic_entradas_gen = generar_entradas(config, n, dic_salidas, len(dic_entradas["n_addr"]), config_list[n - 1], config_list[n + 1])
-                else:
-                    dic_entradas_gen = generar_entradas(config, n, dic_salidas, len(dic_entradas["n_addr"]), config_list[n - 1])
-                for entrada, lista in dic_entradas.items():
-                    # Inicio
-                    if n == 0:
-                        lista += int_a_bin(ceros_inicio, formato) 
-                        dic_check[entrada] += ceros_inicio + separacion
-                    # Configuraciones
-                    lista += int_a_bin(dic_entradas_gen[entrada], formato)
-                    dic_check[entrada] += dic_entradas_gen[entrada] + separacion
-
-            ok = True
-
-        except Exception as e:
-            print(f"Try: {n_try}")
-            print(type(e), e)
+    # Vista io_check completa (pwm_top_io_check<sufijo>.txt, de tamaño comparable a las entradas y salidas
+    #   juntas). Si no, se genera bajo demanda por ventanas con pwm_top_io_check.py
+    io_check = False
+
+    # Instrumentación: tiempos por etapa, progreso por configuración y, opcionalmente, cProfile
+    #   (perfil) y tracemalloc (memoria), en un informe pwm_top_informe<sufijo>.json
+    instrumentar = False
+    perfil = False
+    memoria = False
+
+    # Duración del escenario en ciclos de reloj (None -> la que salga del sorteo). Con segundos, se calcula a
+    #   partir de la tasa del simulador en ciclos/s (medible con tasa_simulador sobre una simulación anterior)
+    n_ciclos = None
+    segundos = None
+    tasa = None
+
+    # USER ----------------------------------------------------
 
     if worst_case:
-        exportar_txt(dic_salidas, os.path.join(ruta, "pwm_top_outputs_ref_WC.txt"))
-        exportar_txt(dic_entradas, os.path.join(ruta, "pwm_top_inputs_WC.txt"))
-        exportar_txt(dic_check, os.path.join(ruta, "pwm_top_io_check_WC.txt"))
+        parametros = PARAMETROS["worst_case"]
+        sufijo = "_WC"
     else:
-        exportar_txt(dic_salidas, os.path.join(ruta, "pwm_top_outputs_ref.txt"))
-        exportar_txt(dic_entradas, os.path.join(ruta, "pwm_top_inputs.txt"))
-        exportar_txt(dic_check, os.path.join(ruta, "pwm_top_io_check.txt"))
+        parametros = PARAMETROS["normal"]
+        sufijo = ""
+
+    if segundos:
+        n_ciclos = int(segundos*tasa)
+
+    instrumentacion = None
+    if instrumentar:
+        instrumentacion = Instrumentacion(os.path.join(ruta, f"pwm_top_informe{sufijo}.json"), perfil=perfil,
+                                          memoria=memoria)
+
+    random.seed(semilla)
+    generar_ficheros(ruta, **parametros, formato=formato, eventos=eventos, modelo=modelo, sufijo=sufijo,
+                     instrumentacion=instrumentacion, io_check=io_check, n_ciclos=n_ciclos)
@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import itertools
+
+from pwm_top_generator import (COLUMNAS_ENTRADAS, COLUMNAS_SALIDAS, CABECERAS, calcular_offsets, posicion_salida,
+                               generar_salidas_ciclo, trozo_inicio, seg_anadir, seg_expandir, seg_longitud)
+from pwm_top_consulta import ReferenciaPwmTop
+
+
+# Vista io_check bajo demanda: entradas y salidas de un escenario de pwm_top, fila a fila, en una
+#   ventana alrededor de una fila, configuración, ciclo o step. Se genera a partir del escenario
+#   compacto (pwm_top_escenario<sufijo>.json) sin expandir el resto del escenario. Las salidas son las del
+#   fichero de referencia: PWM de las reglas y, si el escenario se generó con el modelo, UNLOCK de
+#   ReferenciaPwmTop (igual al de pwm_top_model).
+#   Uso: python pwm_top_io_check.py [escenario.json] [fila=N | config=C [ciclo=K] [step=S]] [ventana=W]
+
+SEPARACION = "-------"
+
+
+def leer_escenario(archivo):
+    with open(archivo) as f:
+        escenario = json.load(f)
+    configs = escenario["configs"]
+    if len(escenario["entradas"]) != len(configs):
+        raise ValueError(f"{archivo}: {len(escenario['entradas'])} trozos de entradas para {len(configs)} "
+                         f"configuraciones")
+    escenario["offsets"] = calcular_offsets(configs, escenario["n_ceros_inicio"] + 3 + configs[0]["first_upd"])
+    if escenario.get("modelo", True):
+        escenario["referencia"] = ReferenciaPwmTop(configs, escenario["n_ceros_inicio"])
+    return escenario
+
+
+def fila_de(escenario, config, ciclo=1, step=1):
+    """Fila (0 = primera del fichero de salidas) del step de un ciclo de una configuración (desde 1)."""
+
+    fila = posicion_salida(escenario["offsets"][config - 1], escenario["configs"][config - 1], ciclo, step)
+    if fila is None:
+        raise ValueError(f"La configuración {config} no tiene ciclo {ciclo}, step {step}")
+    return fila
+
+
+def recortar(columna, inicio, n):
+    """Segmentos de las muestras [inicio, inicio + n) de una columna segmentada."""
+
+    recortada = []
+    for valor, longitud, paso in columna:
+        if inicio >= longitud:
+            inicio -= longitud
+            continue
+        tomadas = min(longitud - inicio, n)
+        seg_anadir(recortada, valor + inicio*paso, tomadas, paso)
+        n -= tomadas
+        inicio = 0
+        if n <= 0:
+            break
+    return recortada
+
+
+def _entradas(escenario, inicio, n):
+    """Columnas de entradas en [inicio, inicio + n), recorriendo solo los trozos que se solapan."""
+
+    columnas = {clave: [] for clave in COLUMNAS_ENTRADAS}
+    pos = 0
+    for trozo in [trozo_inicio(escenario["n_ceros_inicio"])] + escenario["entradas"]:
+        longitud = sum(seg[1] for seg in trozo["n_addr"])
+        if (pos + longitud > inicio) and (pos < inicio + n):
+            desde = max(inicio - pos, 0)
+            for clave in COLUMNAS_ENTRADAS:
+                for seg in recortar(trozo[clave], desde, min(longitud - desde, inicio + n - pos - desde)):
+                    seg_anadir(columnas[clave], *seg)
+        pos += longitud
+    return columnas
+
+
+def _salidas(escenario, inicio, n):
+    """
+    Columnas de salidas en [inicio, inicio + n), generando solo los ciclos necesarios: las de generar_salidas
+    y, con referencia (escenario generado con el modelo), UNLOCK de ReferenciaPwmTop.
+    """
+
+    configs, offsets = escenario["configs"], escenario["offsets"]
+    columnas = {clave: [] for clave in COLUMNAS_SALIDAS}
+
+    # Filas a cero antes de la primera configuración
+    ceros = offsets[0] - inicio
+    for clave in COLUMNAS_SALIDAS:
+        seg_anadir(columnas[clave], 0, min(ceros, n))
+
+    for config, offset in zip(configs, offsets):
+        longitud_ciclo = config["n_tot_cyc"]
+        if offset + longitud_ciclo*config["ciclos"] <= inicio:
+            continue
+        if offset >= inicio + n:
+            break
+        primero = max(inicio - offset, 0) // longitud_ciclo
+        ultimo = min((inicio + n - offset - 1) // longitud_ciclo, config["ciclos"] - 1)
+        for ciclo in range(primero + 1, ultimo + 2):
+            base = offset + (ciclo - 1)*longitud_ciclo
+            desde = max(inicio - base, 0)
+            hasta = min(inicio + n - base, longitud_ciclo)
+            for clave, columna in generar_salidas_ciclo(config, ciclo).items():
+                for seg in recortar(columna, desde, hasta - desde):
+                    seg_anadir(columnas[clave], *seg)
+
+    if "referencia" in escenario:
+        columnas["unlock"] = escenario["referencia"].unlock_segmentos(inicio, seg_longitud(columnas["pwm"]))
+    return columnas
+
+
+def ventana(escenario, inicio, n):
+    """Filas [inicio, inicio + n) como (fila, valores de entradas, valores de salidas)."""
+
+    inicio = max(inicio, 0)
+    entradas = _entradas(escenario, inicio, n)
+    salidas = _salidas(escenario, inicio, n)
+    filas_entradas = zip(*[seg_expandir(entradas[clave]) for clave in COLUMNAS_ENTRADAS])
+    filas_salidas = zip(*[seg_expandir(salidas[clave]) for clave in COLUMNAS_SALIDAS])
+    # Las entradas acaban antes que las salidas: sus columnas quedan en blanco
+    vacias = ("",)*len(COLUMNAS_ENTRADAS)
+    for k, (fila_entradas, fila_salidas) in enumerate(itertools.zip_longest(filas_entradas, filas_salidas)):
+        if fila_salidas is None:
+            break
+        yield inicio + k, fila_entradas or vacias, fila_salidas
+
+
+def imprimir_ventana(escenario, centro, radio=10):
+    """Imprime la vista io_check de las filas centro - radio ... centro + radio, con separadores entre configuraciones."""
+
+    i_config = COLUMNAS_ENTRADAS.index("n_config")
+    i_config_out = COLUMNAS_SALIDAS.index("n_config_out")
+    cabecera = ["FILA"] + [CABECERAS[clave] for clave in COLUMNAS_ENTRADAS + COLUMNAS_SALIDAS]
+    print(" ".join(f"{campo:<8}" for campo in cabecera).rstrip())
+
+    anterior = None
+    for fila, fila_entradas, fila_salidas in ventana(escenario, centro - radio, 2*radio + 1):
+        configs = (fila_entradas[i_config], fila_salidas[i_config_out])
+        if (anterior is not None) and (configs != anterior):
+            print(" ".join(f"{SEPARACION:<8}" for _ in cabecera).rstrip())
+        anterior = configs
+        prefijo = ">" if fila == centro else ""
+        campos = [f"{prefijo}{fila}"] + list(fila_entradas) + list(fila_salidas)
+        print(" ".join(f"{str(campo):<8}" for campo in campos).rstrip())
+
+
+if __name__ == "__main__":
+
+    ruta = os.path.dirname(os.path.abspath(__file__))
+
+    # USER: Configurar ----------------------------------------
+    # Escenario compacto escrito por pwm_top_generator y filas mostradas a cada lado
+    archivo_escenario = os.path.join(ruta, "pwm_top_escenario.json")
+    radio = 10
+
+    # Posición por defecto: fila del fichero de salidas o (configuración, ciclo, step)
+    posicion = {"config": 1, "ciclo": 1, "step": 1}
+    # USER ----------------------------------------------------
+
+    # Argumentos: [escenario.json] [fila=N | config=C [ciclo=K] [step=S]] [ventana=W]
+    argumentos = {}
+    for argumento in sys.argv[1:]:
+        if "=" in argumento:
+            clave, valor = argumento.split("=", 1)
+            argumentos[clave] = int(valor)
+        else:
+            archivo_escenario = argumento
+    radio = argumentos.pop("ventana", radio)
+    if argumentos:
+        posicion = argumentos
+
+    escenario = leer_escenario(archivo_escenario)
+    if "fila" in posicion:
+        centro = posicion["fila"]
+    else:
+        centro = fila_de(escenario, posicion["config"], posicion.get("ciclo", 1), posicion.get("step", 1))
+    imprimir_ventana(escenario, centro, radio)
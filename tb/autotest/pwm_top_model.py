@@ -0,0 +1,527 @@
+import os
+import itertools
+from collections import deque
+
+from pwm_top_generator import EscritorTxt, seg_anadir, COLUMNAS_ENTRADAS, COLUMNAS_SALIDAS, COLUMNAS_DEBUG
+
+
+# Modelo de referencia de pwm_top (state_ctrlr + pwm_dp_mem + pwm_counter) ciclo a ciclo.
+#   Replica los registros de rtl/ y el orden de los deltas de la simulación que afectan
+#   al resultado (flanco de SWITCH_MEM, lista de sensibilidad de P_FSM, latch de DIN).
+#   En los tramos en los que solo avanzan los contadores salta directamente hasta el
+#   siguiente evento (fin de estado, fin de ciclo o cambio de entradas).
+
+MASCARA = (1 << 32) - 1
+
+S_IDLE, S_INIT, S_INIT_SW, S_NEXT_CYC, S_LAST_CYC, S_END_CYC = range(6)
+ESTADOS_CNT = (S_INIT_SW, S_NEXT_CYC, S_LAST_CYC, S_END_CYC)   # EN_CNT = '1'
+ESTADOS_PULSOS = (S_NEXT_CYC, S_LAST_CYC, S_END_CYC)            # Cuentan pulsos y direcciones
+
+# Orden de los campos de una fila de entradas (sin N_CONFIG, que es de depuración)
+CAMPOS_FILA = ("n_addr", "n_tot_cyc", "pwm_init", "wr_en", "wr_addr", "wr_data", "upd_mem")
+
+
+class ModeloPwmTop:
+    """Estado de pwm_top tras cada flanco de reloj. fila = tupla con los campos de CAMPOS_FILA."""
+
+    def __init__(self, fila, mem_depth=128):
+        self.mem_depth = mem_depth
+        self.fila = fila
+        self.en = 0
+        # state_ctrlr
+        self.n_addr = 0
+        self.n_tot_cyc = 0
+        self.update_flag = 0
+        self.en_d1 = 0
+        self.en_down = 0
+        self.cnt_pulse = 0
+        self.cyc_end = 0
+        self.rd_addr = 0
+        self.state = S_IDLE
+        self.next_state = S_IDLE
+        # pwm_dp_mem
+        self.wr_port = 0
+        self.mem_n_addr = 0
+        self.wr_addr_d1 = MASCARA
+        self.rd_addr_d1 = 0
+        self.switch_d1 = 0
+        self.last_cyc_d1 = 0
+        self.en_cnt_d1 = 0
+        self.prev_last = 0
+        self.prev_last2 = 0
+        self.next_first = 0
+        self.next_first2 = 0
+        self.tmp_last = 0
+        self.tmp_last2 = 0
+        self.early_sw = 1
+        self.din = [0, 0]                   # Latch de DIN_A / DIN_B
+        self.dout = [[0, 0], [0, 0], [0, 0]]    # [BRAM][puerto]: actual, +1, +2
+        self.mem = {}                       # Contenido común de las tres BRAM
+        # pwm_counter
+        self.cnt = 0
+        self.pwm = 0
+        self.cnt_end = 0
+        self.cnt_end_pre = 0
+        self.switch_r = 0
+
+    # Combinacionales ---------------------------------------------------------
+
+    def unlocked(self):
+        return int(self.state not in (S_INIT_SW, S_LAST_CYC, S_END_CYC))
+
+    def status(self):
+        if self.state in (S_IDLE, S_INIT):
+            return 0
+        if ((self.state == S_NEXT_CYC) and not self.en) or (self.state == S_END_CYC):
+            return 1
+        return 3
+
+    def switch_mem(self):
+        return int((self.cyc_end and self.state in (S_INIT_SW, S_LAST_CYC)) or (self.state == S_INIT_SW))
+
+    def salidas(self):
+        return self.pwm, self.unlocked(), self.status()
+
+    def _direcciones(self):
+        """Direcciones de las tres BRAM en cada puerto (A, B)."""
+
+        n_addr, wr_addr, rd_addr = self.mem_n_addr, self.fila[4], self.rd_addr
+        if rd_addr == ((n_addr - 1) & MASCARA):
+            rd_1, rd_2 = 0, 1
+        elif rd_addr == ((n_addr - 2) & MASCARA):
+            rd_1, rd_2 = (rd_addr + 1) & MASCARA, 0
+        else:
+            rd_1, rd_2 = (rd_addr + 1) & MASCARA, (rd_addr + 2) & MASCARA
+        direcciones = []
+        for puerto, offset in enumerate((0, self.mem_depth)):
+            if puerto == self.wr_port:     # Puerto de escritura
+                direcciones.append((wr_addr + offset,) * 3)
+            else:
+                direcciones.append((rd_addr + offset, rd_1 + offset, rd_2 + offset))
+        return direcciones
+
+    def _lecturas(self, switch, en_cnt):
+        """RD_DATA, RD_DATA_NEXT y RD_DATA_NEXT_2 de pwm_dp_mem."""
+
+        puerto = 1 - self.wr_port
+        prev_uno = (self.prev_last == 1)
+        fin_mem = self.last_cyc_d1 and (self.rd_addr_d1 == ((self.mem_n_addr - 1) & MASCARA))
+        if self.switch_d1:
+            rd = self.prev_last
+        elif switch:
+            rd = self.prev_last2 if prev_uno else self.prev_last
+        else:
+            rd = self.dout[0][puerto]
+        if (not en_cnt) or self.switch_d1 or (switch and not prev_uno):
+            rd_1, rd_2 = self.next_first, self.next_first2
+        elif switch:
+            rd_1, rd_2 = 1, self.next_first
+        elif fin_mem and not prev_uno:
+            rd_1, rd_2 = self.next_first, self.next_first2
+        else:
+            rd_1 = self.dout[1][puerto]
+            if self.last_cyc_d1 and (self.rd_addr_d1 == ((self.mem_n_addr - 2) & MASCARA)):
+                rd_2 = self.next_first
+            else:
+                rd_2 = self.dout[2][puerto]
+        return rd, rd_1, rd_2
+
+    def _fsm(self, early_sw):
+        """P_FSM: siguiente estado."""
+
+        state, en = self.state, self.en
+        if state == S_IDLE:
+            return S_INIT if en else S_IDLE
+        if state == S_INIT:
+            if not en:
+                return S_IDLE
+            return S_INIT_SW if (not early_sw) and self.update_flag else S_INIT
+        if state == S_INIT_SW:
+            return S_NEXT_CYC if en else S_IDLE
+        if not self.cyc_end:
+            return state
+        if state == S_NEXT_CYC:
+            if not en:
+                return S_END_CYC
+            return S_LAST_CYC if self.update_flag else S_NEXT_CYC
+        if state == S_LAST_CYC:
+            return S_NEXT_CYC if en else S_END_CYC
+        return S_IDLE
+
+    # Flanco de reloj ---------------------------------------------------------
+
+    def flanco(self, fila_nueva, en=1, en_nuevo=None):
+        """
+        Flanco de subida: los registros muestrean self.fila y el testbench aplica fila_nueva.
+        en es el EN_I que se muestrea en este flanco. Si EN_I lo genera otro registro (control_unit),
+        en_nuevo es el valor que toma tras el flanco, junto con fila_nueva.
+        """
+
+        n_addr_i, n_tot_cyc_i, pwm_init_i, wr_en_i, wr_addr_i, wr_data_i, upd_mem_i = self.fila
+        en_ant = self.en
+        self.en = en
+        state = self.state
+        en_cnt = state in ESTADOS_CNT
+        unlocked = self.unlocked()
+        switch = self.switch_mem()
+        active = en or self.en_d1 or self.en_down
+        wr_en = wr_en_i and unlocked
+        wr_addr = wr_addr_i if unlocked else 0
+        wr_data = wr_data_i if unlocked else 0
+        cnt_len, cnt_len_1, cnt_len_2 = self._lecturas(switch, en_cnt)
+        direcciones = self._direcciones()
+        early_sw = self.early_sw
+        cyc_end = self.cyc_end
+        update_flag = self.update_flag
+
+        # state_ctrlr
+        if not en:
+            self.update_flag = 0
+        elif not early_sw:
+            if upd_mem_i:
+                self.update_flag = 1
+            elif switch:
+                self.update_flag = 0
+        if (not en) and self.en_d1:
+            self.en_down = 1
+        elif state == S_IDLE:
+            self.en_down = 0
+        self.en_d1 = en
+        cnt_pulse = self.cnt_pulse
+        if active and (state in ESTADOS_PULSOS) and not switch:
+            self.cnt_pulse = (cnt_pulse + 1) if cnt_pulse < ((self.n_tot_cyc - 1) & MASCARA) else 0
+        else:
+            self.cnt_pulse = 0
+        self.cyc_end = int(active and (cnt_pulse == ((self.n_tot_cyc - 2) & MASCARA)))
+        rd_addr = self.rd_addr
+        if not active:
+            self.rd_addr = 0
+        elif self.cnt_end_pre:
+            if (state in ESTADOS_PULSOS) and (rd_addr < ((self.n_addr - 1) & MASCARA)):
+                self.rd_addr = rd_addr + 1
+            else:
+                self.rd_addr = 0
+        if active and switch:
+            self.n_addr = n_addr_i
+            self.n_tot_cyc = n_tot_cyc_i
+        self.state = self.next_state
+
+        # pwm_dp_mem
+        if wr_en:
+            self.wr_addr_d1 = wr_addr
+        en_cnt_d1 = self.en_cnt_d1
+        self.rd_addr_d1 = rd_addr
+        self.switch_d1 = switch
+        self.last_cyc_d1 = int(state in (S_INIT_SW, S_LAST_CYC))
+        self.en_cnt_d1 = int(en_cnt)
+        if (not en_cnt) and en_cnt_d1:
+            self.prev_last = self.prev_last2 = self.next_first = self.next_first2 = 0
+            self.tmp_last = self.tmp_last2 = 0
+        elif wr_en:
+            if wr_addr == 0:
+                self.next_first = wr_data
+                if early_sw and (self.mem_n_addr > 1):
+                    self.prev_last, self.prev_last2 = self.tmp_last, self.tmp_last2
+                else:
+                    self.prev_last = self.prev_last2 = 0
+            elif wr_addr == 1:
+                self.next_first2 = wr_data
+            self.tmp_last, self.tmp_last2 = wr_data, self.tmp_last
+        if switch:
+            self.early_sw = 1
+        elif wr_en:
+            self.early_sw = 0
+        # BRAM en modo read-first: leen todas antes de escribir
+        mem = self.mem
+        for puerto in (0, 1):
+            for bram in (0, 1, 2):
+                self.dout[bram][puerto] = mem.get(direcciones[puerto][bram], 0)
+        mem[direcciones[self.wr_port][0]] = self.din[self.wr_port]
+
+        # pwm_counter
+        switch_r = self.switch_r
+        self.switch_r = switch
+        cnt = self.cnt
+        if not en_cnt:
+            self.cnt = 0
+            self.pwm = 0
+        elif cnt_len > 0:
+            if cnt < cnt_len - 1:
+                self.cnt = cnt + 1
+            else:
+                self.cnt = 0
+                self.pwm = pwm_init_i if switch_r else 1 - self.pwm
+        else:
+            self.pwm = pwm_init_i if switch_r else 0
+        self.cnt_end = int(en_cnt and (((cnt_len > 1) and ((cnt == cnt_len - 2) or
+                                                          ((cnt == cnt_len - 1) and (cnt_len_1 == 1)))) or
+                                       ((cnt_len == 1) and (cnt_len_1 == 1))))
+        self.cnt_end_pre = int(en_cnt and self._fin_anticipado(cnt, cnt_len, cnt_len_1, cnt_len_2, switch))
+
+        # Deltas posteriores al flanco ----------------------------------------
+        self.fila = fila_nueva
+        if en_nuevo is not None:
+            self.en = en_nuevo
+        # P_FSM solo se evalúa si cambia alguna señal de su lista de sensibilidad,
+        #   y lo hace con el EARLY_SW anterior al flanco
+        if (self.state != state) or (self.en != en_ant) or (self.cyc_end != cyc_end) or (self.update_flag != update_flag):
+            self.next_state = self._fsm(early_sw)
+        # SWITCH_MEM pasa por un valor intermedio (CYC_END y STATE nuevos, LAST_CYC anterior):
+        #   cada flanco de subida conmuta los puertos y registra el N_ADDR recién aplicado
+        intermedio = int((self.cyc_end and state in (S_INIT_SW, S_LAST_CYC)) or (self.state == S_INIT_SW))
+        for anterior, actual in ((switch, intermedio), (intermedio, self.switch_mem())):
+            if actual and not anterior:
+                self.wr_port = 1 - self.wr_port
+                self.mem_n_addr = fila_nueva[0]
+        # Latch de DIN: transparente mientras se escribe una dirección nueva
+        if self.unlocked() and fila_nueva[3] and (fila_nueva[4] != self.wr_addr_d1):
+            self.din[self.wr_port] = fila_nueva[5]
+
+    @staticmethod
+    def _fin_anticipado(cnt, cnt_len, cnt_len_1, cnt_len_2, switch):
+        """P_CNT_END_PRE de pwm_counter."""
+
+        if cnt_len > 2:
+            if cnt == cnt_len - 3:
+                return True
+            if cnt_len_1 == 2:
+                return cnt == cnt_len - 1
+            if cnt_len_1 == 1:
+                return (cnt == cnt_len - 2) or ((cnt_len_2 == 1) and (cnt == cnt_len - 1))
+            return False
+        if cnt_len == 2:
+            if cnt_len_1 == 2:
+                return cnt == 1
+            if cnt_len_1 == 1:
+                return (cnt == 0) or ((cnt_len_2 == 1) and (cnt == 1))
+            return False
+        if cnt_len == 1:
+            return (cnt_len_1 == 2) or ((cnt_len_1 == 1) and (cnt_len_2 == 1))
+        return (cnt_len_1 == 1) and (switch or (cnt_len_2 == 1))
+
+    # Salto entre eventos -----------------------------------------------------
+
+    def _foto(self):
+        """Todo el estado salvo los contadores libres (CNT y CNT_PULSE) y el contenido de la memoria."""
+
+        foto = dict(self.__dict__)
+        for clave in ("cnt", "cnt_pulse", "mem", "din", "dout"):
+            del foto[clave]
+        return foto, tuple(self.din), tuple(map(tuple, self.dout))
+
+    def _margen(self, paso_cnt, paso_pulsos, cnt_ant, pulsos_ant):
+        """Flancos que se pueden saltar sin que ningún contador alcance un valor que se compare."""
+
+        margen = None
+        if paso_cnt:
+            cnt_len = self._lecturas(self.switch_mem(), self.state in ESTADOS_CNT)[0]
+            umbrales = {cnt_len - 3, cnt_len - 2, cnt_len - 1, 0, 1}
+            if cnt_ant in umbrales:
+                return 0
+            margen = min(u - self.cnt for u in umbrales if u >= self.cnt)
+        if paso_pulsos:
+            umbrales = {(self.n_tot_cyc - 1) & MASCARA, (self.n_tot_cyc - 2) & MASCARA}
+            if pulsos_ant in umbrales:
+                return 0
+            margen_pulsos = min(u - self.cnt_pulse for u in umbrales if u >= self.cnt_pulse)
+            margen = margen_pulsos if margen is None else min(margen, margen_pulsos)
+        return margen
+
+    def flanco_fijo(self, n, en=1):
+        """
+        Flanco con las entradas fijas. Devuelve (salto, paso_cnt, paso_pulsos): durante los salto
+        flancos siguientes (salto <= n) solo avanzarían CNT y CNT_PULSE, cada uno en su paso.
+        """
+
+        foto = self._foto()
+        cnt, pulsos = self.cnt, self.cnt_pulse
+        self.flanco(self.fila, en)
+        if n == 0:
+            return 0, 0, 0
+        paso_cnt, paso_pulsos = self.cnt - cnt, self.cnt_pulse - pulsos
+        if (paso_cnt not in (0, 1)) or (paso_pulsos not in (0, 1)) or (self._foto() != foto):
+            return 0, 0, 0
+        margen = self._margen(paso_cnt, paso_pulsos, cnt, pulsos)
+        salto = n if margen is None else min(n, margen)
+        return salto, paso_cnt, paso_pulsos
+
+    def avanzar_contadores(self, salto, paso_cnt, paso_pulsos):
+        self.cnt += paso_cnt * salto
+        self.cnt_pulse += paso_pulsos * salto
+
+    def saltar(self, n):
+        """Intenta avanzar hasta n flancos con las entradas fijas. Devuelve los flancos avanzados (>= 1)."""
+
+        salto, paso_cnt, paso_pulsos = self.flanco_fijo(n - 1)
+        self.avanzar_contadores(salto, paso_cnt, paso_pulsos)
+        return 1 + salto
+
+
+class SimuladorPwmTop:
+    """
+    Simulación incremental de pwm_top: recibe las entradas como eventos (duración, fila) tal y como
+    las aplica el testbench (la fila k se aplica en el flanco k y el DUT la muestrea en el k+1) y
+    devuelve los eventos de salida (duración, (pwm, unlocked, status)) que ya se pueden calcular.
+    """
+
+    def __init__(self, mem_depth=128):
+        self.mem_depth = mem_depth
+        self.pendientes = deque()
+        self.modelo = None
+        self.quedan = 0             # Flancos que aplican todavía la fila actual
+        self.filas = 0              # Filas de salida calculadas
+        self.salida = None          # Evento de salida en curso
+        self.n_salida = 0
+
+    def _crear_modelo(self, fila):
+        return ModeloPwmTop(fila, self.mem_depth)
+
+    def anadir(self, duracion, fila):
+        if duracion > 0:
+            self.pendientes.append((duracion, fila))
+
+    def avanzar(self, n_filas=None, final=False):
+        """Avanza hasta n_filas filas de salida o hasta agotar las entradas conocidas.
+        Con final = True se mantiene la última fila de entradas y se emite el último evento."""
+
+        if self.modelo is None:
+            if not self.pendientes:
+                return
+            duracion, fila = self.pendientes.popleft()
+            self.modelo = self._crear_modelo(fila)
+            self.quedan = duracion - 1
+            self.filas = 1
+            self.salida, self.n_salida = self.modelo.salidas(), 1
+        modelo = self.modelo
+        while (n_filas is None) or (self.filas < n_filas):
+            if self.quedan == 0:
+                if self.pendientes:
+                    duracion, fila = self.pendientes.popleft()
+                elif final:
+                    duracion, fila = n_filas, modelo.fila
+                else:
+                    break
+                modelo.flanco(fila)
+                self.quedan = duracion - 1
+                avance = 1
+            else:
+                avance = modelo.saltar(self.quedan if n_filas is None else min(self.quedan, n_filas - self.filas))
+                self.quedan -= avance
+            self.filas += avance
+            actual = modelo.salidas()
+            if actual == self.salida:
+                self.n_salida += avance
+            else:
+                yield self.n_salida, self.salida
+                self.salida, self.n_salida = actual, avance
+        if final and self.n_salida:
+            yield self.n_salida, self.salida
+            self.n_salida = 0
+
+
+def simular(eventos, n_filas, mem_depth=128):
+    """Genera los eventos de salida de las n_filas primeras filas a partir de los eventos de entrada."""
+
+    simulador = SimuladorPwmTop(mem_depth)
+    for duracion, fila in eventos:
+        simulador.anadir(duracion, fila)
+        yield from simulador.avanzar(n_filas)
+    yield from simulador.avanzar(n_filas, final=True)
+
+
+def base_formato(formato):
+    """Base numérica de los ficheros escritos con un formato de int_a_bin."""
+
+    if not formato:
+        return 10
+    return 16 if formato[-1] in "xX" else 2
+
+
+def leer_eventos(archivo, eventos=False, base=2, campos=CAMPOS_FILA, columnas=COLUMNAS_ENTRADAS):
+    """Lee un fichero de entradas de pwm_top_autotest_tb como eventos (duración, fila con los campos indicados)."""
+
+    indices = [columnas.index(campo) for campo in campos]
+    with open(archivo) as f:
+        for linea in f:
+            valores = linea.split()
+            if not valores:
+                continue
+            duracion = int(valores.pop(0)) if eventos else 1
+            yield duracion, tuple(int(valores[i], base) for i in indices)
+
+
+def columnas_modelo(eventos_salida):
+    """Columnas segmentadas pwm y unlock a partir de eventos de salida del modelo."""
+
+    columnas = {"pwm": [], "unlock": []}
+    for duracion, (pwm, unlocked, _) in eventos_salida:
+        seg_anadir(columnas["pwm"], pwm, duracion)
+        seg_anadir(columnas["unlock"], unlocked, duracion)
+    return columnas
+
+
+def exportar_salidas(eventos_salida, archivo, formato=None, eventos=False):
+    """Escribe las salidas del modelo con las columnas de pwm_top_outputs_ref (depuración a 0)."""
+
+    with EscritorTxt(archivo, COLUMNAS_SALIDAS, formato, eventos, COLUMNAS_DEBUG) as escritor:
+        for evento in eventos_salida:
+            dic = columnas_modelo([evento])
+            for clave in COLUMNAS_DEBUG:
+                if clave in COLUMNAS_SALIDAS:
+                    dic[clave] = [(0, evento[0], 0)]
+            escritor.anadir(dic)
+
+
+def comparar_salidas(eventos_salida, archivo, eventos=False, base=2, columnas=("pwm", "unlock")):
+    """Compara las columnas indicadas con un fichero de salidas. Devuelve la primera fila distinta o None."""
+
+    indices = [COLUMNAS_SALIDAS.index(clave) for clave in columnas]
+    with open(archivo) as f:
+        filas = (linea.split() for linea in f if linea.strip())
+        if eventos:
+            filas = itertools.chain.from_iterable(itertools.repeat(v[1:], int(v[0])) for v in filas)
+        fila = 0
+        for duracion, (pwm, unlocked, _) in eventos_salida:
+            esperado = [{"pwm": pwm, "unlock": unlocked}[clave] for clave in columnas]
+            for valores in itertools.islice(filas, duracion):
+                if [int(valores[i], base) for i in indices] != esperado:
+                    return fila
+                fila += 1
+    return None
+
+
+if __name__ == "__main__":
+
+    ruta = os.path.dirname(os.path.abspath(__file__))
+
+    # USER: Configurar ----------------------------------------
+    # Entradas de pwm_top_autotest_tb y salidas de la simulación con las que contrastar el modelo
+    archivo_entradas = os.path.join(ruta, "pwm_top_inputs.txt")
+    archivo_salidas = os.path.join(ruta, "pwm_top_outputs.txt")
+    formato = "08b"         # Formato de ambos ficheros ("032b", "08b", "08x"...)
+    eventos = False         # Ficheros en modo eventos (C_EVENTS = true)
+
+    # Columnas a comparar. El UNLOCKED de pwm_top_outputs.txt es anterior al state_ctrlr actual
+    #   (se mantenía bloqueado dos ciclos tras cada cambio), así que con ese fichero solo vale PWM.
+    columnas = ("pwm",)
+
+    # Si se indica, se escriben también aquí las salidas del modelo (mismo formato)
+    archivo_modelo = None
+    # USER ----------------------------------------------------
+
+    base = base_formato(formato)
+    with open(archivo_salidas) as f:
+        if eventos:
+            n_filas = sum(int(linea.split()[0]) for linea in f if linea.strip())
+        else:
+            n_filas = sum(1 for linea in f if linea.strip())
+
+    fila = comparar_salidas(simular(leer_eventos(archivo_entradas, eventos, base), n_filas), archivo_salidas,
+                            eventos, base, columnas)
+    if fila is None:
+        print(f"Modelo == {archivo_salidas} ({n_filas} filas, {', '.join(columnas)})")
+    else:
+        print(f"Modelo != {archivo_salidas} en la fila {fila}")
+
+    if archivo_modelo:
+        exportar_salidas(simular(leer_eventos(archivo_entradas, eventos, base), n_filas), archivo_modelo, formato, eventos)
@@ -0,0 +1,100 @@
+import os
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pwm_top_generator import generar_ficheros, PARAMETROS
+
+
+# Generación por lotes de escenarios de pwm_top para regresión.
+#   Cada escenario (conjunto de parámetros + semilla) se genera en un proceso independiente y en
+#   su propio directorio, junto a un manifest.json con todo lo necesario para reproducirlo.
+
+MANIFIESTO = "manifest.json"
+
+
+def nombre_escenario(nombre_parametros, semilla):
+    return f"{nombre_parametros}_s{semilla:06d}"
+
+
+def generar_caso(directorio, nombre_parametros, parametros, semilla, opciones):
+    """Genera un escenario con una semilla fija y escribe su manifiesto. Se ejecuta en un proceso del pool."""
+
+    os.makedirs(directorio, exist_ok=True)
+    random.seed(semilla)
+    resultado = generar_ficheros(directorio, **parametros, **opciones)
+
+    manifiesto = {
+        "escenario": os.path.basename(directorio),
+        "semilla": semilla,
+        "nombre_parametros": nombre_parametros,
+        "parametros": parametros,
+        "opciones": opciones,
+        "intentos": resultado["n_try"],
+        "divergencias_pwm": resultado["divergencias_pwm"],
+        "archivos": [os.path.basename(archivo) for archivo in resultado["archivos"]],
+    }
+    with open(os.path.join(directorio, MANIFIESTO), "w") as f:
+        json.dump(manifiesto, f, indent=4)
+    return manifiesto
+
+
+def generar_lote(directorio_base, conjuntos, semillas, opciones, n_procesos=None):
+    """Genera en paralelo todos los escenarios (conjunto de parámetros x semilla). Devuelve sus manifiestos."""
+
+    casos = []
+    for nombre_parametros, parametros in conjuntos.items():
+        for semilla in semillas:
+            directorio = os.path.join(directorio_base, nombre_escenario(nombre_parametros, semilla))
+            casos.append((directorio, nombre_parametros, parametros, semilla, opciones))
+
+    manifiestos = []
+    with ProcessPoolExecutor(max_workers=n_procesos) as pool:
+        futuros = [pool.submit(generar_caso, *caso) for caso in casos]
+        for futuro in as_completed(futuros):
+            manifiestos.append(futuro.result())
+    manifiestos.sort(key=lambda m: m["escenario"])
+
+    with open(os.path.join(directorio_base, "index.json"), "w") as f:
+        json.dump([m["escenario"] for m in manifiestos], f, indent=4)
+    return manifiestos
+
+
+def reproducir(archivo_manifiesto, directorio=None):
+    """Regenera un escenario a partir de su manifest.json (por defecto, en su mismo directorio)."""
+
+    with open(archivo_manifiesto) as f:
+        manifiesto = json.load(f)
+    if directorio is None:
+        directorio = os.path.dirname(os.path.abspath(archivo_manifiesto))
+    return generar_caso(directorio, manifiesto["nombre_parametros"], manifiesto["parametros"],
+                        manifiesto["semilla"], manifiesto["opciones"])
+
+
+if __name__ == "__main__":
+
+    ruta = os.path.dirname(os.path.abspath(__file__))
+
+    # USER: Configurar ----------------------------------------
+    # Directorio del lote: un subdirectorio <parámetros>_s<semilla> por escenario
+    directorio_base = os.path.join(ruta, "regresion")
+
+    # Semillas y conjuntos de parámetros (todas las combinaciones)
+    semillas = range(1, 17)
+    conjuntos = {"normal": PARAMETROS["normal"]}
+
+    # Opciones de generar_ficheros comunes a todo el lote
+    opciones = {"formato": "08x", "eventos": True, "modelo": True}
+
+    # Procesos en paralelo (None -> uno por núcleo)
+    n_procesos = None
+
+    # Si se indica un manifest.json solo se regenera ese escenario
+    manifiesto = None
+    # USER ----------------------------------------------------
+
+    if manifiesto:
+        reproducir(manifiesto)
+    else:
+        manifiestos = generar_lote(directorio_base, conjuntos, semillas, opciones, n_procesos)
+        print(f"{len(manifiestos)} escenarios generados en {directorio_base}")
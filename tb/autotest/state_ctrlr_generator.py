@@ -0,0 +1,282 @@
+import random
+import os
+from itertools import groupby
+
+from pwm_top_generator import EscritorTxt, PARAMETROS, generar_config
+from pwm_top_model import (SimuladorPwmTop, MASCARA, S_IDLE, S_INIT, S_INIT_SW, S_NEXT_CYC, S_LAST_CYC, S_END_CYC,
+                           ESTADOS_CNT, ESTADOS_PULSOS)
+
+
+# Generador de vectores aleatorios de larga duración para state_ctrlr_autotest_tb.
+#   Las entradas se generan por transacciones (configuración, UPD_MEM, ciclos con CNT_END y CNT_END_PRE a
+#   pulsos y apagados) y las salidas de referencia las calcula ModeloStateCtrlr, que replica
+#   rtl/state_ctrlr.vhd y salta directamente entre eventos mientras solo avanza el contador de pulsos.
+#   Como en pwm_counter, CNT_END marca el último ciclo de cada estado y CNT_END_PRE el anterior: solo
+#   CNT_END_PRE hace avanzar RD_ADDR. El testbench lleva EARLY_SW_I a '0' y EN_WR_CONFIG es UNLOCKED_O.
+#   Las columnas NEXT_CONFIG solo llevan los primeros datos de la configuración a título informativo:
+#   el state_ctrlr actual no tiene esa entrada.
+
+MASCARA_ADDR = (1 << 8) - 1     # N_ADDR y RD_ADDR: C_MEM_SIZE_MAX_L2 = 8 bits
+N_NEXT_CONFIG = 7
+
+# Columnas de state_ctrlr_autotest_tb, en su orden
+COLUMNAS_ENTRADAS = ("en", "n_addr", "n_tot_cyc", "upd_mem", "cnt_end", "cnt_end_pre") + \
+                    tuple(f"next_config_{i}" for i in range(N_NEXT_CONFIG))
+COLUMNAS_SALIDAS = ("rd_addr", "en_cnt", "switch_mem", "last_cyc", "en_wr_config")
+
+
+class ModeloStateCtrlr:
+    """Estado de state_ctrlr tras cada flanco de reloj. fila = tupla con los campos de COLUMNAS_ENTRADAS."""
+
+    def __init__(self, fila):
+        self.fila = fila
+        self.n_addr = 0
+        self.n_tot_cyc = 0
+        self.update_flag = 0
+        self.en_d1 = 0
+        self.en_down = 0
+        self.cnt_pulse = 0
+        self.cyc_end = 0
+        self.rd_addr = 0
+        self.state = S_IDLE
+
+    # Combinacionales ---------------------------------------------------------
+
+    def last_cyc(self):
+        return int(self.state in (S_INIT_SW, S_LAST_CYC))
+
+    def switch_mem(self):
+        return int((self.cyc_end and self.last_cyc()) or (self.state == S_INIT_SW))
+
+    def salidas(self):
+        state = self.state
+        return (self.rd_addr, int(state in ESTADOS_CNT), self.switch_mem(), self.last_cyc(),
+                int(state not in (S_INIT_SW, S_LAST_CYC, S_END_CYC)))
+
+    def _fsm(self, en):
+        """P_FSM con EARLY_SW_I = '0'."""
+
+        state = self.state
+        if state == S_IDLE:
+            return S_INIT if en else S_IDLE
+        if state == S_INIT:
+            if not en:
+                return S_IDLE
+            return S_INIT_SW if self.update_flag else S_INIT
+        if state == S_INIT_SW:
+            return S_NEXT_CYC if en else S_IDLE
+        if not self.cyc_end:
+            return state
+        if state == S_NEXT_CYC:
+            if not en:
+                return S_END_CYC
+            return S_LAST_CYC if self.update_flag else S_NEXT_CYC
+        if state == S_LAST_CYC:
+            return S_NEXT_CYC if en else S_END_CYC
+        return S_IDLE
+
+    # Flanco de reloj ---------------------------------------------------------
+
+    def flanco(self, fila_nueva):
+        """Flanco de subida: los registros muestrean self.fila y el testbench aplica fila_nueva."""
+
+        en, n_addr_i, n_tot_cyc_i, upd_mem_i, _, cnt_end_pre_i = self.fila[:6]
+        state = self.state
+        siguiente = self._fsm(en)
+        switch = self.switch_mem()
+        active = en or self.en_d1 or self.en_down
+
+        if not en:
+            self.update_flag = 0
+        elif upd_mem_i:
+            self.update_flag = 1
+        elif switch:
+            self.update_flag = 0
+        if (not en) and self.en_d1:
+            self.en_down = 1
+        elif state == S_IDLE:
+            self.en_down = 0
+        self.en_d1 = en
+        cnt_pulse = self.cnt_pulse
+        if active and (state in ESTADOS_PULSOS) and not switch:
+            self.cnt_pulse = (cnt_pulse + 1) if cnt_pulse < ((self.n_tot_cyc - 1) & MASCARA) else 0
+        else:
+            self.cnt_pulse = 0
+        self.cyc_end = int(active and (cnt_pulse == ((self.n_tot_cyc - 2) & MASCARA)))
+        if not active:
+            self.rd_addr = 0
+        elif cnt_end_pre_i:
+            if (state in ESTADOS_PULSOS) and (self.rd_addr < ((self.n_addr - 1) & MASCARA_ADDR)):
+                self.rd_addr += 1
+            else:
+                self.rd_addr = 0
+        if active and switch:
+            self.n_addr = n_addr_i & MASCARA_ADDR
+            self.n_tot_cyc = n_tot_cyc_i
+        self.state = siguiente
+        self.fila = fila_nueva
+
+    # Salto entre eventos -----------------------------------------------------
+
+    def _foto(self):
+        return (self.n_addr, self.n_tot_cyc, self.update_flag, self.en_d1, self.en_down, self.cyc_end,
+                self.rd_addr, self.state)
+
+    def saltar(self, n):
+        """Avanza hasta n flancos con las entradas fijas. Devuelve los flancos avanzados (>= 1)."""
+
+        foto = self._foto()
+        pulsos = self.cnt_pulse
+        self.flanco(self.fila)
+        paso = self.cnt_pulse - pulsos
+        if (n == 1) or (paso not in (0, 1)) or (self._foto() != foto):
+            return 1
+        if paso == 0:
+            return n
+        # Solo avanza CNT_PULSE: se salta hasta el primer valor con el que se compara
+        umbrales = {(self.n_tot_cyc - 1) & MASCARA, (self.n_tot_cyc - 2) & MASCARA}
+        if pulsos in umbrales:
+            return 1
+        salto = min((u - self.cnt_pulse for u in umbrales if u >= self.cnt_pulse), default=0)
+        salto = min(n - 1, salto)
+        self.cnt_pulse += salto
+        return 1 + salto
+
+
+class SimuladorStateCtrlr(SimuladorPwmTop):
+    """SimuladorPwmTop con ModeloStateCtrlr: eventos de entrada (duración, fila) y de salida (duración, salidas)."""
+
+    def _crear_modelo(self, fila):
+        return ModeloStateCtrlr(fila)
+
+
+def generar_entradas(n_config, n_max_estados, n_max_dato, n_max_ciclos, p_apagar=0.15, p_upd_repetido=0.1,
+                     n_ceros_inicio=5):
+    """
+    Genera los eventos (duración, fila) de un escenario aleatorio. Por configuración:
+    - N_ADDR, N_TOT_CYC y NEXT_CONFIG nuevos y un pulso de UPD_MEM (a veces repetido).
+    - Sus ciclos con CNT_END y CNT_END_PRE a pulsos según los datos, empezando con los de la configuración anterior
+      hasta dar tiempo al cambio de memoria (final del ciclo siguiente al update).
+    - Con probabilidad p_apagar, EN a '0' en un punto aleatorio durante un tiempo aleatorio.
+    """
+
+    fila = dict.fromkeys(COLUMNAS_ENTRADAS, 0)
+
+    def escribir(duracion, **cambios):
+        fila.update(cambios)
+        return duracion, tuple(fila[clave] for clave in COLUMNAS_ENTRADAS)
+
+    def marcas(duracion, datos):
+        """Ciclos (en orden) de los pulsos: CNT_END en el último ciclo de cada dato y CNT_END_PRE en el anterior"""
+        fin, i = -1, 0
+        while True:
+            fin += datos[i % len(datos)]
+            if fin >= duracion:
+                return
+            if fin > 0:
+                yield fin - 1, "cnt_end_pre"
+            yield fin, "cnt_end"
+            i += 1
+
+    def pulsos(duracion, datos):
+        """
+        CNT_END y CNT_END_PRE a pulsos, repitiendo los datos de la configuración. Si el primer dato es 1, su
+        CNT_END_PRE caería en el ciclo anterior a la llamada y se omite.
+        """
+        pos = 0
+        for ciclo, grupo in groupby(marcas(duracion, datos), key=lambda marca: marca[0]):
+            if ciclo > pos:
+                yield escribir(ciclo - pos, cnt_end=0, cnt_end_pre=0)
+            claves = {clave for _, clave in grupo}
+            yield escribir(1, cnt_end=int("cnt_end" in claves), cnt_end_pre=int("cnt_end_pre" in claves))
+            pos = ciclo + 1
+        if duracion > pos:
+            yield escribir(duracion - pos, cnt_end=0, cnt_end_pre=0)
+
+    yield escribir(n_ceros_inicio)
+    datos_prev, periodo_prev = [1], 0
+    for index in range(n_config):
+        config = generar_config(index, n_max_estados, n_max_dato, n_max_ciclos)
+        datos, periodo = config["wr_data"], config["n_tot_cyc"]
+        next_config = (datos + [0] * N_NEXT_CONFIG)[:N_NEXT_CONFIG]
+        yield escribir(random.randint(1, 10), en=1, n_addr=config["n_addr"], n_tot_cyc=periodo, cnt_end=0,
+                       cnt_end_pre=0, **{f"next_config_{i}": dato for i, dato in enumerate(next_config)})
+        yield escribir(1, upd_mem=1)
+        yield escribir(1, upd_mem=0)
+        if random.random() < p_upd_repetido:
+            yield escribir(random.randint(1, periodo), upd_mem=0)
+            yield escribir(1, upd_mem=1)
+            yield escribir(1, upd_mem=0)
+
+        # Cambio de memoria con la configuración anterior y ciclos de la nueva
+        yield from pulsos(2*periodo_prev + 4, datos_prev)
+        total = config["ciclos"]*periodo
+        if random.random() < p_apagar:
+            encendido = random.randint(0, total)
+            yield from pulsos(encendido, datos)
+            yield escribir(random.randint(1, 2*periodo + 10), en=0, cnt_end=0, cnt_end_pre=0)
+            yield escribir(random.randint(1, 10), en=1)
+            # Tras el apagado hace falta otro update para volver a arrancar
+            yield escribir(1, upd_mem=1)
+            yield escribir(1, upd_mem=0)
+            total -= encendido
+        yield from pulsos(total, datos)
+        datos_prev, periodo_prev = datos, periodo
+
+    yield escribir(2*periodo_prev + 10, en=0, cnt_end=0, cnt_end_pre=0)
+
+
+def generar_ficheros(directorio, n_config, n_max_estados, n_max_dato, n_max_ciclos, formato="08x", sufijo="_aleatorio",
+                     **opciones):
+    """Genera un escenario aleatorio y exporta a directorio las entradas y las salidas de referencia."""
+
+    archivo_entradas = os.path.join(directorio, f"state_ctrlr_inputs{sufijo}.txt")
+    archivo_salidas = os.path.join(directorio, f"state_ctrlr_outputs_ref{sufijo}.txt")
+
+    simulador = SimuladorStateCtrlr()
+    n_filas = 0
+
+    def columnas(eventos_salida):
+        dic = {clave: [] for clave in COLUMNAS_SALIDAS}
+        for duracion, salida in eventos_salida:
+            for clave, valor in zip(COLUMNAS_SALIDAS, salida):
+                dic[clave].append((valor, duracion, 0))
+        return dic
+
+    with EscritorTxt(archivo_salidas, COLUMNAS_SALIDAS, formato) as escritor_salidas, \
+         EscritorTxt(archivo_entradas, COLUMNAS_ENTRADAS, formato) as escritor_entradas:
+
+        for duracion, fila in generar_entradas(n_config, n_max_estados, n_max_dato, n_max_ciclos, **opciones):
+            escritor_entradas.anadir({clave: [(valor, duracion, 0)] for clave, valor in zip(COLUMNAS_ENTRADAS, fila)})
+            simulador.anadir(duracion, fila)
+            n_filas += duracion
+            escritor_salidas.anadir(columnas(simulador.avanzar()))
+
+        escritor_salidas.anadir(columnas(simulador.avanzar(n_filas, final=True)))
+
+    return {"archivos": [archivo_entradas, archivo_salidas], "n_filas": n_filas}
+
+
+if __name__ == "__main__":
+
+    ruta = os.path.dirname(os.path.abspath(__file__))
+
+    # USER: Configurar ----------------------------------------
+    # Parámetros de las configuraciones: los de PARAMETROS["normal"] o PARAMETROS["worst_case"]
+    parametros = PARAMETROS["normal"]
+
+    # Formato de los ficheros: N_TOT_CYC es de 32 bits, así que state_ctrlr_autotest_tb necesita
+    #   C_WIDTH = 32 (y C_HEX = true con "08x")
+    formato = "08x"
+
+    # Sufijo de los ficheros: sin él se sobrescribirían state_ctrlr_inputs.txt y state_ctrlr_outputs_ref.txt, los
+    #   vectores de WaveDrom (wavedrom_to_txt) que lee por defecto state_ctrlr_autotest_tb (C_WIDTH = 8)
+    sufijo = "_aleatorio"
+
+    # Semilla del generador aleatorio (None -> escenario distinto en cada ejecución)
+    semilla = None
+    # USER ----------------------------------------------------
+
+    random.seed(semilla)
+    resultado = generar_ficheros(ruta, **parametros, formato=formato, sufijo=sufijo)
+    print(f"{resultado['n_filas']} ciclos de reloj")
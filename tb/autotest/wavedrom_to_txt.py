@@ -5,10 +5,35 @@
 # Este módulo toma como entrada un fichero .jason y exporta los datos a un fichero .txt.
 # El objetivo es generar en última instancia un autotest de vhdl.
 
+import os
 import json
 import sys
 import re
-from pprint import pprint as pp
+import hashlib
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import binarizar
+
+
+# Formatos de dato admitidos por los autotest (C_WIDTH = 8):
+#   "08b" -> binario, leído con read
+#   "02x" -> hexadecimal, leído con hread (C_HEX = true)
+FORMATOS = ("08b", "02x")
+
+# Cada diagrama <nombre>.json lleva al lado su tabla de orden <nombre>.orden.json: una entrada
+#   {"nombre", "tipo", "orden"} por señal, con tipo "I" (entrada), "O" (salida) o "NO" (descartada)
+SUFIJO_ORDEN = ".orden.json"
+
+# Por cada diagrama ya convertido, su huella (contenido del diagrama y de su orden + formato + código del
+#   conversor) y el hash de sus ficheros de salida, para volver a convertirlo si otro script los sobrescribe
+CACHE = ".wavedrom_cache.json"
+
+# Un '|' en las ondas separa tramos. La clave opcional "repeticiones" del diagrama ([N0, N1, ...],
+#   ignorada por WaveDrom) indica cuántas veces se escribe cada tramo; los que no aparecen, una vez
+BLOQUE = 1 << 20    # Bytes por copia al concatenar ficheros
 
 
 def pseudojson_a_json (texto: str) -> str:
@@ -31,6 +56,7 @@ def pseudojson_a_json (texto: str) -> str:
 
 
 def procesar_json (ruta_json):
+    """Devuelve las señales del diagrama y las repeticiones de sus tramos"""
     with open(ruta_json, "r", encoding="utf-8") as f:
         raw = f.read()
 
@@ -54,12 +80,12 @@ def procesar_json (ruta_json):
             "info": fila.get("data", [])
         }
         resultado.append(dic)
-    return resultado
+    return resultado, data.get("repeticiones", [])
 
 
-def tabular_datos (signal):
+def tabular_datos (signal, formato="08b"):
     """Convierte las señales en forma de diccionario a tablas de datos"""
-    datos = {"nombre": "", "datos": []}
+    datos = {"nombre": "", "datos": [], "cortes": [], "formato": formato}
     datos_wd = []
     datos_n = []
     datos_slv = []
@@ -88,7 +114,7 @@ def tabular_datos (signal):
         elif (valor == "."):
             last = last
         elif (valor == "|"):
-            datos_n.append("REPEAT")
+            datos["cortes"].append(len(datos_n))    # Fin de un tramo
             continue
         elif signal["info"]:
             last = signal["info"][j]
@@ -96,21 +122,18 @@ def tabular_datos (signal):
         datos_n.append(last)
     # print(datos_n)
 
-    # Convertir los datos a binario
+    # Convertir los datos a enteros. El texto binario (o hexadecimal) se genera en bloque al exportar
     # NOTE (*) Tener en cuenta que el autotest.vhd solo reconoce bit, es decir, 1 o 0
+    if formato not in FORMATOS:
+        raise ValueError("Formato desconocido")
     for valor in datos_n:
         if valor == "U":
-            if formato == "08b":
-                # datos_slv.append("UUUUUUUU") (*)
-                datos_slv.append("00000000")
-            else:
-                raise ValueError("Formato desconocido")
-        elif valor == "REPEAT":
-            datos_slv.append("UUUUUUUU")
+            # datos_slv.append("U"*ancho) (*)
+            datos_slv.append(0)
         elif valor.isdigit():
-            datos_slv.append(format(int(valor), formato))
+            datos_slv.append(int(valor))
         else:
-            datos_slv.append("XXXXXXXX")
+            datos_slv.append(binarizar.DESCONOCIDO)   # "X"*ancho
     # print(datos_slv)
 
     # Lista completa
@@ -121,121 +144,191 @@ def tabular_datos (signal):
     return datos
 
 
-def exportar_txt (tabla_ordenada, fichero):
-    """Extrae, traspone y exporta los datos de cada señal"""
-    with open(fichero, "w", encoding="utf-8") as f:
-        # Extraer solo los "datos" de cada señal
-        datos = [item["datos"] for item in tabla_ordenada]
-    
-        # Trasponer filas -> columnas
-        for fila in zip(*datos):
-            f.write(" ".join(fila) + "\n")
+def exportar_txt (tabla_ordenada, fichero, repeticiones=()):
+    """Extrae, traspone y exporta los datos de cada señal, repitiendo cada tramo las veces indicadas"""
+    # Extraer solo los "datos" de cada señal
+    datos = [item["datos"] for item in tabla_ordenada]
+    cortes = tabla_ordenada[0]["cortes"] if tabla_ordenada else []
+    if any(item["cortes"] != cortes for item in tabla_ordenada):
+        raise ValueError(f"{fichero}: los '|' no están en la misma posición en todas las señales")
+    if len(repeticiones) > len(cortes) + 1:
+        raise ValueError(f"{fichero}: {len(repeticiones)} repeticiones para {len(cortes) + 1} tramos")
+    limites = [0] + cortes + [min(map(len, datos), default=0)]
+    veces = list(repeticiones) + [1]*(len(cortes) + 1 - len(repeticiones))
+
+    with open(fichero, "wb") as f:
+        # Trasponer filas -> columnas, tramo a tramo (cada tramo se genera una vez y se escribe n veces)
+        for inicio, fin, n in zip(limites[:-1], limites[1:], veces):
+            if not datos or (fin <= inicio):
+                continue
+            matriz = np.column_stack([d[inicio:fin] for d in datos])
+            texto = binarizar.texto_filas(matriz, tabla_ordenada[0]["formato"], desconocido=binarizar.DESCONOCIDO)
+            for _ in range(n):
+                f.write(texto)
 
     print(f"{fichero} creado correctamente.")
 
 
-def concatenar_txt(archivo1, archivo2, archivo_salida):
-    with open(archivo1, "r", encoding="utf-8") as f1, \
-         open(archivo2, "r", encoding="utf-8") as f2, \
-         open(archivo_salida, "w", encoding="utf-8") as salida:
-        
-        # Escribir contenido del primer archivo
-        salida.write(f1.read())
-        # Escribir contenido del segundo archivo
-        salida.write(f2.read())
+def concatenar_txt(archivos, archivo_salida):
+    """Concatena los ficheros en el orden dado, copiándolos por bloques"""
+    with open(archivo_salida, "wb") as salida:
+        for archivo in archivos:
+            with open(archivo, "rb") as f:
+                shutil.copyfileobj(f, salida, BLOQUE)
 
     print(f"{archivo_salida} creado correctamente.")
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Uso: python wavedrom_to_txt.py archivo.json")
-        sys.exit(1)
+def leer_orden(ruta_json):
+    """Tabla de orden del diagrama (fichero <nombre>.orden.json junto al diagrama)"""
+    with open(ruta_json[:-len(".json")] + SUFIJO_ORDEN, "r", encoding="utf-8") as f:
+        return json.load(f)
 
-    # Se obtienen los datos crudos del pseudo .json
-    ruta = sys.argv[1]
-    signals = procesar_json(ruta)
-
-    # for i in signals:
-    #     print(i)
-
-    # Se convierte al formato de tabla requerido
-    tabla = []
-    formato = "08b"   # Formato del dato de salida. "08b" = 8 bits
-    for signal in signals:
-        tabla.append(tabular_datos(signal))
-        # print(tabular_datos(signal)["nombre"])
-    # pp(tabla)
-
-    # TODO A partir de aquí todo podría mejorar con una interfaz gráfica
-
-    # Se clasifican las señales por orden deseado de aparición y se clasifican entre I/O o descartes
-    # orden = [ # * STATE_CTRLR
-    #     {"nombre": "CLK",		    "tipo": "NO",   "orden": 0},
-    #     {"nombre": "EN",		    "tipo": "I",    "orden": 1},
-    #     {"nombre": "NEXT_CONFIG_0",	"tipo": "I",    "orden": 6},
-    #     {"nombre": "NEXT_CONFIG_1",	"tipo": "I",    "orden": 7},
-    #     {"nombre": "NEXT_CONFIG_2",	"tipo": "I",    "orden": 8},
-    #     {"nombre": "NEXT_CONFIG_3",	"tipo": "I",    "orden": 9},
-    #     {"nombre": "NEXT_CONFIG_4",	"tipo": "I",    "orden": 10},
-    #     {"nombre": "NEXT_CONFIG_5",	"tipo": "I",    "orden": 11},
-    #     {"nombre": "NEXT_CONFIG_6",	"tipo": "I",    "orden": 12},
-    #     {"nombre": "N_ADDR",	    "tipo": "I",    "orden": 2},
-    #     {"nombre": "N_TOT_CYC",		"tipo": "I",    "orden": 3},
-    #     {"nombre": "UPD_MEM",	    "tipo": "I",    "orden": 4},
-    #     {"nombre": "RD_ADDR",       "tipo": "O",    "orden": 1},
-    #     {"nombre": "RD_DATA",		"tipo": "NO",   "orden": 0},
-    #     {"nombre": "CNT_END",	    "tipo": "I",    "orden": 5},
-    #     {"nombre": "LAST_CYC",      "tipo": "O",    "orden": 4},
-    #     {"nombre": "SWITCH_MEM",    "tipo": "O",    "orden": 3},
-    #     {"nombre": "EN_CNT",		"tipo": "O",    "orden": 2},
-    #     {"nombre": "STATE",	        "tipo": "NO",   "orden": 0},
-    #     {"nombre": "EN_WR_CONFIG",  "tipo": "O",    "orden": 5}
-    # ]
-    orden = [ # * PWM_DP_MEM
-        {"nombre": "CLK",		        "tipo": "NO",   "orden": 0},
-        {"nombre": "WR_EN",		        "tipo": "I",    "orden": 1},
-        {"nombre": "WR_ADDR",           "tipo": "I",    "orden": 2},
-        {"nombre": "WR_DATA",           "tipo": "I",    "orden": 3},
-        {"nombre": "N_ADDR",            "tipo": "I",    "orden": 6},
-        {"nombre": "LAST_CYC",          "tipo": "I",    "orden": 5},
-        {"nombre": "SWITCH_MEM",        "tipo": "I",    "orden": 4},
-        {"nombre": "RD_ADDR",		    "tipo": "I",    "orden": 7},
-        {"nombre": "RD_DATA",		    "tipo": "O",    "orden": 1},
-        {"nombre": "RD_DATA_NEXT",      "tipo": "O",    "orden": 2},
-        {"nombre": "RD_DATA_NEXT_2",    "tipo": "O",    "orden": 3}
-    ]
-
-    # Añade los campos nuevos a los señales
+
+def clasificar(tabla, orden):
+    """Separa las señales en entradas y salidas, cada una en su orden de aparición"""
+    clasificacion = {clasif["nombre"]: clasif for clasif in orden}
     for signal in tabla:
-        for clasif in orden:
-            if clasif["nombre"] == signal["nombre"]:
-                signal["tipo"] = clasif["tipo"]
-                signal["orden"] = clasif["orden"]
-    # pp(tabla)
+        clasif = clasificacion.get(signal["nombre"], {"tipo": "NO", "orden": 0})
+        signal["tipo"] = clasif["tipo"]
+        signal["orden"] = clasif["orden"]
 
-    # Se separan las tablas de I/O
     tabla_in = [signal for signal in tabla if (signal["tipo"] == "I")]
     tabla_out = [signal for signal in tabla if (signal["tipo"] == "O")]
-    # pp(tabla_in)
-    # print("----------------------")
-    # pp(tabla_out)
-
-    # Se ordenan
-    tabla_in_ordenada = sorted(tabla_in, key=lambda x: x["orden"])
-    tabla_out_ordenada = sorted(tabla_out, key=lambda x: x["orden"])
-    # pp(tabla_in_ordenada)
-    # print("----------------------")
-    # pp(tabla_out_ordenada)
-
-    concatenar = True
-    # concatenar = False
-
-    if not concatenar:
-        # Se exportan los dos ficheros
-        exportar_txt(tabla_in_ordenada, ruta[:-5] + "_inputs.txt")
-        exportar_txt(tabla_out_ordenada, ruta[:-5] + "_outputs_ref.txt")
-    else:
-        # Para simulaciones largas, concatenar dos archivos:
-        concatenar_txt("pwm_dp_mem_1_inputs.txt", "pwm_dp_mem_2_inputs.txt", "pwm_dp_mem_inputs.txt")
-        concatenar_txt("pwm_dp_mem_1_outputs_ref.txt", "pwm_dp_mem_2_outputs_ref.txt", "pwm_dp_mem_outputs_ref.txt")
+    return sorted(tabla_in, key=lambda x: x["orden"]), sorted(tabla_out, key=lambda x: x["orden"])
+
+
+def archivos_salida(ruta_json):
+    return [ruta_json[:-len(".json")] + "_inputs.txt", ruta_json[:-len(".json")] + "_outputs_ref.txt"]
+
+
+def convertir_diagrama(ruta_json, formato="08b"):
+    """Convierte un diagrama a sus ficheros de entradas y salidas de referencia"""
+    signals, repeticiones = procesar_json(ruta_json)
+    tabla = [tabular_datos(signal, formato) for signal in signals]
+    tabla_in_ordenada, tabla_out_ordenada = clasificar(tabla, leer_orden(ruta_json))
+
+    archivo_in, archivo_out = archivos_salida(ruta_json)
+    exportar_txt(tabla_in_ordenada, archivo_in, repeticiones)
+    exportar_txt(tabla_out_ordenada, archivo_out, repeticiones)
+    return [archivo_in, archivo_out]
+
+
+def huella(ruta_json, formato):
+    """Hash del contenido del diagrama, de su tabla de orden, del formato y del código del conversor
+    (este script y binarizar.py), para que un cambio en la conversión vuelva a convertirlo todo"""
+    h = hashlib.sha256(formato.encode())
+    for ruta in (ruta_json, ruta_json[:-len(".json")] + SUFIJO_ORDEN, os.path.abspath(__file__), binarizar.__file__):
+        with open(ruta, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def hash_archivo(ruta):
+    """Hash del contenido de un fichero (None si no existe), leído por bloques"""
+    if not os.path.exists(ruta):
+        return None
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(BLOQUE), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def hashes_salida(archivos):
+    return {os.path.basename(archivo): hash_archivo(archivo) for archivo in archivos}
+
+
+def al_dia(entrada, h, archivos):
+    """Si la entrada de la caché corresponde a la huella h y los ficheros de salida no han cambiado"""
+    return isinstance(entrada, dict) and (entrada.get("huella") == h) and \
+        (None not in entrada["salidas"].values()) and (entrada["salidas"] == hashes_salida(archivos))
+
+
+def diagramas(directorio):
+    """Diagramas del directorio: los .json con tabla de orden al lado"""
+    rutas = []
+    for nombre in sorted(os.listdir(directorio)):
+        ruta = os.path.join(directorio, nombre)
+        if nombre.endswith(".json") and not nombre.endswith(SUFIJO_ORDEN) and \
+                os.path.exists(ruta[:-len(".json")] + SUFIJO_ORDEN):
+            rutas.append(ruta)
+    return rutas
+
+
+def convertir_directorio(directorio, formato="08b", n_procesos=None, forzar=False, concatenaciones=None):
+    """
+    Convierte en paralelo todos los diagramas de un directorio y después hace las concatenaciones
+    (destino -> diagramas, en orden). Se saltan los diagramas y destinos que no han cambiado desde la
+    última ejecución: misma huella en la caché y ficheros de salida con el mismo hash que entonces.
+    Devuelve los diagramas convertidos, los saltados y los destinos concatenados.
+    """
+    if concatenaciones is None:
+        concatenaciones = {}
+    archivo_cache = os.path.join(directorio, CACHE)
+    cache = {}
+    if os.path.exists(archivo_cache) and not forzar:
+        with open(archivo_cache, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+
+    huellas = {os.path.basename(ruta): huella(ruta, formato) for ruta in diagramas(directorio)}
+    salidas = {nombre: archivos_salida(os.path.join(directorio, nombre)) for nombre in huellas}
+    pendientes = [nombre for nombre, h in huellas.items() if not al_dia(cache.get(nombre), h, salidas[nombre])]
+
+    if pendientes:
+        with ProcessPoolExecutor(max_workers=n_procesos) as pool:
+            list(pool.map(convertir_diagrama, [os.path.join(directorio, nombre) for nombre in pendientes],
+                          [formato]*len(pendientes)))
+
+    # Solo se guardan los diagramas que siguen existiendo
+    nueva_cache = {nombre: {"huella": h, "salidas": hashes_salida(salidas[nombre])} for nombre, h in huellas.items()}
+
+    # Concatenaciones: su huella es la de los ficheros de las partes
+    concatenados = []
+    for destino, partes in concatenaciones.items():
+        partes = [parte + ".json" for parte in partes]
+        if not all(parte in huellas for parte in partes):
+            continue
+        h = hashlib.sha256(json.dumps([nueva_cache[parte]["salidas"] for parte in partes]).encode()).hexdigest()
+        archivos_destino = archivos_salida(os.path.join(directorio, destino + ".json"))
+        if not al_dia(cache.get(destino), h, archivos_destino):
+            for i, archivo_destino in enumerate(archivos_destino):
+                concatenar_txt([salidas[parte][i] for parte in partes], archivo_destino)
+            concatenados.append(destino)
+        nueva_cache[destino] = {"huella": h, "salidas": hashes_salida(archivos_destino)}
+
+    with open(archivo_cache, "w", encoding="utf-8") as f:
+        json.dump(nueva_cache, f, indent=4)
+
+    return {"convertidos": pendientes, "en_cache": [nombre for nombre in huellas if nombre not in pendientes],
+            "concatenados": concatenados}
+
+
+if __name__ == "__main__":
+    ruta = os.path.dirname(os.path.abspath(__file__))
+
+    # USER: Configurar ----------------------------------------
+    # Formato del dato de salida. "08b" = 8 bits, "02x" = 8 bits en hexadecimal
+    formato = "08b"
+
+    # Procesos en paralelo (None -> uno por núcleo)
+    n_procesos = None
+
+    # Para simulaciones largas, ficheros que se concatenan tras la conversión: destino -> diagramas
+    concatenaciones = {"pwm_dp_mem": ("pwm_dp_mem_1", "pwm_dp_mem_2")}
+    # USER ----------------------------------------------------
+
+    # Argumento: un diagrama (se convierte siempre) o un directorio (por defecto, el de este script)
+    if len(sys.argv) > 2:
+        print("Uso: python wavedrom_to_txt.py [archivo.json | directorio]")
+        sys.exit(1)
+    if len(sys.argv) == 2:
+        ruta = sys.argv[1]
+
+    if os.path.isfile(ruta):
+        convertir_diagrama(ruta, formato)
+        sys.exit(0)
+
+    resultado = convertir_directorio(ruta, formato, n_procesos, concatenaciones=concatenaciones)
+    print(f"{len(resultado['convertidos'])} diagramas convertidos, {len(resultado['en_cache'])} sin cambios, "
+          f"{len(resultado['concatenados'])} concatenaciones rehechas")
@@ -8,6 +8,7 @@
 library ieee;
 use ieee.std_logic_1164.all;
 use ieee.numeric_std.all;
+use ieee.std_logic_textio.all;
 use std.textio.all;
 
 library work;
@@ -22,6 +23,7 @@ entity pwm_dp_mem_autotest_tb is
         C_N_INPUTS          : integer := 7; -- Número de entradas (columnas)
         C_N_OUTPUTS         : integer := 3; -- Número de salidas (columnas)
         C_WIDTH             : integer := 8; -- Número de bits de las señales
+        C_HEX               : boolean := false; -- Ficheros en hexadecimal (hread/hwrite) en lugar de binario
         -- C_INPUTS_PATH       : string := "\\AMS_NAS\home\Universidad\TFM\pwm_enjoyer\tb\autotest\pwm_dp_mem_inputs.txt";
         -- C_OUTPUTS_REF_PATH  : string := "\\AMS_NAS\home\Universidad\TFM\pwm_enjoyer\tb\autotest\pwm_dp_mem_outputs_ref.txt";
         -- C_OUTPUTS_PATH      : string := "\\AMS_NAS\home\Universidad\TFM\pwm_enjoyer\tb\autotest\pwm_dp_mem_outputs.txt"
@@ -61,7 +63,8 @@ architecture beh of pwm_dp_mem_autotest_tb is
             RD_ADDR_I           : in std_logic_vector((G_ADDR_W - 1) downto 0);     -- Dirección de lectura
             RD_DATA_O           : out std_logic_vector((G_DATA_W - 1) downto 0);    -- Dato de lectura
             RD_DATA_NEXT_O      : out std_logic_vector((G_DATA_W - 1) downto 0);    -- Siguiente dato de lectura
-            RD_DATA_NEXT_2_O    : out std_logic_vector((G_DATA_W - 1) downto 0)     -- Siguiente dato 2 de lectura
+            RD_DATA_NEXT_2_O    : out std_logic_vector((G_DATA_W - 1) downto 0);    -- Siguiente dato 2 de lectura
+            EARLY_SW_O          : out std_logic                                     -- Protección ante SWITCH sin configuración previa
         );
     end component pwm_dp_mem;
 
@@ -123,7 +126,8 @@ begin
             RD_ADDR_I           => RD_ADDR_I,
             RD_DATA_O           => RD_DATA_O, 
             RD_DATA_NEXT_O      => RD_DATA_NEXT_O, 
-            RD_DATA_NEXT_2_O    => RD_DATA_NEXT_2_O
+            RD_DATA_NEXT_2_O    => RD_DATA_NEXT_2_O,
+            EARLY_SW_O          => open
         );
 
     -------------------------------------------------
@@ -155,6 +159,7 @@ begin
         file read_file      : text;         -- Archivo de lectura
         variable line_in    : line;         -- Línea de lectura
         variable data_in    : vec_input;    -- Dato extraído
+        variable hex_in     : std_logic_vector((C_WIDTH - 1) downto 0); -- Dato extraído (hexadecimal)
     begin
 
         file_open(read_file, C_INPUTS_PATH, read_mode); -- Abre el archivo de lectura
@@ -163,7 +168,12 @@ begin
             wait until CLK_I'event and (CLK_I = '1');
             readline(read_file, line_in);               -- Lee fila a fila
             for i in 0 to (C_N_INPUTS - 1) loop
-                read(line_in, data_in(i));              -- Lee dato a dato, separados por espacios
+                if C_HEX then
+                    hread(line_in, hex_in);             -- Lee dato a dato, en hexadecimal
+                    data_in(i) := to_bitvector(hex_in);
+                else
+                    read(line_in, data_in(i));          -- Lee dato a dato, separados por espacios
+                end if;
             end loop;
             -- USER: Asignación de entradas
             WR_EN_I         <= to_stdlogicvector(data_in(0))(0);
@@ -194,6 +204,7 @@ begin
         file write_file     : text;         -- Archivo de escritura
         variable line_out   : line;         -- Línea de lectura
         variable data_out   : vec_output;   -- Dato escrito
+        variable hex_in     : std_logic_vector((C_WIDTH - 1) downto 0); -- Dato extraído (hexadecimal)
     begin
 
         file_open(read_file, C_OUTPUTS_REF_PATH, read_mode);    -- Abre el archivo de lectura
@@ -208,8 +219,14 @@ begin
             data_out(2)((RD_DATA_NEXT_2_O'length - 1) downto 0) := to_bitvector(RD_DATA_NEXT_2_O);
             ----------------------------------------
             for i in 0 to (C_N_OUTPUTS - 1) loop
-                read(line_in, data_in(i));                          -- Lee dato a dato, separados por espacios
-                write(line_out, data_out(i), right, (C_WIDTH + 1)); -- Escribe dato a dato, separados por espacios
+                if C_HEX then
+                    hread(line_in, hex_in);                                                   -- Lee dato a dato, en hexadecimal
+                    data_in(i) := to_bitvector(hex_in);
+                    hwrite(line_out, to_stdlogicvector(data_out(i)), right, (C_WIDTH/4 + 1)); -- Escribe dato a dato, en hexadecimal
+                else
+                    read(line_in, data_in(i));                                                -- Lee dato a dato, separados por espacios
+                    write(line_out, data_out(i), right, (C_WIDTH + 1));                       -- Escribe dato a dato, separados por espacios
+                end if;
             end loop;
             writeline(write_file, line_out);                        -- Escribe fila a fila
             -- USER -----------------------
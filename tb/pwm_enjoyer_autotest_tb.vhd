@@ -0,0 +1,324 @@
+-- Módulo: test de autovalidación de pwm_enjoyer
+-- Autor: Alejandro Martínez Salgado
+-- Fecha de creación: 18.10.2026
+-- Estado: SIN VALIDAR. Este testbench aún no se ha compilado ni simulado (no hay simulador VHDL en el entorno
+--   donde se escribió). Está revisado contra la entidad pwm_enjoyer y my_pkg, y lee y escribe los ficheros
+--   igual que pwm_top_autotest_tb. Los vectores de tb/autotest (pwm_enjoyer_inputs.txt y
+--   pwm_enjoyer_outputs_ref.txt) salen de pwm_enjoyer_generator con la configuración por defecto y semilla 1,
+--   así que la referencia viene solo de pwm_enjoyer_model. Hasta contrastarla con una simulación del RTL,
+--   un fallo puede deberse al testbench, al modelo o al RTL.
+
+-----------------------------------------------------------
+-- Librerías
+-----------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+use ieee.std_logic_textio.all;
+use std.textio.all;
+
+library work;
+use work.my_pkg.all;
+
+-----------------------------------------------------------
+-- Entidad
+-----------------------------------------------------------
+entity pwm_enjoyer_autotest_tb is
+    generic (
+        -- Ficheros .txt
+        C_N_INPUTS          : integer := 7;     -- Número de entradas (columnas)
+        C_N_OUTPUTS         : integer := 4;     -- Número de salidas (columnas)
+        C_WIDTH             : integer := 32;    -- Número de bits de las señales
+        C_HEX               : boolean := true;  -- Ficheros en hexadecimal (hread/hwrite) en lugar de binario
+        C_EVENTS            : boolean := true;  -- Ficheros en modo eventos: cada fila empieza por su duración en ciclos
+        -- C_INPUTS_PATH       : string := "\\AMS_NAS\home\Universidad\TFM\pwm_enjoyer\tb\autotest\pwm_enjoyer_inputs.txt";
+        -- C_OUTPUTS_REF_PATH  : string := "\\AMS_NAS\home\Universidad\TFM\pwm_enjoyer\tb\autotest\pwm_enjoyer_outputs_ref.txt";
+        -- C_OUTPUTS_PATH      : string := "\\AMS_NAS\home\Universidad\TFM\pwm_enjoyer\tb\autotest\pwm_enjoyer_outputs.txt"
+        C_INPUTS_PATH       : string := "C:\Users\ajmsalgado\SynologyDrive\Universidad\TFM\pwm_enjoyer\tb\autotest\pwm_enjoyer_inputs.txt";
+        C_OUTPUTS_REF_PATH  : string := "C:\Users\ajmsalgado\SynologyDrive\Universidad\TFM\pwm_enjoyer\tb\autotest\pwm_enjoyer_outputs_ref.txt";
+        C_OUTPUTS_PATH      : string := "C:\Users\ajmsalgado\SynologyDrive\Universidad\TFM\pwm_enjoyer\tb\autotest\pwm_enjoyer_outputs.txt"
+    );
+end entity pwm_enjoyer_autotest_tb;
+
+-----------------------------------------------------------
+-- Arquitectura
+-----------------------------------------------------------
+architecture beh of pwm_enjoyer_autotest_tb is
+
+    -------------------------------------------------
+    -- Componentes
+    -------------------------------------------------
+    component pwm_enjoyer is
+        generic (
+            G_RST_POL           : std_logic := '1';
+            G_STATE_MAX_L2      : natural := 32;
+            G_MEM_SIZE_MAX_N    : natural := 128;
+            G_MEM_SIZE_MAX_L2   : natural := 32;
+            G_PERIOD_MAX_L2     : natural := 32;
+            G_PWM_N             : natural := 32;
+            G_EN_REDUNDANCY     : std_logic := '1'
+        );
+        port (
+            CLK_I               : in std_logic;
+            RST_I               : in std_logic;
+            -- Registros de escritura
+            REG_DIRECCIONES_I   : in std_logic_vector(31 downto 0);
+            REG_CONTROL_I       : in std_logic_vector(31 downto 0);
+            REG_WR_DATA_I       : in std_logic_vector(31 downto 0);
+            REG_WR_DATA_VALID_I : in std_logic_vector(31 downto 0);
+            REG_N_ADDR_I        : in std_logic_vector(31 downto 0);
+            REG_N_TOT_CYC_I     : in std_logic_vector(31 downto 0);
+            REG_PWM_INIT_I      : in std_logic_vector(31 downto 0);
+            -- Registros de lectura
+            REG_REDUNDANCIAS_O  : out std_logic_vector(31 downto 0);
+            REG_ERRORES_O       : out std_logic_vector(31 downto 0);
+            REG_STATUS_O        : out std_logic_vector(31 downto 0);
+            -- Salidas
+            PWMS_O              : out std_logic_vector((G_PWM_N - 1) downto 0)
+        );
+    end component pwm_enjoyer;
+
+    -------------------------------------------------
+    -- Señales
+    -------------------------------------------------
+    -- Simulación
+    constant clk_period : time := (10**9/C_SYS_CLK_HZ) * 1 ns;
+
+    -- Port map
+    signal CLK_I                : std_logic;
+    signal RST_I                : std_logic;
+    signal REG_DIRECCIONES_I    : std_logic_vector(31 downto 0);            -- Canales a los que se aplica el comando
+    signal REG_CONTROL_I        : std_logic_vector(31 downto 0);            -- Comando (SHUTDOWN, APAGAR, ACTUALIZAR, CONFIGURAR)
+    signal REG_WR_DATA_I        : std_logic_vector(31 downto 0);            -- Dato de escritura
+    signal REG_WR_DATA_VALID_I  : std_logic_vector(31 downto 0);            -- Validación del dato de escritura
+    signal REG_N_ADDR_I         : std_logic_vector(31 downto 0);            -- Número de estados
+    signal REG_N_TOT_CYC_I      : std_logic_vector(31 downto 0);            -- Número total de ciclos que dura la configuración
+    signal REG_PWM_INIT_I       : std_logic_vector(31 downto 0);            -- Valor inicial de salida
+    signal REG_REDUNDANCIAS_O   : std_logic_vector(31 downto 0);            -- Disparidades entre módulos redundantes
+    signal REG_ERRORES_O        : std_logic_vector(31 downto 0);            -- Errores de configuración
+    signal REG_STATUS_O         : std_logic_vector(31 downto 0);            -- Estado de la unidad de control
+    signal PWMS_O               : std_logic_vector((C_PWM_N - 1) downto 0); -- Salidas de los PWM
+
+    -- Vectores de datos
+    type vec_input is array (0 to (C_N_INPUTS - 1)) of bit_vector((C_WIDTH - 1) downto 0);
+    type vec_output is array (0 to (C_N_OUTPUTS - 1)) of bit_vector((C_WIDTH - 1) downto 0);
+
+    -------------------------------------------------
+    -- Funciones y procedimientos
+    -------------------------------------------------
+    -- Dato en hexadecimal para los mensajes de error (C_WIDTH múltiplo de 4)
+    function to_hex (data : bit_vector) return string is
+        constant C_DIGITOS  : string(1 to 16) := "0123456789ABCDEF";
+        alias a_data        : bit_vector((data'length - 1) downto 0) is data;
+        variable v_hex      : string(1 to (data'length/4));
+        variable v_digito   : integer;
+    begin
+        for i in v_hex'range loop
+            v_digito := to_integer(unsigned(to_stdlogicvector(a_data((data'length - 4*(i - 1) - 1) downto (data'length - 4*i)))));
+            v_hex(i) := C_DIGITOS(v_digito + 1);
+        end loop;
+        return v_hex;
+    end function;
+
+begin
+
+    -------------------------------------------------
+    -- Instancias
+    -------------------------------------------------
+    uut : component pwm_enjoyer
+        generic map (
+            G_RST_POL           => C_RST_POL,
+            G_STATE_MAX_L2      => C_STATE_MAX_L2,
+            G_MEM_SIZE_MAX_N    => C_MEM_SIZE_MAX_N,
+            G_MEM_SIZE_MAX_L2   => C_MEM_SIZE_MAX_L2,
+            G_PERIOD_MAX_L2     => C_PERIOD_MAX_L2,
+            G_PWM_N             => C_PWM_N,
+            G_EN_REDUNDANCY     => C_EN_REDUNDANCY
+        )
+        port map (
+            CLK_I               => CLK_I,
+            RST_I               => RST_I,
+            REG_DIRECCIONES_I   => REG_DIRECCIONES_I,
+            REG_CONTROL_I       => REG_CONTROL_I,
+            REG_WR_DATA_I       => REG_WR_DATA_I,
+            REG_WR_DATA_VALID_I => REG_WR_DATA_VALID_I,
+            REG_N_ADDR_I        => REG_N_ADDR_I,
+            REG_N_TOT_CYC_I     => REG_N_TOT_CYC_I,
+            REG_PWM_INIT_I      => REG_PWM_INIT_I,
+            REG_REDUNDANCIAS_O  => REG_REDUNDANCIAS_O,
+            REG_ERRORES_O       => REG_ERRORES_O,
+            REG_STATUS_O        => REG_STATUS_O,
+            PWMS_O              => PWMS_O
+        );
+
+    -------------------------------------------------
+    -- Procesos
+    -------------------------------------------------
+    -- Reloj
+    P_CLK : process
+    begin
+        CLK_I <= '1';
+        wait for clk_period/2;
+        CLK_I <= '0';
+        wait for clk_period/2;
+    end process;
+
+    -- Reset
+    P_RST : process
+    begin
+        RST_I <= C_RST_POL;
+        wait for clk_period;
+        RST_I <= not C_RST_POL;
+        wait;
+    end process;
+
+    -------------------------------------------------
+    -- Estímulos
+    -------------------------------------------------
+    -- Lectura de los datos de entrada
+    P_INPUT : process
+        file read_file      : text;         -- Archivo de lectura
+        variable line_in    : line;         -- Línea de lectura
+        variable data_in    : vec_input;    -- Dato extraído
+        variable hex_in     : std_logic_vector((C_WIDTH - 1) downto 0); -- Dato extraído (hexadecimal)
+        variable n_cyc      : integer := 1; -- Duración de la fila (modo eventos)
+    begin
+
+        file_open(read_file, C_INPUTS_PATH, read_mode); -- Abre el archivo de lectura
+        while not endfile(read_file) loop
+            -- wait until rising_edge(CLK_I);
+            wait until CLK_I'event and (CLK_I = '1');
+            readline(read_file, line_in);               -- Lee fila a fila
+            if C_EVENTS then
+                read(line_in, n_cyc);                   -- Lee la duración del evento
+            end if;
+            for i in 0 to (C_N_INPUTS - 1) loop
+                if C_HEX then
+                    hread(line_in, hex_in);             -- Lee dato a dato, en hexadecimal
+                    data_in(i) := to_bitvector(hex_in);
+                else
+                    read(line_in, data_in(i));          -- Lee dato a dato, separados por espacios
+                end if;
+            end loop;
+            -- USER: Asignación de entradas
+            REG_DIRECCIONES_I   <= to_stdlogicvector(data_in(0));
+            REG_CONTROL_I       <= to_stdlogicvector(data_in(1));
+            REG_WR_DATA_I       <= to_stdlogicvector(data_in(2));
+            REG_WR_DATA_VALID_I <= to_stdlogicvector(data_in(3));
+            REG_N_ADDR_I        <= to_stdlogicvector(data_in(4));
+            REG_N_TOT_CYC_I     <= to_stdlogicvector(data_in(5));
+            REG_PWM_INIT_I      <= to_stdlogicvector(data_in(6));
+            -- USER -----------------------
+            -- Modo eventos: las entradas se mantienen durante n_cyc flancos
+            for k in 2 to n_cyc loop
+                wait until CLK_I'event and (CLK_I = '1');
+            end loop;
+        end loop;
+        -- wait until rising_edge(CLK_I);
+        wait until CLK_I'event and (CLK_I = '1');
+        file_close(read_file);
+
+        assert FALSE report "End inputs reading" severity note;
+        wait;
+
+    end process;
+
+    -- Lectura y comparación de las salidas con el modelo
+    --  y escritura con los valores de salida obtenidos
+    P_COMPARE : process
+        file read_file      : text;         -- Archivo de lectura
+        variable line_in    : line;         -- Línea de lectura
+        variable data_in    : vec_output;   -- Dato extraído
+        variable index      : integer := 1; -- Indicador de línea
+        file write_file     : text;         -- Archivo de escritura
+        variable line_out   : line;         -- Línea de lectura
+        variable data_out   : vec_output;   -- Dato escrito
+        variable hex_in     : std_logic_vector((C_WIDTH - 1) downto 0); -- Dato extraído (hexadecimal)
+        variable n_cyc      : integer := 1; -- Duración de la fila de referencia (modo eventos)
+        variable data_ev    : vec_output;   -- Salidas del evento en curso (modo eventos)
+        variable n_cyc_ev   : integer := 0; -- Duración del evento en curso (modo eventos)
+
+        -- Escribe una fila de salidas, precedida de su duración en modo eventos
+        procedure escribir_fila (n : in integer; data : in vec_output) is
+        begin
+            if C_EVENTS then
+                write(line_out, n, left, 9);                                                 -- Escribe la duración del evento
+            end if;
+            for i in 0 to (C_N_OUTPUTS - 1) loop
+                if C_HEX then
+                    hwrite(line_out, to_stdlogicvector(data(i)), left, (C_WIDTH/4 + 1));     -- Escribe dato a dato, en hexadecimal
+                else
+                    write(line_out, data(i), left, (C_WIDTH + 1));                           -- Escribe dato a dato, separados por espacios
+                end if;
+            end loop;
+            writeline(write_file, line_out);                                                 -- Escribe fila a fila
+        end procedure;
+    begin
+
+        file_open(read_file, C_OUTPUTS_REF_PATH, read_mode);    -- Abre el archivo de lectura
+        file_open(write_file, C_OUTPUTS_PATH, write_mode);      -- Abre el archivo de escritura
+        while not endfile(read_file) loop
+            readline(read_file, line_in);                       -- Lee fila a fila
+            if C_EVENTS then
+                read(line_in, n_cyc);                           -- Lee la duración del evento
+            end if;
+            for i in 0 to (C_N_OUTPUTS - 1) loop
+                if C_HEX then
+                    hread(line_in, hex_in);                     -- Lee dato a dato, en hexadecimal
+                    data_in(i) := to_bitvector(hex_in);
+                else
+                    read(line_in, data_in(i));                  -- Lee dato a dato, separados por espacios
+                end if;
+            end loop;
+            -- Modo eventos: la referencia se mantiene durante n_cyc flancos
+            for k in 1 to n_cyc loop
+                wait until rising_edge(CLK_I);
+                index := index + 1;
+                -- USER: Asignación de salidas
+                data_out(0) := (others => '0');
+                data_out(0)((C_PWM_N - 1) downto 0) := to_bitvector(PWMS_O);    -- PWMS
+                data_out(1) := to_bitvector(REG_REDUNDANCIAS_O);                -- REDUNDANCIAS
+                data_out(2) := to_bitvector(REG_ERRORES_O);                     -- ERRORES
+                data_out(3) := to_bitvector(REG_STATUS_O);                      -- STATUS
+                -- USER ----------------------
+                -- En modo eventos solo se escribe cuando cambian las salidas
+                if not C_EVENTS then
+                    escribir_fila(1, data_out);
+                elsif (n_cyc_ev > 0) and (data_out /= data_ev) then
+                    escribir_fila(n_cyc_ev, data_ev);
+                    n_cyc_ev := 0;
+                end if;
+                data_ev := data_out;
+                n_cyc_ev := n_cyc_ev + 1;
+                -- USER: Comparación de salidas
+                assert data_out(0) = data_in(0)
+                    report ":( Wrong PWMS output. Obtained: " & to_hex(data_out(0)) &
+                        " Expected: " & to_hex(data_in(0)) & " at step: " & integer'image(index)
+                    severity failure;
+                assert data_out(1) = data_in(1)
+                    report ":( Wrong REDUNDANCIAS output. Obtained: " & to_hex(data_out(1)) &
+                        " Expected: " & to_hex(data_in(1)) & " at step: " & integer'image(index)
+                    severity failure;
+                assert data_out(2) = data_in(2)
+                    report ":( Wrong ERRORES output. Obtained: " & to_hex(data_out(2)) &
+                        " Expected: " & to_hex(data_in(2)) & " at step: " & integer'image(index)
+                    severity failure;
+                assert data_out(3) = data_in(3)
+                    report ":( Wrong STATUS output. Obtained: " & to_hex(data_out(3)) &
+                        " Expected: " & to_hex(data_in(3)) & " at step: " & integer'image(index)
+                    severity failure;
+                -- USER -----------------------
+            end loop;
+        end loop;
+        if C_EVENTS and (n_cyc_ev > 0) then
+            escribir_fila(n_cyc_ev, data_ev);                   -- Último evento
+        end if;
+        wait until rising_edge(CLK_I);
+        file_close(read_file);
+        file_close(write_file);
+
+        assert FALSE report "\_(^^ )_/ Simulation successfull! \_(^^ )_/" severity failure;
+
+    end process;
+
+end architecture beh;
\ No newline at end of file
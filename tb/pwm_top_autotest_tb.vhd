@@ -8,6 +8,7 @@
 library ieee;
 use ieee.std_logic_1164.all;
 use ieee.numeric_std.all;
+use ieee.std_logic_textio.all;
 use std.textio.all;
 
 library work;
@@ -22,6 +23,10 @@ entity pwm_top_autotest_tb is
         C_N_INPUTS          : integer := 8;     -- Número de entradas (columnas)
         C_N_OUTPUTS         : integer := 5;     -- Número de salidas (columnas)
         C_WIDTH             : integer := 32;    -- Número de bits de las señales
+        C_HEX               : boolean := false; -- Ficheros en hexadecimal (hread/hwrite) en lugar de binario
+        C_EVENTS            : boolean := false; -- Ficheros en modo eventos: cada fila empieza por su duración en ciclos
+        C_CHECK_UNLOCKED    : boolean := false; -- Comprobar UNLOCKED. Su referencia sale solo de pwm_top_model y aún no
+                                                --   se ha contrastado con una simulación del RTL: false hasta tenerla
         -- C_INPUTS_PATH       : string := "\\AMS_NAS\home\Universidad\TFM\pwm_enjoyer\tb\autotest\pwm_top_inputs.txt";
         -- C_OUTPUTS_REF_PATH  : string := "\\AMS_NAS\home\Universidad\TFM\pwm_enjoyer\tb\autotest\pwm_top_outputs_ref.txt";
         -- C_OUTPUTS_PATH      : string := "\\AMS_NAS\home\Universidad\TFM\pwm_enjoyer\tb\autotest\pwm_top_outputs.txt"
@@ -162,6 +167,8 @@ begin
         file read_file      : text;         -- Archivo de lectura
         variable line_in    : line;         -- Línea de lectura
         variable data_in    : vec_input;    -- Dato extraído
+        variable hex_in     : std_logic_vector((C_WIDTH - 1) downto 0); -- Dato extraído (hexadecimal)
+        variable n_cyc      : integer := 1; -- Duración de la fila (modo eventos)
     begin
 
         file_open(read_file, C_INPUTS_PATH, read_mode); -- Abre el archivo de lectura
@@ -169,8 +176,16 @@ begin
             -- wait until rising_edge(CLK_I);
             wait until CLK_I'event and (CLK_I = '1');
             readline(read_file, line_in);               -- Lee fila a fila
+            if C_EVENTS then
+                read(line_in, n_cyc);                   -- Lee la duración del evento
+            end if;
             for i in 0 to (C_N_INPUTS - 1) loop
-                read(line_in, data_in(i));              -- Lee dato a dato, separados por espacios
+                if C_HEX then
+                    hread(line_in, hex_in);             -- Lee dato a dato, en hexadecimal
+                    data_in(i) := to_bitvector(hex_in);
+                else
+                    read(line_in, data_in(i));          -- Lee dato a dato, separados por espacios
+                end if;
             end loop;
             -- USER: Asignación de entradas
             CONFIG_N    <= to_integer(unsigned(to_stdlogicvector(data_in(0))));
@@ -182,6 +197,10 @@ begin
             WR_DATA_I   <= to_stdlogicvector(data_in(6))((WR_DATA_I'length - 1) downto 0);
             UPD_MEM_I   <= to_stdlogicvector(data_in(7))(0);
             -- USER -----------------------
+            -- Modo eventos: las entradas se mantienen durante n_cyc flancos
+            for k in 2 to n_cyc loop
+                wait until CLK_I'event and (CLK_I = '1');
+            end loop;
         end loop;
         -- wait until rising_edge(CLK_I);
         wait until CLK_I'event and (CLK_I = '1');
@@ -202,37 +221,78 @@ begin
         file write_file     : text;         -- Archivo de escritura
         variable line_out   : line;         -- Línea de lectura
         variable data_out   : vec_output;   -- Dato escrito
+        variable hex_in     : std_logic_vector((C_WIDTH - 1) downto 0); -- Dato extraído (hexadecimal)
+        variable n_cyc      : integer := 1; -- Duración de la fila de referencia (modo eventos)
+        variable data_ev    : vec_output;   -- Salidas del evento en curso (modo eventos)
+        variable n_cyc_ev   : integer := 0; -- Duración del evento en curso (modo eventos)
+
+        -- Escribe una fila de salidas, precedida de su duración en modo eventos
+        procedure escribir_fila (n : in integer; data : in vec_output) is
+        begin
+            if C_EVENTS then
+                write(line_out, n, left, 9);                                                 -- Escribe la duración del evento
+            end if;
+            for i in 0 to (C_N_OUTPUTS - 1) loop
+                if C_HEX then
+                    hwrite(line_out, to_stdlogicvector(data(i)), left, (C_WIDTH/4 + 1));     -- Escribe dato a dato, en hexadecimal
+                else
+                    write(line_out, data(i), left, (C_WIDTH + 1));                           -- Escribe dato a dato, separados por espacios
+                end if;
+            end loop;
+            writeline(write_file, line_out);                                                 -- Escribe fila a fila
+        end procedure;
     begin
 
         file_open(read_file, C_OUTPUTS_REF_PATH, read_mode);    -- Abre el archivo de lectura
         file_open(write_file, C_OUTPUTS_PATH, write_mode);      -- Abre el archivo de escritura
         while not endfile(read_file) loop
-            wait until rising_edge(CLK_I);
             readline(read_file, line_in);                       -- Lee fila a fila
-            index := index + 1;
-            -- USER: Asignación de salidas
-            data_out(0)(0) := '0';                  -- STEPS (DEBUG)
-            data_out(1)(0) := to_bit(PWM_O);        -- PWM
-            data_out(2)(0) := to_bit(UNLOCKED_O);   -- UNLOCKED
-            data_out(3)(0) := '0';                  -- N_CONFIG (DEBUG)
-            data_out(4)(0) := '0';                  -- CICLO (DEBUG)
-            -- USER ----------------------
+            if C_EVENTS then
+                read(line_in, n_cyc);                           -- Lee la duración del evento
+            end if;
             for i in 0 to (C_N_OUTPUTS - 1) loop
-                read(line_in, data_in(i));                          -- Lee dato a dato, separados por espacios
-                write(line_out, data_out(i), left, (C_WIDTH + 1));  -- Escribe dato a dato, separados por espacios
+                if C_HEX then
+                    hread(line_in, hex_in);                     -- Lee dato a dato, en hexadecimal
+                    data_in(i) := to_bitvector(hex_in);
+                else
+                    read(line_in, data_in(i));                  -- Lee dato a dato, separados por espacios
+                end if;
+            end loop;
+            -- Modo eventos: la referencia se mantiene durante n_cyc flancos
+            for k in 1 to n_cyc loop
+                wait until rising_edge(CLK_I);
+                index := index + 1;
+                -- USER: Asignación de salidas
+                data_out(0)(0) := '0';                  -- STEPS (DEBUG)
+                data_out(1)(0) := to_bit(PWM_O);        -- PWM
+                data_out(2)(0) := to_bit(UNLOCKED_O);   -- UNLOCKED
+                data_out(3)(0) := '0';                  -- N_CONFIG (DEBUG)
+                data_out(4)(0) := '0';                  -- CICLO (DEBUG)
+                -- USER ----------------------
+                -- En modo eventos solo se escribe cuando cambian las salidas
+                if not C_EVENTS then
+                    escribir_fila(1, data_out);
+                elsif (n_cyc_ev > 0) and (data_out /= data_ev) then
+                    escribir_fila(n_cyc_ev, data_ev);
+                    n_cyc_ev := 0;
+                end if;
+                data_ev := data_out;
+                n_cyc_ev := n_cyc_ev + 1;
+                -- USER: Comparación de salidas
+                assert data_out(1) = data_in(1)
+                    report ":( Wrong PWM output. Obtained: " & integer'image(to_integer(unsigned(to_stdlogicvector(data_out(1))))) &
+                        " Expected: " & integer'image(to_integer(unsigned(to_stdlogicvector(data_in(1))))) & " at step: " & integer'image(index)
+                    severity failure;
+                assert (not C_CHECK_UNLOCKED) or (data_out(2) = data_in(2))
+                    report ":( Wrong UNLOCKED output. Obtained: " & integer'image(to_integer(unsigned(to_stdlogicvector(data_out(2))))) &
+                        " Expected: " & integer'image(to_integer(unsigned(to_stdlogicvector(data_in(2))))) & " at step: " & integer'image(index)
+                    severity failure;
+                -- USER -----------------------
             end loop;
-            writeline(write_file, line_out);                        -- Escribe fila a fila
-            -- USER: Comparación de salidas
-            assert data_out(1) = data_in(1)
-                report ":( Wrong PWM output. Obtained: " & integer'image(to_integer(unsigned(to_stdlogicvector(data_out(1))))) &
-                    " Expected: " & integer'image(to_integer(unsigned(to_stdlogicvector(data_in(1))))) & " at step: " & integer'image(index)
-                severity failure;
-            -- assert data_out(2) = data_in(2)
-            --     report ":( Wrong UNLOCKED output. Obtained: " & integer'image(to_integer(unsigned(to_stdlogicvector(data_out(2))))) &
-            --         " Expected: " & integer'image(to_integer(unsigned(to_stdlogicvector(data_in(2))))) & " at step: " & integer'image(index)
-            --     severity failure;
-            -- USER -----------------------
         end loop;
+        if C_EVENTS and (n_cyc_ev > 0) then
+            escribir_fila(n_cyc_ev, data_ev);                   -- Último evento
+        end if;
         wait until rising_edge(CLK_I);
         file_close(read_file);
         file_close(write_file);
@@ -8,6 +8,7 @@
 library ieee;
 use ieee.std_logic_1164.all;
 use ieee.numeric_std.all;
+use ieee.std_logic_textio.all;
 use std.textio.all;
 
 library work;
@@ -19,9 +20,10 @@ use work.my_pkg.all;
 entity state_ctrlr_autotest_tb is
     generic (
         -- Ficheros .txt
-        C_N_INPUTS          : integer := 12; -- Número de entradas (columnas)
+        C_N_INPUTS          : integer := 13; -- Número de entradas (columnas)
         C_N_OUTPUTS         : integer := 5; -- Número de salidas (columnas)
         C_WIDTH             : integer := 8; -- Número de bits de las señales
+        C_HEX               : boolean := false; -- Ficheros en hexadecimal (hread/hwrite) en lugar de binario
         -- C_INPUTS_PATH       : string := "\\AMS_NAS\home\Universidad\TFM\pwm_enjoyer\tb\autotest\state_ctrlr_inputs.txt";
         -- C_OUTPUTS_REF_PATH  : string := "\\AMS_NAS\home\Universidad\TFM\pwm_enjoyer\tb\autotest\state_ctrlr_outputs_ref.txt";
         -- C_OUTPUTS_PATH      : string := "\\AMS_NAS\home\Universidad\TFM\pwm_enjoyer\tb\autotest\state_ctrlr_outputs.txt"
@@ -42,10 +44,8 @@ architecture beh of state_ctrlr_autotest_tb is
     component state_ctrlr is
         generic (
             G_RST_POL           : std_logic := '1';
-            G_STATE_MAX_L2      : natural := 32;        -- Tamaño del vector de número de pulsos de un estado
-            G_MEM_SIZE_MAX_L2   : natural := 32;        -- Tamaño del vector del número máximo de estados
-            G_PERIOD_MAX_N      : natural := 2**32 - 1; -- Número máximo de periodos de reloj de una configuración
-            G_PERIOD_MAX_L2     : natural := 32         -- Tamaño del vector del número máximo de periodos de reloj de una configuración
+            G_MEM_SIZE_MAX_L2   : natural := 32;    -- Tamaño del vector del número máximo de estados
+            G_PERIOD_MAX_L2     : natural := 32     -- Tamaño del vector del número máximo de periodos de reloj de una configuración
         );
         port (
             CLK_I           : in std_logic;
@@ -55,12 +55,14 @@ architecture beh of state_ctrlr_autotest_tb is
             N_TOT_CYC_I     : in std_logic_vector((G_PERIOD_MAX_L2 - 1) downto 0);      -- Número total de ciclos que dura la configuración
             UPD_MEM_I       : in std_logic;                                             -- Señal de actualización de memoria
             CNT_END_I       : in std_logic;                                             -- Fin de estado
-            NEXT_CONFIG_I   : in mem;                                                   -- Siguiente configuración
+            CNT_END_PRE_I   : in std_logic;                                             -- Fin de estado anticipado
+            EARLY_SW_I      : in std_logic;                                             -- Protección ante SWITCH sin configuración previa
             RD_ADDR_O       : out std_logic_vector((G_MEM_SIZE_MAX_L2 - 1) downto 0);   -- Dirección de memoria (estado) a leer
             EN_CNT_O        : out std_logic;                                            -- Habiltador del contador
             SWITCH_MEM_O    : out std_logic;                                            -- Cambio de memoria
             LAST_CYC_O      : out std_logic;                                            -- Inidicador de último ciclo
-            EN_WR_CONFIG_O  : out std_logic                                             -- Bloqueo de escritura de configuración
+            UNLOCKED_O      : out std_logic;                                            -- Bloqueo de escritura de configuración
+            STATUS_O        : out std_logic_vector(1 downto 0)                          -- Estado (00 = Apagado, 01 = Apagando, 11 = Activo)
         );
     end component state_ctrlr;
 
@@ -78,12 +80,14 @@ architecture beh of state_ctrlr_autotest_tb is
     signal N_TOT_CYC_I     : std_logic_vector((C_PERIOD_MAX_L2 - 1) downto 0);      -- Número total de ciclos que dura la configuración
     signal UPD_MEM_I       : std_logic;                                             -- Señal de actualización de memoria
     signal CNT_END_I       : std_logic;                                             -- Fin de estado
-    signal NEXT_CONFIG_I   : mem  := (others => (others => '0'));                   -- Siguiente configuración
+    signal CNT_END_PRE_I   : std_logic;                                             -- Fin de estado anticipado
+    signal EARLY_SW_I      : std_logic := '0';                                      -- Protección ante SWITCH sin configuración previa
     signal RD_ADDR_O       : std_logic_vector((C_MEM_SIZE_MAX_L2 - 1) downto 0);    -- Dirección de memoria (estado) a leer
     signal EN_CNT_O        : std_logic;                                             -- Habiltador del contador
     signal SWITCH_MEM_O    : std_logic;                                             -- Cambio de memoria
     signal LAST_CYC_O      : std_logic;                                             -- Inidicador de último ciclo
-    signal EN_WR_CONFIG_O  : std_logic; 
+    signal UNLOCKED_O      : std_logic;                                             -- Bloqueo de escritura de configuración (EN_WR_CONFIG)
+    signal STATUS_O        : std_logic_vector(1 downto 0);                          -- Estado
 
     -- Vectores de datos
     type vec_input is array (0 to (C_N_INPUTS - 1)) of bit_vector((C_WIDTH - 1) downto 0);
@@ -102,9 +106,7 @@ begin
     uut : component state_ctrlr
         generic map (
             G_RST_POL           => C_RST_POL,
-            G_STATE_MAX_L2      => C_STATE_MAX_L2,
             G_MEM_SIZE_MAX_L2   => C_MEM_SIZE_MAX_L2,
-            G_PERIOD_MAX_N      => C_PERIOD_MAX_N,
             G_PERIOD_MAX_L2     => C_PERIOD_MAX_L2
         )
         port map (
@@ -115,12 +117,14 @@ begin
             N_TOT_CYC_I     => N_TOT_CYC_I,
             UPD_MEM_I       => UPD_MEM_I,
             CNT_END_I       => CNT_END_I,
-            NEXT_CONFIG_I   => NEXT_CONFIG_I,
+            CNT_END_PRE_I   => CNT_END_PRE_I,
+            EARLY_SW_I      => EARLY_SW_I,
             RD_ADDR_O       => RD_ADDR_O,
             EN_CNT_O        => EN_CNT_O,
             SWITCH_MEM_O    => SWITCH_MEM_O,
             LAST_CYC_O      => LAST_CYC_O,
-            EN_WR_CONFIG_O  => EN_WR_CONFIG_O
+            UNLOCKED_O      => UNLOCKED_O,
+            STATUS_O        => STATUS_O
         );
 
     -------------------------------------------------
@@ -152,6 +156,7 @@ begin
         file read_file      : text;         -- Archivo de lectura
         variable line_in    : line;         -- Línea de lectura
         variable data_in    : vec_input;    -- Dato extraído
+        variable hex_in     : std_logic_vector((C_WIDTH - 1) downto 0); -- Dato extraído (hexadecimal)
     begin
 
         file_open(read_file, C_INPUTS_PATH, read_mode); -- Abre el archivo de lectura
@@ -160,7 +165,12 @@ begin
             wait until CLK_I'event and (CLK_I = '1');
             readline(read_file, line_in);               -- Lee fila a fila
             for i in 0 to (C_N_INPUTS - 1) loop
-                read(line_in, data_in(i));              -- Lee dato a dato, separados por espacios
+                if C_HEX then
+                    hread(line_in, hex_in);             -- Lee dato a dato, en hexadecimal
+                    data_in(i) := to_bitvector(hex_in);
+                else
+                    read(line_in, data_in(i));          -- Lee dato a dato, separados por espacios
+                end if;
             end loop;
             -- User TODO: Asignación de entradas
             EN_I                <= to_stdlogicvector(data_in(0))(0);
@@ -169,13 +179,8 @@ begin
             -- N_TOT_CYC_I((C_WIDTH - 1) downto 0) <= to_stdlogicvector(data_in(2));
             UPD_MEM_I           <= to_stdlogicvector(data_in(3))(0);
             CNT_END_I           <= to_stdlogicvector(data_in(4))(0);
-            NEXT_CONFIG_I(0)    <= to_stdlogicvector(data_in(5))((C_STATE_MAX_L2 - 1) downto 0);
-            NEXT_CONFIG_I(1)    <= to_stdlogicvector(data_in(6))((C_STATE_MAX_L2 - 1) downto 0);
-            NEXT_CONFIG_I(2)    <= to_stdlogicvector(data_in(7))((C_STATE_MAX_L2 - 1) downto 0);
-            NEXT_CONFIG_I(3)    <= to_stdlogicvector(data_in(8))((C_STATE_MAX_L2 - 1) downto 0);
-            NEXT_CONFIG_I(4)    <= to_stdlogicvector(data_in(9))((C_STATE_MAX_L2 - 1) downto 0);
-            NEXT_CONFIG_I(5)    <= to_stdlogicvector(data_in(10))((C_STATE_MAX_L2 - 1) downto 0);
-            NEXT_CONFIG_I(6)    <= to_stdlogicvector(data_in(11))((C_STATE_MAX_L2 - 1) downto 0);
+            CNT_END_PRE_I       <= to_stdlogicvector(data_in(5))(0);
+            -- data_in(6) a data_in(12): NEXT_CONFIG, sin entrada en el state_ctrlr actual
             ---------------------------------------
         end loop;
         -- wait until rising_edge(CLK_I);
@@ -197,6 +202,7 @@ begin
         file write_file     : text;         -- Archivo de escritura
         variable line_out   : line;         -- Línea de lectura
         variable data_out   : vec_output;   -- Dato escrito
+        variable hex_in     : std_logic_vector((C_WIDTH - 1) downto 0); -- Dato extraído (hexadecimal)
     begin
 
         file_open(read_file, C_OUTPUTS_REF_PATH, read_mode);    -- Abre el archivo de lectura
@@ -210,11 +216,17 @@ begin
             data_out(1)(0) := to_bit(EN_CNT_O);
             data_out(2)(0) := to_bit(SWITCH_MEM_O);
             data_out(3)(0) := to_bit(LAST_CYC_O);
-            data_out(4)(0) := to_bit(EN_WR_CONFIG_O);
+            data_out(4)(0) := to_bit(UNLOCKED_O);
             ----------------------------------------
             for i in 0 to (C_N_OUTPUTS - 1) loop
-                read(line_in, data_in(i));                          -- Lee dato a dato, separados por espacios
-                write(line_out, data_out(i), right, (C_WIDTH + 1)); -- Escribe dato a dato, separados por espacios
+                if C_HEX then
+                    hread(line_in, hex_in);                                                   -- Lee dato a dato, en hexadecimal
+                    data_in(i) := to_bitvector(hex_in);
+                    hwrite(line_out, to_stdlogicvector(data_out(i)), right, (C_WIDTH/4 + 1)); -- Escribe dato a dato, en hexadecimal
+                else
+                    read(line_in, data_in(i));                                                -- Lee dato a dato, separados por espacios
+                    write(line_out, data_out(i), right, (C_WIDTH + 1));                       -- Escribe dato a dato, separados por espacios
+                end if;
             end loop;
             writeline(write_file, line_out);                        -- Escribe fila a fila
             -- User TODO: Comparación de salidas